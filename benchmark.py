@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from model.SQLProcessor import SQLProcessor
+from model.SQLCallGraph import SQLCallGraph
+from utils.dataloader import load_catalog
+from utils.cache import AnalysisCache
+from utils.pagewriter import PageWriter
+from utils.synthetic import generate_catalog
+from processing import (generate_function_htmls, write_search_index, write_graph_manifests,
+                        generate_html_text_page, generate_dependency_graph, generate_table_html_page)
+
+
+class Stages:
+    def __init__(self):
+        """Время этапов в секундах в порядке выполнения."""
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - start
+        print(f"[{name}] {self.timings[name]:.3f} сек.")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(data_dir: str, output_dir: str, jobs: int, writers: int) -> Dict[str, float]:
+    """
+    Прогоняет конвейер processing.py по выгрузке из data_dir и замеряет каждый этап отдельно.
+    perform_all запускается трижды на свежезагруженном каталоге: без кеша,
+    с пустым кешем анализа и повторно с заполненным кешем.
+    """
+    stages = Stages()
+
+    with stages.measure("load"):
+        catalog = load_catalog(jobs=jobs, data_dir=data_dir)
+        functions, tables = catalog.functions, catalog.tables
+
+    with stages.measure("processor_init"):
+        processor = SQLProcessor(tables=tables, functions=functions)
+
+    with stages.measure("perform_all"):
+        processor.perform_all(jobs=jobs)
+
+    cache_path = os.path.join(output_dir, ".analysis_cache.sqlite")
+    for name in ("perform_all_cache_cold", "perform_all_cache_warm"):
+        # perform_all заменяет DDL на HTML, поэтому каждый проход начинается с чистой загрузки
+        cached = load_catalog(jobs=jobs, data_dir=data_dir)
+        cache = AnalysisCache(cache_path)
+        with stages.measure(name):
+            SQLProcessor(tables=cached.tables, functions=cached.functions).perform_all(jobs=jobs, cache=cache)
+        cache.close()
+
+    functions_dir = os.path.join(output_dir, "functions")
+    tables_dir = os.path.join(output_dir, "tables")
+    PageWriter.make_dirs(output_dir, functions_dir, tables_dir, os.path.join(output_dir, "manifest"))
+
+    with stages.measure("render_pages"):
+        with PageWriter(workers=writers) as writer:
+            generate_function_htmls(functions=functions, tables=tables, table_callers=processor.table_callers,
+                                    writer=writer, output_dir=output_dir,
+                                    index_file=os.path.join(output_dir, "index.html"))
+            write_search_index(functions, tables, writer, output_dir=output_dir)
+            for table_name, table in tables.items():
+                generate_table_html_page(table, processor.table_callers.get(table_name, {}), writer, tables_dir,
+                                         column_functions=processor.column_callers.get(table_name))
+            for func in functions.values():
+                generate_html_text_page(func, str(func), tables, writer, functions_dir)
+
+    with stages.measure("graph"):
+        call_graph = SQLCallGraph(functions=functions, tables=tables)
+        with PageWriter(workers=writers) as writer:
+            write_graph_manifests(call_graph, writer, output_dir=output_dir)
+            for key, func in functions.items():
+                generate_dependency_graph(func, key, str(func), call_graph, writer, functions_dir)
+
+    stages.timings["total"] = sum(stages.timings.values())
+    return stages.timings
+
+
+def compare(current: Dict[str, float], baseline_path: str) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"Сравнение с {baseline_path} (коммит {baseline.get('commit')}):")
+    for name, seconds in current.items():
+        old = baseline.get("stages", {}).get(name)
+        if old:
+            print(f"  {name:<24} {old:8.3f} -> {seconds:8.3f} сек. ({seconds / old:5.2f}x)")
+        else:
+            print(f"  {name:<24} {'-':>8} -> {seconds:8.3f} сек.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Замер времени этапов processing.py на синтетическом (или заданном) каталоге.")
+    parser.add_argument('--tables', type=int, default=1000, help="Число таблиц (по умолчанию 1000).")
+    parser.add_argument('--functions', type=int, default=1000, help="Число функций (по умолчанию 1000).")
+    parser.add_argument('--schemas', type=int, default=5, help="Число схем (по умолчанию 5).")
+    parser.add_argument('--columns', type=int, default=20, help="Колонок в таблице (по умолчанию 20).")
+    parser.add_argument('--definition-size', type=int, default=2000,
+                        help="Примерный размер DDL функции в символах (по умолчанию 2000).")
+    parser.add_argument('--overloads', type=int, default=0,
+                        help="Сколько функций получают дополнительную перегрузку (по умолчанию 0).")
+    parser.add_argument('--depth', type=int, default=5, help="Глубина графа вызовов (по умолчанию 5).")
+    parser.add_argument('--calls', type=int, default=3, help="Вызовов из одной функции (по умолчанию 3).")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора (по умолчанию 0).")
+    parser.add_argument('--data-dir', help="Готовая выгрузка (каталог с functions/ и tables/) вместо синтетической.")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="Процессов для подсветки (по умолчанию 1).")
+    parser.add_argument('-w', '--writers', type=int, default=8, help="Потоков записи страниц (по умолчанию 8).")
+    parser.add_argument('-o', '--output', default="benchmark.json", help="Файл с результатами (JSON).")
+    parser.add_argument('--compare', help="Файл результатов прошлого запуска для сравнения.")
+    args = parser.parse_args()
+
+    params = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    with tempfile.TemporaryDirectory(prefix="sql_benchmark_") as work_dir:
+        data_dir = args.data_dir
+        catalog = None
+        if data_dir is None:
+            data_dir = os.path.join(work_dir, "data")
+            start = time.perf_counter()
+            catalog = generate_catalog(data_dir, tables=args.tables, functions=args.functions,
+                                       schemas=args.schemas, columns=args.columns,
+                                       definition_size=args.definition_size, overloads=args.overloads,
+                                       depth=args.depth, calls=args.calls, seed=args.seed)
+            print(f"Синтетический каталог сгенерирован за {time.perf_counter() - start:.2f} сек.: {catalog}")
+        timings = run_benchmark(data_dir, os.path.join(work_dir, "output"), args.jobs, args.writers)
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "catalog": catalog,
+        "stages": timings,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+    if args.compare:
+        compare(timings, args.compare)
@@ -1,43 +1,148 @@
+import os
 import time
 import argparse
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from model.SQLFunction import SQLFunction
 from model.SQLTable import SQLTable  # Обязательно создайте этот модуль
+from model.SQLCatalog import SQLCatalog
 from utils.dataloader import load_functions, load_tables
 from model.SQLProcessor import SQLProcessor
+from utils.cache import AnalysisCache
+from model.SQLDependencyIndex import SQLDependencyIndex
+
+def print_dependencies(index: SQLDependencyIndex,
+                       tables_to_check: List[str],
+                       functions_to_check: List[str],
+                       transitive: bool = False,
+                       callees: bool = False,
+                       schema: Optional[str] = None,
+                       columns_to_check: Optional[List[str]] = None) -> None:
+    """
+    Печатает ответы на вопросы о зависимостях по индексу.
+    """
+    for table in tables_to_check:
+        print(f"Проверяем таблицу: {table}")
+        try:
+            for func in index.table_callers(table, transitive, schema):
+                print(f"Функция {func} вызывает таблицу {table}.")
+        except KeyError as e:
+            print(e.args[0])
+
+    for column in columns_to_check or []:
+        print(f"Проверяем колонку: {column}")
+        table, _, column_name = column.rpartition('.')
+        try:
+            found = index.column_callers(table, column_name, schema)
+        except KeyError as e:
+            print(e.args[0])
+            continue
+        if not found:
+            print(f"Не найдено функций, которые используют колонку {column}.")
+        for func in found:
+            print(f"Функция {func} использует колонку {column}.")
+
+    for function in functions_to_check:
+        print(f"Проверяем функцию: {function}")
+        try:
+            if callees:
+                found = index.function_callees(function, transitive, schema)
+                for called in found["functions"]:
+                    print(f"Функция {function} вызывает функцию {called}.")
+                for table in found["tables"]:
+                    print(f"Функция {function} использует таблицу {table}.")
+            else:
+                for func in index.function_callers(function, transitive, schema):
+                    print(f"Функция {func} вызывает функцию {function}.")
+        except KeyError as e:
+            print(e.args[0])
 
-def main(tables_to_check: List[str]):
-    start_time = time.perf_counter()
 
+def load_index(jobs: int = 1, cache_path: Optional[str] = None) -> SQLDependencyIndex:
+    """
+    Полный путь: загружает JSON-выгрузки, обрабатывает функции и строит индекс в памяти.
+    """
+    catalog = SQLCatalog()
     print("Загрузка функций...")
-    funcs: Dict[str, SQLFunction] = load_functions()
+    funcs: Dict[str, SQLFunction] = load_functions(jobs=jobs, catalog=catalog)
     print(f"Загружено {len(funcs)} функций.")
 
     print("Загрузка таблиц...")
-    tables: Dict[str, SQLTable] = load_tables()
+    tables: Dict[str, SQLTable] = load_tables(jobs=jobs, catalog=catalog)
     print(f"Загружено {len(tables)} таблиц.")
 
+    cache: Optional[AnalysisCache] = AnalysisCache(cache_path, read_only=True) if cache_path else None
     sp: SQLProcessor = SQLProcessor(tables=tables, functions=funcs)
-    sp.perform_all()
+    sp.perform_all(jobs=jobs, cache=cache)
+    if cache is not None:
+        cache.close()
+    return SQLDependencyIndex.build(funcs, tables)
 
-    for table in tables_to_check:
-        print(f"Проверяем таблицу: {table}")
-        for _, func in funcs.items():
-            if table in func.called_tables:
-                print(f"Функция {func.name} вызывает таблицу {table}.")
-# Предполагается, что у SQLFunction есть атрибут `text`
+
+def main(args: argparse.Namespace):
+    start_time = time.perf_counter()
+
+    if args.index:
+        # Быстрый режим: только готовый индекс, без выгрузок и подсветки
+        index = SQLDependencyIndex.load(args.index)
+    else:
+        index = load_index(args.jobs, None if args.no_cache else args.cache)
+
+    print_dependencies(index, args.table, args.function, args.transitive, args.callees, args.schema, args.column)
 
     end_time = time.perf_counter()
     print(f"Время выполнения: {end_time - start_time:.2f} секунд.")
 
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Процессор SQL для анализа зависимостей таблиц.")
     parser.add_argument(
-        '-t', '--table', 
-        nargs='+', 
-        required=True, 
+        '-t', '--table',
+        nargs='+',
+        default=[],
         help="Таблица или список таблиц для проверки зависимости.")
+    parser.add_argument(
+        '-f', '--function',
+        nargs='+',
+        default=[],
+        help="Функция или список функций, для которых нужно найти вызывающие функции.")
+    parser.add_argument(
+        '-c', '--column',
+        nargs='+',
+        default=[],
+        help="Колонка или список колонок (schema.table.column), для которых нужно найти использующие функции.")
+    parser.add_argument(
+        '--callees',
+        action='store_true',
+        help="Для --function вывести вызываемые функции и таблицы вместо вызывающих.")
+    parser.add_argument(
+        '--transitive',
+        action='store_true',
+        help="Учитывать зависимости по всей цепочке вызовов, а не только прямые.")
+    parser.add_argument(
+        '--schema',
+        help="Оставить в ответе только объекты из этой схемы.")
+    parser.add_argument(
+        '-i', '--index',
+        nargs='?',
+        const=os.path.join("output", "dependency_index.json"),
+        help="Отвечать по индексу зависимостей, собранному processing.py "
+             "(по умолчанию output/dependency_index.json), без загрузки выгрузок.")
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help="Количество процессов для обработки функций (по умолчанию 1).")
+    parser.add_argument(
+        '--cache',
+        default=os.path.join("output", ".analysis_cache.sqlite"),
+        help="Файл кеша анализа processing.py; только читается.")
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Не использовать кеш анализа.")
 
     args = parser.parse_args()
-    main(args.table)
+    if not args.table and not args.function and not args.column:
+        parser.error("нужно указать --table, --function и/или --column")
+    main(args)
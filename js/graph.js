@@ -0,0 +1,171 @@
+// Раскрытие графа зависимостей по щелчку на узле с пунктирной рамкой.
+// Списки смежности функций догружаются из манифестов output/manifest/graph_*.js (JSONP),
+// после чего диаграмма строится заново так же, как в SQLCallGraph.mermaid.
+const graphState = JSON.parse(document.getElementById("graph-state").textContent);
+const graphManifests = {};
+const pendingGraphManifests = {};
+let graphRenders = 0;
+
+// Вызывается из файлов манифестов
+function loadManifest(name, manifest) {
+    graphManifests[name] = manifest;
+    Object.assign(graphState.names, manifest.names);
+    Object.assign(graphState.colors, manifest.colors);
+    (pendingGraphManifests[name] || []).forEach(callback => callback());
+    delete pendingGraphManifests[name];
+}
+
+function requireGraphManifest(name) {
+    return new Promise(resolve => {
+        if (graphManifests[name]) {
+            resolve();
+            return;
+        }
+        if (pendingGraphManifests[name]) {
+            pendingGraphManifests[name].push(resolve);
+            return;
+        }
+        pendingGraphManifests[name] = [resolve];
+        const script = document.createElement("script");
+        script.src = `../manifest/${name}.js`;
+        // Без манифеста узел просто останется нераскрытым
+        script.onerror = () => {
+            graphManifests[name] = {functions: {}, names: {}, colors: {}};
+            (pendingGraphManifests[name] || []).forEach(callback => callback());
+            delete pendingGraphManifests[name];
+        };
+        document.head.appendChild(script);
+    });
+}
+
+// Подпись в кавычках Mermaid: кавычки и символы HTML — кодами сущностей, как mermaid_label в SQLCallGraph
+function mermaidLabel(text) {
+    return text.replace(/#/g, "#35;").replace(/&/g, "#amp;").replace(/"/g, "#quot;")
+        .replace(/</g, "#lt;").replace(/>/g, "#gt;");
+}
+
+// Обход в ширину от корня по раскрытым узлам; missing — манифесты, без которых граф неполон
+function buildGraph() {
+    const names = graphState.names;
+    const missing = new Set();
+    const adjacency = key => {
+        const manifest = graphManifests[names[key][3]];
+        if (!manifest) {
+            missing.add(names[key][3]);
+            return [[], []];
+        }
+        return manifest.functions[key] || [[], []];
+    };
+
+    const functions = [graphState.root];
+    const seen = new Set(functions);
+    const tables = [];
+    const seenTables = new Set();
+    const edges = new Set();
+    const hidden = {};
+    for (let i = 0; i < functions.length; i++) {
+        const key = functions[i];
+        const [calls, uses] = adjacency(key);
+        const limit = graphState.expanded[key];
+        if (limit === undefined) {
+            if (calls.length + uses.length) hidden[key] = calls.length + uses.length;
+            continue;
+        }
+        const shownCalls = limit ? calls.slice(0, limit) : calls;
+        const shownUses = limit ? uses.slice(0, limit) : uses;
+        const rest = calls.length + uses.length - shownCalls.length - shownUses.length;
+        if (rest) hidden[key] = rest;
+        const id = names[key][0];
+        shownCalls.forEach(called => {
+            edges.add(`${id} --> ${names[called][0]}`);
+            if (!seen.has(called)) {
+                seen.add(called);
+                functions.push(called);
+            }
+        });
+        shownUses.forEach(table => {
+            edges.add(`${id} --> ${names[table][0]}`);
+            if (!seenTables.has(table)) {
+                seenTables.add(table);
+                tables.push(table);
+            }
+        });
+    }
+
+    const clusters = new Map();
+    const addNode = (key, line) => {
+        const schema = names[key][1];
+        if (!clusters.has(schema)) clusters.set(schema, {nodes: [], members: []});
+        clusters.get(schema).nodes.push(line);
+        clusters.get(schema).members.push(names[key][0]);
+    };
+    functions.forEach(key => {
+        const [id, , name] = names[key];
+        addNode(key, `${id}(("${mermaidLabel(key in hidden ? `${name} +${hidden[key]}` : name)}"))`);
+    });
+    tables.forEach(key => addNode(key, `${names[key][0]}["${mermaidLabel(names[key][2])}"]`));
+
+    const lines = ["graph TB"];
+    const styles = [];
+    let number = 0;
+    clusters.forEach((cluster, schema) => {
+        const [fill, color] = graphState.colors[schema];
+        lines.push(`subgraph sg${number}["${mermaidLabel(schema)}"]`, ...cluster.nodes, "end");
+        styles.push(`classDef sc${number} fill:${fill},stroke:#333,stroke-width:2px,color:${color}`,
+            `class ${cluster.members.join(",")} sc${number}`);
+        number++;
+    });
+    lines.push(...edges);
+    const collapsed = Object.keys(hidden).map(key => names[key][0]);
+    if (collapsed.length) {
+        styles.push("classDef collapsed stroke-dasharray:5 5,stroke-width:3px,cursor:pointer",
+            `class ${collapsed.join(",")} collapsed`);
+    }
+    return {text: lines.concat(styles).join("\n"), missing, schemas: [...clusters.keys()], shown: functions.length};
+}
+
+function renderLegend(schemas, shown) {
+    const legend = document.querySelector(".legend");
+    legend.replaceChildren(...schemas.map(schema => {
+        const item = document.createElement("div");
+        item.style.cssText = "display:inline-block; padding:5px; color:white; margin:5px; border-radius:5px;";
+        item.style.backgroundColor = graphState.colors[schema][0];
+        item.textContent = schema;
+        return item;
+    }));
+    if (shown < graphState.reachable) {
+        const limit = document.createElement("span");
+        limit.className = "graph-limit";
+        limit.textContent = `Показано функций: ${shown} из ${graphState.reachable}. ` +
+            "Узлы с пунктирной рамкой раскрываются щелчком.";
+        legend.appendChild(limit);
+    }
+}
+
+async function expandNode(key) {
+    // Первый щелчок раскрывает следующий уровень, повторный — все связи узла
+    graphState.expanded[key] = key in graphState.expanded ? 0 : graphState.fanout;
+    let graph = buildGraph();
+    while (graph.missing.size) {
+        await Promise.all([...graph.missing].map(requireGraphManifest));
+        graph = buildGraph();
+    }
+    const {svg, bindFunctions} = await mermaid.render(`graph-svg-${++graphRenders}`, graph.text);
+    const content = document.getElementById("zoom-content");
+    content.innerHTML = svg;
+    if (bindFunctions) bindFunctions(content);
+    renderLegend(graph.schemas, graph.shown);
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+    // Щелчок по раскрываемому узлу не должен масштабировать граф (см. zoom-script.js)
+    document.getElementById("zoom-content").addEventListener("mousedown", event => {
+        const node = event.target.closest(".node.collapsed");
+        if (!node || event.button !== 0) return;
+        event.stopPropagation();
+        const match = /flowchart-(.+)-\d+$/.exec(node.id);
+        const nodeId = match ? match[1] : node.dataset.id;
+        const key = Object.keys(graphState.names).find(name => graphState.names[name][0] === nodeId);
+        if (key && graphState.names[key][3]) expandNode(key);
+    });
+});
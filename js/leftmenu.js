@@ -1,51 +1,131 @@
-function toggleSchema(schemaName) {
-    const list = document.getElementById(`list-${schemaName}`);
-    if (list.style.display === "none") {
-        list.style.display = "block";
+// Высота строки списка, должна совпадать с .virtual-list li в style.css
+const ROW_HEIGHT = 30;
+// Сколько строк рисовать сверх видимых, чтобы прокрутка не мигала
+const ROW_BUFFER = 10;
+
+const schemaList = document.getElementById("schema-list");
+const manifests = {};
+const pendingManifests = {};
+
+// Вызывается из файлов манифестов output/manifest/*.js
+function loadManifest(name, manifest) {
+    manifests[name] = manifest;
+    (pendingManifests[name] || []).forEach(callback => callback(manifest));
+    delete pendingManifests[name];
+}
+
+// Манифест подгружается тегом script при первом обращении; при ошибке загрузки callback получает null
+function requireManifest(name, callback) {
+    if (manifests[name]) {
+        callback(manifests[name]);
+        return;
+    }
+    if (pendingManifests[name]) {
+        pendingManifests[name].push(callback);
+        return;
+    }
+    pendingManifests[name] = [callback];
+    const script = document.createElement("script");
+    script.src = `${schemaList.dataset.manifestDir}/${name}.js`;
+    // Файла может не быть (например, шарда поиска для префикса без терминов)
+    script.onerror = () => {
+        (pendingManifests[name] || []).forEach(callback => callback(null));
+        delete pendingManifests[name];
+        script.remove();
+    };
+    document.head.appendChild(script);
+}
+
+function createRow(manifest, index) {
+    const [name, count] = manifest.entries[index];
+    const fullName = `${manifest.schema}.${name}`;
+    const row = document.createElement("li");
+    row.style.top = `${index * ROW_HEIGHT}px`;
+    const link = document.createElement("a");
+    link.target = "content";
+    if (manifest.kind === "functions") {
+        link.className = "function-link";
+        link.href = `${manifest.base}/${fullName}_text.html`;
+        link.dataset.function = fullName;
+        link.textContent = count > 1 ? `${name} (${count})` : name;
     } else {
-        list.style.display = "none";
+        link.className = "table-link";
+        link.href = `${manifest.base}/${fullName}.html`;
+        link.dataset.table = fullName;
+        link.title = `Используется в функциях: ${count}`;
+        link.textContent = name;
     }
+    row.appendChild(link);
+    return row;
 }
 
-function expandAll() {
-    document.querySelectorAll('.function-list, .table-list').forEach(list => {
-        list.style.display = "block";
+// Рисует только строки, попадающие в видимую область списка
+function renderRows(list) {
+    const manifest = manifests[list.dataset.manifest];
+    if (!manifest || list.style.display === "none") return;
+    const first = Math.max(0, Math.floor(list.scrollTop / ROW_HEIGHT) - ROW_BUFFER);
+    const last = Math.min(manifest.entries.length,
+        Math.ceil((list.scrollTop + list.clientHeight) / ROW_HEIGHT) + ROW_BUFFER);
+    if (list.dataset.first === String(first) && list.dataset.last === String(last)) return;
+    list.dataset.first = first;
+    list.dataset.last = last;
+
+    const rows = document.createDocumentFragment();
+    for (let i = first; i < last; i++) {
+        rows.appendChild(createRow(manifest, i));
+    }
+    list.firstElementChild.replaceChildren(rows);
+}
+
+function setSchemaVisible(header, visible) {
+    const list = header.nextElementSibling;
+    list.style.display = visible ? "block" : "none";
+    if (!visible) return;
+    requireManifest(list.dataset.manifest, manifest => {
+        if (!manifest) return;
+        list.firstElementChild.style.height = `${manifest.entries.length * ROW_HEIGHT}px`;
+        delete list.dataset.first;
+        renderRows(list);
     });
 }
 
+function toggleSchema(header) {
+    setSchemaVisible(header, header.nextElementSibling.style.display === "none");
+}
+
+function expandAll() {
+    document.querySelectorAll('.schema-header').forEach(header => setSchemaVisible(header, true));
+}
+
 function collapseAll() {
-    document.querySelectorAll('.function-list, .table-list').forEach(list => {
-        list.style.display = "none";
-    });
+    document.querySelectorAll('.schema-header').forEach(header => setSchemaVisible(header, false));
 }
 
-document.querySelectorAll('.function-link, .table-link').forEach(link => {
-    link.addEventListener('click', function(event) {
-        event.preventDefault();
-        const href = this.getAttribute('href');
-        document.querySelector('iframe').src = href;
-    });
-});
+// Один обработчик на всё меню вместо обработчика на каждую ссылку
+schemaList.addEventListener('click', function(event) {
+    const header = event.target.closest('.schema-header');
+    if (header) {
+        toggleSchema(header);
+        return;
+    }
+    const link = event.target.closest('.function-link, .table-link');
+    if (!link) return;
+    event.preventDefault();
+    document.querySelector('iframe').src = link.getAttribute('href');
 
-// Скрытие кнопки при нажатии на ссылку таблицы
-document.querySelectorAll('.table-link').forEach(link => {
-    link.addEventListener('click', function() {
-        const modeButton = document.getElementById('mode-button');
-        if (modeButton) {
-            modeButton.style.display = 'none'; // Скрыть кнопку
-        }
-    });
+    // Кнопка визуального режима есть только у функций
+    const modeButton = document.getElementById('mode-button');
+    if (modeButton) {
+        modeButton.style.display = link.classList.contains('table-link') ? 'none' : 'inline-block';
+    }
 });
 
-// Возвращение кнопки при нажатии на ссылку функции
-document.querySelectorAll('.function-link').forEach(link => {
-    link.addEventListener('click', function() {
-        const modeButton = document.getElementById('mode-button');
-        if (modeButton) {
-            modeButton.style.display = 'inline-block'; // Показать кнопку
-        }
-    });
-});
+// Событие scroll не всплывает, поэтому перехватывается на фазе погружения
+schemaList.addEventListener('scroll', function(event) {
+    if (event.target.classList && event.target.classList.contains('virtual-list')) {
+        renderRows(event.target);
+    }
+}, true);
 
 // Скрытие и показ кнопки визуального режима
 window.addEventListener('message', (event) => {
@@ -60,4 +140,3 @@ window.addEventListener('message', (event) => {
         }
     }
 });
-
@@ -0,0 +1,84 @@
+// Длина префикса шарда, должна совпадать с SHARD_PREFIX_LENGTH в SQLSearchIndex.py
+const SEARCH_PREFIX_LENGTH = 2;
+// Сколько объектов показывать в выдаче
+const SEARCH_LIMIT = 100;
+
+const SEARCH_REASONS = { n: "имя", c: "колонка", r: "в коде" };
+
+const searchBox = document.getElementById("search-box");
+const searchResults = document.getElementById("search-results");
+
+// Имя шарда по первым символам запроса, как shard_name в SQLSearchIndex.py
+function searchShardName(query) {
+    return "search_" + Array.from(query).slice(0, SEARCH_PREFIX_LENGTH)
+        .map(char => char.codePointAt(0).toString(16)).join("_");
+}
+
+// Объекты всех терминов шарда, начинающихся с query: сначала точные совпадения имён
+function searchShard(shard, query) {
+    const found = new Map();
+    for (const [term, entries] of Object.entries(shard.terms)) {
+        if (!term.startsWith(query)) continue;
+        for (const [kind, name, reason] of entries) {
+            const id = `${kind}:${name}`;
+            let result = found.get(id);
+            if (!result) {
+                result = { kind, name, reasons: new Set(), exact: false };
+                found.set(id, result);
+            }
+            result.reasons.add(reason);
+            if (reason === "n" && term === query) result.exact = true;
+        }
+    }
+    return Array.from(found.values()).sort((a, b) =>
+        (b.exact - a.exact) || (b.reasons.has("n") - a.reasons.has("n")) || a.name.localeCompare(b.name));
+}
+
+function renderSearchResults(shard, results) {
+    const list = document.createElement("ul");
+    results.slice(0, SEARCH_LIMIT).forEach(result => {
+        const row = document.createElement("li");
+        const link = document.createElement("a");
+        link.target = "content";
+        if (result.kind === "f") {
+            link.className = "function-link";
+            link.href = `${shard.base.f}/${result.name}_text.html`;
+        } else {
+            link.className = "table-link";
+            link.href = `${shard.base.t}/${result.name}.html`;
+        }
+        link.textContent = `${result.name} `;
+        const reason = document.createElement("span");
+        reason.className = "search-reason";
+        reason.textContent = Array.from(result.reasons).map(code => SEARCH_REASONS[code]).join(", ");
+        link.appendChild(reason);
+        row.appendChild(link);
+        list.appendChild(row);
+    });
+    if (results.length > SEARCH_LIMIT) {
+        const more = document.createElement("li");
+        more.textContent = `... и ещё ${results.length - SEARCH_LIMIT}`;
+        list.appendChild(more);
+    }
+    if (!results.length) {
+        const empty = document.createElement("li");
+        empty.textContent = "Ничего не найдено";
+        list.appendChild(empty);
+    }
+    searchResults.replaceChildren(list);
+}
+
+searchBox.addEventListener("input", () => {
+    const query = searchBox.value.trim().toLowerCase();
+    if (Array.from(query).length < SEARCH_PREFIX_LENGTH) {
+        searchResults.replaceChildren();
+        return;
+    }
+    const shardName = searchShardName(query);
+    requireManifest(shardName, shard => {
+        // Пока шард загружался, запрос мог измениться
+        if (searchBox.value.trim().toLowerCase() === query) {
+            renderSearchResults(shard, shard ? searchShard(shard, query) : []);
+        }
+    });
+});
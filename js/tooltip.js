@@ -3,10 +3,15 @@ document.addEventListener("DOMContentLoaded", () => {
     tooltip.classList.add("tooltip-box");
     document.body.appendChild(tooltip);
 
+    // Колонки и типы всех таблиц страницы, по одному разу на таблицу
+    const metadataBlock = document.getElementById("table-metadata");
+    const tableMetadata = metadataBlock ? JSON.parse(metadataBlock.textContent) : {};
+
     document.querySelectorAll(".table-tooltip").forEach(element => {
         element.addEventListener("mouseenter", () => {
-            const columns = JSON.parse(element.getAttribute("data-columns") || "[]");
-            const types = JSON.parse(element.getAttribute("data-types") || "[]");
+            const metadata = tableMetadata[element.getAttribute("data-table")] || {};
+            const columns = metadata.columns || [];
+            const types = metadata.types || [];
 
             let content = `<strong>Таблица: ${element.textContent}</strong><br>`;
             content += `<table>`;
@@ -0,0 +1,306 @@
+import hashlib
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+from model.SQLFunction import SQLFunction
+from model.SQLTable import SQLTable
+
+# Ограничения графа на странице функции по умолчанию: уровни вызовов от корня
+# и число показанных вызовов (и отдельно таблиц) у одного узла; 0 — без ограничения
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_MAX_FANOUT = 25
+
+
+def get_color(schema: str) -> str:
+    """Генерация цвета на основе схемы."""
+    hash_obj = hashlib.md5(schema.encode('utf-8'))
+    return f"#{hash_obj.hexdigest()[:6]}"
+
+
+def manifest_name(schema: str) -> str:
+    """
+    Имя JSONP-манифеста со списками смежности функций схемы (output/manifest/<имя>.js):
+    коды символов схемы, чтобы имя файла не зависело от алфавита.
+    """
+    return "graph_" + "_".join(f"{ord(char):x}" for char in schema.lower())
+
+
+def graph_node_id(prefix: str, key: str) -> str:
+    """
+    Идентификатор узла Mermaid по ключу объекта. Он не зависит от состава каталога, поэтому
+    появление или удаление одного объекта не меняет графы и манифесты остальных.
+    """
+    return prefix + hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
+
+def mermaid_label(text: str) -> str:
+    """
+    Текст для подписи Mermaid в кавычках: кавычки и символы HTML заменяются кодами сущностей
+    Mermaid (#quot; и т. п.), сам # — тоже, чтобы не читаться как начало кода.
+    """
+    return (text.replace('#', '#35;').replace('&', '#amp;').replace('"', '#quot;')
+            .replace('<', '#lt;').replace('>', '#gt;'))
+
+
+def get_text_color(hex_color: str) -> str:
+    """
+    Определяет цвет текста (белый или чёрный) в зависимости от яркости фона.
+    Используется формула вычисления относительной яркости.
+    """
+    hex_color = hex_color.lstrip('#')
+    r = int(hex_color[0:2], 16)
+    g = int(hex_color[2:4], 16)
+    b = int(hex_color[4:6], 16)
+    # Вычисление относительной яркости по стандартной формуле
+    brightness = (r * 299 + g * 587 + b * 114) / 1000
+    # Порог яркости 128 для определения тёмного или светлого цвета
+    return "#FFFFFF" if brightness < 128 else "#000000"
+
+
+class SQLCallGraph:
+    def __init__(self, functions: Dict[str, 'SQLFunction'], tables: Dict[str, 'SQLTable'],
+                 max_depth: int = DEFAULT_MAX_DEPTH, max_fanout: int = DEFAULT_MAX_FANOUT):
+        """
+        Граф вызовов всего каталога, строится один раз после SQLProcessor.perform_all.
+        Сильно связные компоненты (взаимные вызовы) сжимаются, а число достижимых
+        функций считается для каждой компоненты один раз (см. _count_reachable).
+        На странице функции показывается не всё замыкание, а max_depth уровней вызовов
+        и не больше max_fanout вызовов и таблиц у каждого узла (0 — без ограничения);
+        остальное страница догружает по запросу из манифестов смежности (adjacency).
+        """
+        self.functions = functions
+        self.tables = tables
+        self.max_depth = max_depth
+        self.max_fanout = max_fanout
+        self.calls: Dict[str, List[str]] = {
+            key: sorted(called for called in func.called_functions if called in functions)
+            for key, func in functions.items()
+        }
+        self.uses: Dict[str, List[str]] = {
+            key: sorted(table for table in func.called_tables if table in tables)
+            for key, func in functions.items()
+        }
+        # Идентификаторы узлов уникальны, в отличие от коротких имён из разных схем
+        self.node_ids: Dict[str, str] = {key: graph_node_id("f", key) for key in functions}
+        self.table_node_ids: Dict[str, str] = {key: graph_node_id("t", key) for key in tables}
+
+        self.component_of: Dict[str, int] = {}
+        self.reachable_counts: List[int] = []
+        self._count_reachable()
+
+        self.schema_colors: Dict[str, str] = {}
+
+    def _strongly_connected_components(self) -> List[List[str]]:
+        """
+        Итеративный алгоритм Тарьяна (без рекурсии, поэтому длинные цепочки вызовов
+        не упираются в лимит стека). Компоненты возвращаются в обратном
+        топологическом порядке: вызываемые раньше вызывающих.
+        """
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+
+        for root in self.calls:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.calls[root]))]
+
+            while work:
+                node, successors = work[-1]
+                descended = False
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = lowlink[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(self.calls[successor])))
+                        descended = True
+                        break
+                    if successor in on_stack:
+                        lowlink[node] = min(lowlink[node], index[successor])
+                if descended:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+        return components
+
+    def _count_reachable(self) -> None:
+        """
+        Число функций, достижимых из каждой компоненты (включая её саму), считается один раз
+        в обратном топологическом порядке. Достижимые функции — битовая маска по номерам
+        функций: маска компоненты — её функции и маски вызываемых компонент. Маска хранится,
+        пока не обработаны все вызывающие компоненты, поэтому в памяти только фронт обхода.
+        """
+        bits = {key: 1 << number for number, key in enumerate(self.calls)}
+        components = self._strongly_connected_components()
+        for component_id, component in enumerate(components):
+            for key in component:
+                self.component_of[key] = component_id
+
+        successors: List[Set[int]] = []
+        pending = [0] * len(components)
+        for component_id, component in enumerate(components):
+            called = {self.component_of[called] for key in component for called in self.calls[key]}
+            called.discard(component_id)
+            successors.append(called)
+            for called_component in called:
+                pending[called_component] += 1
+
+        masks: Dict[int, int] = {}
+        for component_id, component in enumerate(components):
+            mask = 0
+            for key in component:
+                mask |= bits[key]
+            for called_component in successors[component_id]:
+                mask |= masks[called_component]
+                pending[called_component] -= 1
+                if not pending[called_component]:
+                    del masks[called_component]
+            self.reachable_counts.append(bin(mask).count("1"))
+            if pending[component_id]:
+                masks[component_id] = mask
+
+    def reachable_count(self, key: str) -> int:
+        """Число функций, достижимых из key (включая её саму), для подписи «показано N из M»."""
+        return self.reachable_counts[self.component_of[key]]
+
+    def _color(self, schema: str) -> str:
+        color = self.schema_colors.get(schema)
+        if color is None:
+            color = self.schema_colors[schema] = get_color(schema)
+        return color
+
+    def view(self, key: str) -> Tuple[List[str], List[str], List[Tuple[str, str]], Dict[str, int], List[str]]:
+        """
+        Часть графа для страницы функции key: обход в ширину от key, где раскрываются
+        узлы ближе max_depth уровней, и у каждого показываются первые max_fanout
+        вызовов и таблиц. Возвращает функции и таблицы в порядке обхода, рёбра
+        (пары идентификаторов узлов, без повторов), число скрытых связей у узлов,
+        которые можно раскрыть, и список раскрытых функций.
+        """
+        limit = self.max_fanout or None
+        depth = {key: 0}
+        functions = [key]
+        tables: Dict[str, None] = {}
+        edges: Dict[Tuple[str, str], None] = {}
+        hidden: Dict[str, int] = {}
+        expanded: List[str] = []
+        queue = deque([key])
+
+        while queue:
+            current = queue.popleft()
+            calls, uses = self.calls[current], self.uses[current]
+            if self.max_depth and depth[current] >= self.max_depth:
+                if calls or uses:
+                    hidden[current] = len(calls) + len(uses)
+                continue
+            expanded.append(current)
+            node_id = self.node_ids[current]
+            if len(calls) + len(uses) > len(calls[:limit]) + len(uses[:limit]):
+                hidden[current] = len(calls) + len(uses) - len(calls[:limit]) - len(uses[:limit])
+            for called in calls[:limit]:
+                edges[(node_id, self.node_ids[called])] = None
+                if called not in depth:
+                    depth[called] = depth[current] + 1
+                    functions.append(called)
+                    queue.append(called)
+            for table_key in uses[:limit]:
+                edges[(node_id, self.table_node_ids[table_key])] = None
+                tables[table_key] = None
+
+        return functions, list(tables), list(edges), hidden, expanded
+
+    def mermaid(self, key: str) -> Tuple[List[str], Dict[str, str], Dict[str, object]]:
+        """
+        Возвращает строки Mermaid-графа зависимостей функции key (view), цвета схем,
+        попавших в граф (для легенды), и состояние графа для js/graph.js.
+        Узлы сгруппированы в подграфы по схемам, стили задаются одним classDef на схему.
+        Узлы со скрытыми связями подписаны их числом и получают класс collapsed:
+        по щелчку страница раскрывает их, загрузив манифесты смежности.
+        """
+        functions, tables, edges, hidden, expanded = self.view(key)
+        clusters: Dict[str, List[str]] = {}
+        members: Dict[str, List[str]] = {}
+        names: Dict[str, List[str]] = {}
+
+        for function_key in functions:
+            func = self.functions[function_key]
+            node_id = self.node_ids[function_key]
+            label = f"{func.name} +{hidden[function_key]}" if function_key in hidden else func.name
+            clusters.setdefault(func.schema, []).append(f'{node_id}(("{mermaid_label(label)}"))')
+            members.setdefault(func.schema, []).append(node_id)
+            names[function_key] = [node_id, func.schema, func.name, manifest_name(func.schema)]
+        for table_key in tables:
+            table = self.tables[table_key]
+            node_id = self.table_node_ids[table_key]
+            clusters.setdefault(table.schema, []).append(f'{node_id}["{mermaid_label(table.name)}"]')
+            members.setdefault(table.schema, []).append(node_id)
+            names[table_key] = [node_id, table.schema, table.name, ""]
+
+        graph_lines: List[str] = []
+        style_lines: List[str] = []
+        legend: Dict[str, str] = {}
+        for number, (schema, nodes) in enumerate(clusters.items()):
+            bg_color = legend[schema] = self._color(schema)
+            graph_lines.append(f'subgraph sg{number}["{mermaid_label(schema)}"]')
+            graph_lines.extend(nodes)
+            graph_lines.append("end")
+            style_lines.append(f"classDef sc{number} fill:{bg_color},stroke:#333,stroke-width:2px,"
+                               f"color:{get_text_color(bg_color)}")
+            style_lines.append(f"class {','.join(members[schema])} sc{number}")
+        graph_lines.extend(f"{source} --> {target}" for source, target in edges)
+        if hidden:
+            style_lines.append("classDef collapsed stroke-dasharray:5 5,stroke-width:3px,cursor:pointer")
+            style_lines.append(f"class {','.join(self.node_ids[function_key] for function_key in hidden)} collapsed")
+
+        state = {
+            "root": key,
+            "fanout": self.max_fanout,
+            "reachable": self.reachable_count(key),
+            "expanded": {function_key: self.max_fanout for function_key in expanded},
+            "names": names,
+            "colors": {schema: [color, get_text_color(color)] for schema, color in legend.items()},
+        }
+        return graph_lines + style_lines, legend, state
+
+    def adjacency(self) -> Dict[str, Dict[str, object]]:
+        """
+        Манифесты смежности по схемам для раскрытия графа на странице:
+        имя манифеста -> вызовы и таблицы каждой функции схемы, а также идентификаторы,
+        схемы и имена всех упомянутых объектов и цвета их схем.
+        """
+        manifests: Dict[str, Dict[str, object]] = {}
+        for key, func in self.functions.items():
+            manifest = manifests.setdefault(manifest_name(func.schema),
+                                            {"functions": {}, "names": {}, "colors": {}})
+            manifest["functions"][key] = [self.calls[key], self.uses[key]]
+            for function_key in [key] + self.calls[key]:
+                called = self.functions[function_key]
+                manifest["names"][function_key] = [self.node_ids[function_key], called.schema, called.name,
+                                                   manifest_name(called.schema)]
+                manifest["colors"].setdefault(called.schema, self._color(called.schema))
+            for table_key in self.uses[key]:
+                table = self.tables[table_key]
+                manifest["names"][table_key] = [self.table_node_ids[table_key], table.schema, table.name, ""]
+                manifest["colors"].setdefault(table.schema, self._color(table.schema))
+        for manifest in manifests.values():
+            manifest["colors"] = {schema: [color, get_text_color(color)] for schema, color in manifest["colors"].items()}
+        return manifests
@@ -0,0 +1,28 @@
+import sys
+from typing import Dict, Iterable, Tuple
+
+from model.SQLFunction import SQLFunction
+from model.SQLTable import SQLTable
+
+
+class SQLCatalog:
+    def __init__(self):
+        """
+        Каталог одной загрузки: функции и таблицы по ключам schema.name в нижнем регистре.
+        Реестры принадлежат каталогу, а не классам, поэтому объекты живут ровно столько,
+        сколько сам каталог, и повторная загрузка в том же процессе не накапливает память.
+        Повторяющиеся строки (схемы, типы, имена колонок) интернируются,
+        а одинаковые кортежи колонок, типов и аргументов хранятся в одном экземпляре.
+        """
+        self.functions: Dict[str, SQLFunction] = {}
+        self.tables: Dict[str, SQLTable] = {}
+        self._tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    @staticmethod
+    def intern(value: str) -> str:
+        return sys.intern(value)
+
+    def shared_tuple(self, values: Iterable[str]) -> Tuple[str, ...]:
+        """Кортеж интернированных строк; одинаковые кортежи разделяются всеми объектами каталога."""
+        values = tuple(sys.intern(value) for value in values)
+        return self._tuples.setdefault(values, values)
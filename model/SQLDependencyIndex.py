@@ -0,0 +1,167 @@
+import json
+from collections import deque
+from typing import Dict, List, Optional, Iterable, Tuple
+
+from model.SQLFunction import SQLFunction
+from model.SQLTable import SQLTable
+
+# Увеличивается при несовместимом изменении формата файла индекса
+INDEX_VERSION = 2
+
+
+class SQLDependencyIndex:
+    def __init__(self, functions: List[str], tables: List[str], calls: List[List[int]], uses: List[List[int]],
+                 columns: List[List[list]]):
+        """
+        Компактный индекс зависимостей без DDL и HTML: имена объектов и списки смежности
+        по их номерам. calls[i] — номера функций, вызываемых функцией i,
+        uses[i] — номера таблиц, которые она использует, columns[i] — пары
+        [номер таблицы, колонка в нижнем регистре] для колонок, на которые она ссылается.
+        Сохраняется processing.py рядом с документацией и загружается одним чтением,
+        поэтому cli.py может отвечать на вопросы о зависимостях без загрузки JSON-выгрузок.
+        """
+        self.functions = functions
+        self.tables = tables
+        self.calls = calls
+        self.uses = uses
+        self.columns = columns
+        self.function_ids: Dict[str, int] = {name.lower(): i for i, name in enumerate(functions)}
+        self.table_ids: Dict[str, int] = {name.lower(): i for i, name in enumerate(tables)}
+        self._callers: Optional[List[List[int]]] = None
+        self._table_users: Optional[List[List[int]]] = None
+        self._column_users: Optional[Dict[Tuple[int, str], List[int]]] = None
+
+    @classmethod
+    def build(cls, functions: Dict[str, 'SQLFunction'], tables: Dict[str, 'SQLTable']) -> 'SQLDependencyIndex':
+        """
+        Строит индекс по результатам SQLProcessor.perform_all.
+        """
+        function_ids = {key: i for i, key in enumerate(functions)}
+        table_ids = {key: i for i, key in enumerate(tables)}
+        calls = []
+        uses = []
+        columns = []
+        for func in functions.values():
+            calls.append(sorted(function_ids[key] for key in func.called_functions if key in function_ids))
+            uses.append(sorted(table_ids[key] for key in func.called_tables if key in table_ids))
+            columns.append(sorted([table_ids[key], column] for key, column in func.used_columns if key in table_ids))
+        return cls([str(func) for func in functions.values()], [str(table) for table in tables.values()], calls, uses,
+                   columns)
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "functions": self.functions,
+                "tables": self.tables,
+                "calls": self.calls,
+                "uses": self.uses,
+                "columns": self.columns,
+            }, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'SQLDependencyIndex':
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.loads(f.read())
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Индекс {path} имеет версию {data.get('version')}, ожидается {INDEX_VERSION}. "
+                             f"Пересоберите его через processing.py.")
+        return cls(data["functions"], data["tables"], data["calls"], data["uses"], data["columns"])
+
+    def _reverse(self) -> None:
+        """Обратные списки смежности строятся только при первом запросе о вызывающих."""
+        callers: List[List[int]] = [[] for _ in self.functions]
+        table_users: List[List[int]] = [[] for _ in self.tables]
+        for caller, called in enumerate(self.calls):
+            for function_id in called:
+                callers[function_id].append(caller)
+        for user, used in enumerate(self.uses):
+            for table_id in used:
+                table_users[table_id].append(user)
+        self._callers = callers
+        self._table_users = table_users
+
+    @staticmethod
+    def _closure(start: Iterable[int], adjacency: List[List[int]]) -> List[int]:
+        """Все вершины, достижимые из start (включая их самих), обход в ширину."""
+        seen = set(start)
+        queue = deque(seen)
+        while queue:
+            for neighbour in adjacency[queue.popleft()]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        return sorted(seen)
+
+    def _names(self, ids: Iterable[int], names: List[str], schema: Optional[str]) -> List[str]:
+        result = [names[i] for i in ids]
+        if schema is not None:
+            prefix = f"{schema.lower()}."
+            result = [name for name in result if name.lower().startswith(prefix)]
+        return result
+
+    def _table_id(self, table: str) -> int:
+        table_id = self.table_ids.get(table.lower())
+        if table_id is None:
+            raise KeyError(f"Таблица {table} не найдена в индексе")
+        return table_id
+
+    def _function_id(self, function: str) -> int:
+        function_id = self.function_ids.get(function.lower())
+        if function_id is None:
+            raise KeyError(f"Функция {function} не найдена в индексе")
+        return function_id
+
+    def table_callers(self, table: str, transitive: bool = False, schema: Optional[str] = None) -> List[str]:
+        """
+        Функции, использующие таблицу; с transitive — ещё и все, кто вызывает их по цепочке.
+        """
+        table_id = self._table_id(table)
+        if self._table_users is None:
+            self._reverse()
+        callers = self._table_users[table_id]
+        if transitive:
+            callers = self._closure(callers, self._callers)
+        return self._names(callers, self.functions, schema)
+
+    def column_callers(self, table: str, column: str, schema: Optional[str] = None) -> List[str]:
+        """
+        Функции, которые ссылаются на колонку таблицы (имя колонки без учёта регистра).
+        """
+        table_id = self._table_id(table)
+        if self._column_users is None:
+            column_users: Dict[Tuple[int, str], List[int]] = {}
+            for user, used in enumerate(self.columns):
+                for used_table, used_column in used:
+                    column_users.setdefault((used_table, used_column), []).append(user)
+            self._column_users = column_users
+        return self._names(self._column_users.get((table_id, column.lower()), []), self.functions, schema)
+
+    def function_callers(self, function: str, transitive: bool = False, schema: Optional[str] = None) -> List[str]:
+        """
+        Функции, вызывающие функцию; с transitive — по всей цепочке вызовов.
+        """
+        function_id = self._function_id(function)
+        if self._callers is None:
+            self._reverse()
+        callers = self._callers[function_id]
+        if transitive:
+            callers = [i for i in self._closure(callers, self._callers) if i != function_id]
+        return self._names(callers, self.functions, schema)
+
+    def function_callees(self, function: str, transitive: bool = False,
+                         schema: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Функции и таблицы, которые вызывает функция; с transitive — по всей цепочке вызовов.
+        """
+        function_id = self._function_id(function)
+        called = self.calls[function_id]
+        table_ids = set(self.uses[function_id])
+        if transitive:
+            called = [i for i in self._closure(called, self.calls) if i != function_id]
+            for i in called:
+                table_ids.update(self.uses[i])
+        return {
+            "functions": self._names(called, self.functions, schema),
+            "tables": self._names(sorted(table_ids), self.tables, schema),
+        }
@@ -1,52 +1,92 @@
-import re
-import json
-from typing import List, Dict
+from typing import List, Dict, Set, Sequence, Tuple
 from model.SQLObject import SQLObject
-# Пример набора ключевых слов
-keywords = (
-    'create table', 'select', 'from', 'insert into', 'delete', 'update', 'join',
-    'left', 'inner', 'outer', 'truncate', 'drop', 'where', 'group by', 'order by'
-)
+
+
+class SQLFunctionOverload:
+    __slots__ = ('return_type', 'arguments', 'signature', 'function_definition',
+                 'called_functions', 'called_tables', 'identifiers', 'used_columns')
+
+    def __init__(self, return_type: str, arguments: Sequence[str], function_definition: str, signature: str = ''):
+        """
+        Одна перегрузка функции: свой список аргументов и свой DDL.
+        signature — строка аргументов из pg_get_function_arguments, различает перегрузки.
+        """
+        self.return_type: str = return_type
+        self.arguments: Sequence[str] = arguments
+        self.signature: str = signature
+        self.function_definition: str = function_definition
+
+        # filling by SQLProcessor processing ddl
+        self.called_functions: Set[str] = set()
+        self.called_tables: Set[str] = set()
+        self.identifiers: Set[str] = set()
+        self.used_columns: Set[Tuple[str, str]] = set()
+
+    def key(self, function_key: str) -> str:
+        """Ключ перегрузки: ключ функции и строка аргументов."""
+        return f"{function_key}({self.signature})"
 
 
 class SQLFunction(SQLObject):
+    __slots__ = ('overloads', 'called_functions', 'called_tables', 'identifiers', 'used_columns')
 
     def __init__(self, schema_name: str,
                  function_name: str,
                  return_type: str,
-                 arguments: List[str],
+                 arguments: Sequence[str],
                  function_definition: str,
-                 overload: int = 1):
+                 signature: str = ''):
         super().__init__(name=function_name, schema_name=schema_name)
-        self.function_name: str = function_name
-        self.schema_name: str = schema_name
-        self.return_type: str = return_type
-        self.arguments: List[str] = arguments
-        self.function_definition: str = function_definition
+        self.overloads: List[SQLFunctionOverload] = [
+            SQLFunctionOverload(return_type, arguments, function_definition, signature)
+        ]
 
         # filling by SQLProcessor processing ddl
-        self.called_functions: List[str] = []
-        self.called_tables: List[str] = []
-        self.overload: int = overload
+        self.called_functions: Set[str] = set()
+        self.called_tables: Set[str] = set()
+        self.identifiers: Set[str] = set()
+        # (ключ таблицы, колонка в нижнем регистре)
+        self.used_columns: Set[Tuple[str, str]] = set()
 
-    def __str__(self) -> str:
-        return f"{self.schema}.{self.name}"
+    def add_overload(self, overload: SQLFunctionOverload) -> None:
+        self.overloads.append(overload)
 
-    def __repr__(self) -> str:
-        return f"{self.schema}.{self.name}"
+    @property
+    def function_name(self) -> str:
+        return self.name
 
+    @property
+    def schema_name(self) -> str:
+        return self.schema
 
+    @property
+    def overload(self) -> int:
+        return len(self.overloads)
 
-    def highlight_arguments(self, text: str) -> str:
+    @property
+    def return_type(self) -> str:
+        return self.overloads[0].return_type
+
+    @property
+    def arguments(self) -> Sequence[str]:
+        return self.overloads[0].arguments
+
+    @property
+    def function_definition(self) -> str:
         """
-        Подсвечивает все вхождения аргументов функции, если они не пустые.
+        DDL (или HTML после обработки) всех перегрузок; склеивается только при отрисовке.
         """
-        if len(self.arguments) == 1 and self.arguments[0] == '':
-            return text
-        for arg in self.arguments:
-            pattern = rf'\b{re.escape(arg)}\b'
-            text = re.sub(pattern,
-                          f'<span class="function-input">{arg}</span>',
-                          text,
-                          flags=re.IGNORECASE)
-        return text
+        if len(self.overloads) == 1:
+            return self.overloads[0].function_definition
+        return "\n\n".join(overload.function_definition for overload in self.overloads)
+
+    def release_definition(self) -> None:
+        """Освобождает DDL/HTML перегрузок, когда страница функции уже записана; зависимости остаются."""
+        for overload in self.overloads:
+            overload.function_definition = ''
+
+    def __str__(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+    def __repr__(self) -> str:
+        return f"{self.schema}.{self.name}"
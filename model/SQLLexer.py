@@ -0,0 +1,72 @@
+import re
+from typing import Iterator, Tuple, Iterable, Pattern
+
+# Ключевые слова, которые подсвечиваются в DDL функций
+keywords = (
+    'create table', 'select', 'from', 'insert into', 'delete', 'update', 'join',
+    'left', 'inner', 'outer', 'truncate', 'drop', 'where', 'group by', 'order by'
+)
+
+# Виды токенов
+COMMENT = 'comment'
+STRING = 'string'
+DOLLAR = 'dollar'
+KEYWORD = 'keyword'
+IDENTIFIER = 'identifier'
+ARGUMENT = 'argument'
+WHITESPACE = 'whitespace'
+OTHER = 'other'
+
+Token = Tuple[str, str]
+
+# Порядок альтернатив важен: комментарии и строки должны распознаваться раньше слов.
+# Тело функции в $tag$...$tag$ — это код, поэтому разделители выделяются отдельным
+# токеном, а содержимое разбирается как обычный SQL.
+TOKEN_TEMPLATE = r"""
+      (?P<comment>--[^\n]*|%(block_comment)s)
+    | (?P<string>%(string)s)
+    | (?P<dollar>\$(?:[^\W\d]\w*)?\$)
+    | (?P<keyword>(?i:%(keywords)s)(?!\w))
+    | (?P<identifier>%(quoted)s|\w+)
+    | (?P<whitespace>\s+)
+    | (?P<other>.)
+"""
+KEYWORDS_PATTERN = '|'.join(re.escape(kw) for kw in keywords)
+TOKEN_PATTERN = re.compile(TOKEN_TEMPLATE % {
+    'block_comment': r"/\*[^*]*\*+(?:[^/*][^*]*\*+)*/",
+    'string': r"[Ee]'(?:[^'\\]|\\.|'')*'|'[^']*(?:''[^']*)*'",
+    'quoted': r'"(?:[^"]|"")+"',
+    'keywords': KEYWORDS_PATTERN,
+}, re.VERBOSE | re.DOTALL)
+# Вариант для патологически больших DDL: незакрытые комментарий, строка или идентификатор
+# в кавычках продолжаются до конца текста. В TOKEN_PATTERN такая конструкция не совпадает,
+# и каждая следующая открывающая кавычка заново просматривает весь остаток текста,
+# а здесь каждое совпадение просматривает текст один раз, и разбор линеен по длине.
+FALLBACK_TOKEN_PATTERN = re.compile(TOKEN_TEMPLATE % {
+    'block_comment': r"/\*[^*]*(?:\*+[^/*][^*]*)*(?:\*+/|\*+\Z|\Z)",
+    'string': r"[Ee]'(?:[^'\\]|\\.|'')*(?:'|\Z)|'[^']*(?:''[^']*)*(?:'|\Z)",
+    'quoted': r'"(?:[^"]|"")+(?:"|\Z)',
+    'keywords': KEYWORDS_PATTERN,
+}, re.VERBOSE | re.DOTALL)
+
+
+def tokenize(text: str, arguments: Iterable[str] = (), pattern: Pattern = TOKEN_PATTERN) -> Iterator[Token]:
+    """
+    Разбивает SQL (диалект Greenplum/PostgreSQL) на токены (вид, текст) за один проход.
+    pattern — TOKEN_PATTERN или FALLBACK_TOKEN_PATTERN.
+    Слова, совпадающие с именами аргументов функции, помечаются как ARGUMENT.
+    Ключевые слова и аргументы рядом с точкой (schema.update) считаются идентификаторами.
+    """
+    argument_names = {arg.lower() for arg in arguments if arg}
+    previous_text = ''
+    for match in pattern.finditer(text):
+        kind = match.lastgroup
+        value = match.group(0)
+        if kind == KEYWORD or kind == IDENTIFIER:
+            qualified = previous_text == '.' or text.startswith('.', match.end())
+            if qualified:
+                kind = IDENTIFIER
+            elif kind == IDENTIFIER and value.lower() in argument_names:
+                kind = ARGUMENT
+        yield kind, value
+        previous_text = value
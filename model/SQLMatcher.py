@@ -0,0 +1,50 @@
+import re
+from typing import Dict, Iterator
+
+from model.SQLObject import SQLObject
+
+# Кандидат в часть имени объекта: слово или идентификатор в двойных кавычках
+IDENTIFIER_PATTERN = re.compile(r'"(?:[^"]|"")+"|\w+')
+
+
+def unquote_identifier(identifier: str) -> str:
+    """
+    Снимает двойные кавычки с идентификатора ("My""Name" -> My"Name).
+    """
+    if len(identifier) > 1 and identifier[0] == '"' and identifier[-1] == '"':
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+class SQLMatcher:
+    def __init__(self, objects: Dict[str, 'SQLObject']):
+        """
+        Сопоставляет квалифицированные имена объектов (schema.name) с каталогом.
+        Вместо регулярного выражения-перечисления всех имён текст один раз
+        разбивается на идентификаторы, а пары "схема.имя" проверяются по словарю
+        (candidates и оператор in),
+        поэтому стоимость поиска линейна по длине текста и не зависит от размера каталога.
+        Ключи словаря objects ожидаются в нижнем регистре.
+        """
+        self.objects = objects
+
+    @staticmethod
+    def qualified_key(schema: str, name: str) -> str:
+        """
+        Ключ каталога (schema.name в нижнем регистре) для пары идентификаторов.
+        """
+        return f"{unquote_identifier(schema)}.{unquote_identifier(name)}".lower()
+
+    @staticmethod
+    def candidates(text: str) -> Iterator[str]:
+        """
+        Все пары идентификаторов вида schema.name в тексте, независимо от каталога.
+        """
+        previous = None
+        for match in IDENTIFIER_PATTERN.finditer(text):
+            if previous is not None and previous.end() + 1 == match.start() and text[previous.end()] == '.':
+                yield SQLMatcher.qualified_key(previous.group(0), match.group(0))
+            previous = match
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.objects
@@ -1,4 +1,6 @@
 class SQLObject:
+    __slots__ = ('name', 'schema')
+
     def __init__(self, name: str, schema_name: str = 'public'):
         self.name = name
         self.schema = schema_name
@@ -1,159 +1,542 @@
 import re
-import json
-from typing import Dict, List, Tuple, Set
+import time
+from html import escape
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, List, Tuple, Set, FrozenSet, Optional, Iterator, Iterable, Deque, Pattern
 
 from model.SQLTable import SQLTable
 from model.SQLObject import SQLObject
-from model.SQLFunction import SQLFunction
+from model.SQLFunction import SQLFunction, SQLFunctionOverload
+from model.SQLMatcher import SQLMatcher, unquote_identifier
+from model.SQLLexer import tokenize, TOKEN_PATTERN, FALLBACK_TOKEN_PATTERN, COMMENT, STRING, KEYWORD, IDENTIFIER, ARGUMENT, WHITESPACE, OTHER
+from utils.progress import Progress
+from utils.cache import AnalysisCache
+from utils.profiler import Profiler
 
-# Пример набора ключевых слов
-keywords = (
-    'create table', 'select', 'from', 'insert into', 'delete', 'update', 'join',
-    'left', 'inner', 'outer', 'truncate', 'drop', 'where', 'group by', 'order by'
-)
+# (ключ перегрузки, DDL, аргументы) ->
+# (HTML, вызванные функции, вызванные таблицы, кандидаты, идентификаторы, колонки (таблица, колонка))
+Task = Tuple[str, str, List[str]]
+Result = Tuple[str, Set[str], Set[str], Set[str], Set[str], Set[Tuple[str, str]]]
+# (результат, время в секундах, режим обработки: None, CHUNKED или PLAIN)
+Timed = Tuple[Result, float, Optional[str]]
+# (ключ функции, перегрузка, задача, результат из кеша или None)
+Item = Tuple[str, 'SQLFunctionOverload', Task, Optional[tuple]]
+
+# Бюджет обработки одной перегрузки по умолчанию: длина DDL в символах и время подсветки в секундах
+DEFAULT_MAX_DEFINITION_SIZE = 1_000_000
+DEFAULT_TIME_BUDGET = 10.0
+# Длина куска, которыми (по границам токенов, см. _highlight) подсвечивается DDL больше бюджета по размеру
+FALLBACK_CHUNK_SIZE = 64 * 1024
+# Через сколько токенов проверяется, не исчерпан ли бюджет времени
+BUDGET_CHECK_INTERVAL = 256
+# Доля оставшегося бюджета на разбор текста на токены: остальное нужно на их обработку
+TOKENIZE_SHARE = 0.6
+# Доля time_budget, за которую простой текст успевает просмотреть остаток DDL в поисках зависимостей
+PLAIN_SCAN_SHARE = 0.1
+# Режимы обработки перегрузок, превысивших бюджет: подсветка кусками и простой экранированный текст
+CHUNKED = 'chunked'
+PLAIN = 'plain'
+# Слова для поиска зависимостей в простом тексте: без идентификаторов в кавычках, зато строго линейно.
+# Идентификаторы не начинаются с цифры, пары schema.name могут перекрываться (a.b.c даёт a.b и b.c)
+WORD_PATTERN = re.compile(r'\b[^\W\d]\w*')
+QUALIFIED_PATTERN = re.compile(r'\b(?=(\w+)\.(\w+))')
+# Граница, на которой простой текст и куски DDL в режиме CHUNKED режутся между проверками бюджета
+SEPARATOR_PATTERN = re.compile(r'[^\w.]')
+# Слова после имени таблицы, которые продолжают запрос, а не задают её псевдоним.
+# Ключевые слова лексера сюда тоже входят: записанные через перевод строки (GROUP\nBY)
+# или рядом с точкой они приходят как обычные идентификаторы
+NOT_ALIASES = frozenset((
+    'as', 'on', 'using', 'set', 'natural', 'cross', 'full', 'right', 'lateral', 'union', 'except', 'intersect',
+    'limit', 'offset', 'having', 'returning', 'values', 'window', 'for', 'with', 'default', 'distributed',
+    'partition', 'then', 'else', 'end', 'and', 'or', 'not', 'is', 'in', 'loop', 'into', 'execute', 'only',
+    'select', 'from', 'where', 'join', 'left', 'inner', 'outer', 'group', 'order', 'by', 'insert', 'update',
+    'delete', 'truncate', 'drop', 'create', 'when', 'case', 'fetch', 'begin', 'declare', 'return', 'perform',
+    'if', 'elsif', 'exception', 'raise', 'distinct', 'all', 'between', 'like', 'ilike', 'exists',
+))
 
 
 class SQLProcessor:
-    def __init__(self, tables: Dict[str, 'SQLTable'], functions: Dict[str, 'SQLFunction']):
+    def __init__(self, tables: Dict[str, 'SQLTable'], functions: Dict[str, 'SQLFunction'],
+                 max_definition_size: int = DEFAULT_MAX_DEFINITION_SIZE, time_budget: float = DEFAULT_TIME_BUDGET):
         """
         Инициализирует процессор с таблицами и функциями.
+        max_definition_size и time_budget — бюджет обработки одной перегрузки (0 — без ограничения):
+        DDL длиннее max_definition_size подсвечивается кусками, а то, что не успело обработаться
+        за time_budget секунд, выводится простым экранированным текстом (см. highlight_timed).
         """
         self.tables = tables
         self.functions = functions
-        # Используем статические методы для компиляции регулярных выражений
-        self.table_pattern = self.compile_regex(tables)
-        self.function_pattern = self.compile_regex(functions)
+        self.max_definition_size = max_definition_size
+        self.time_budget = time_budget
+        # Поиск объектов по словарю имён вместо регулярного выражения-перечисления
+        self.table_matcher = SQLMatcher(tables)
+        self.function_matcher = SQLMatcher(functions)
 
-    @staticmethod
-    def compile_regex(objects: Dict[str, 'SQLObject']) -> re.Pattern:
+        # Обратные индексы, заполняются в perform_all: таблица -> схема -> вызывающие функции
+        self.table_callers: Dict[str, Dict[str, List['SQLFunction']]] = {}
+        # таблица -> колонка (в нижнем регистре) -> использующие её функции
+        self.column_callers: Dict[str, Dict[str, List['SQLFunction']]] = {}
+        # Колонки таблиц в нижнем регистре; множества строятся при первой ссылке на таблицу
+        self.table_columns: Dict[str, FrozenSet[str]] = {}
+        # Перегрузки, превысившие бюджет: (ключ перегрузки, режим, длина DDL, время в секундах)
+        self.overruns: List[Tuple[str, str, int, float]] = []
+
+    def perform_all(self, jobs: int = 1, chunk_size: int = 64, cache: Optional['AnalysisCache'] = None,
+                    profiler: Optional['Profiler'] = None):
         """
-        Компилирует регулярное выражение для поиска объектов.
+        Подсвечивает DDL всех функций и заполняет called_functions и called_tables.
+        Каждая перегрузка обрабатывается отдельно со своими аргументами,
+        зависимости функции — объединение зависимостей её перегрузок.
+        При jobs > 1 перегрузки обрабатываются пачками по chunk_size в пуле процессов;
+        результаты применяются в исходном порядке, поэтому вывод не зависит от jobs.
+        Если передан cache, заново обрабатываются только перегрузки с изменившимся DDL
+        или упоминающие объекты, которые появились, исчезли или изменились в каталоге.
+        profiler получает время подсветки каждой перегрузки и счётчики обработки.
+        Перегрузки, превысившие бюджет обработки, попадают в overruns и в отчёт профилировщика.
         """
-        all_escaped = "|".join(re.escape(object_name) for object_name in objects.keys())
-        pattern = re.compile(rf"(?<!\w)({all_escaped})(?!\w)", flags=re.IGNORECASE)
-        return pattern
+        for _ in self.stream(jobs=jobs, chunk_size=chunk_size, cache=cache, profiler=profiler):
+            pass
 
-    @staticmethod
-    def _highlight_keywords(text: str) -> str:
-            """
-            Заменяем ключевые слова на <span class="sql-keyword">KEYWORD</span>.
-            """
-            # Компилируем единое регулярное выражение для всех ключевых слов
-            pattern = rf"(?<!\w)({'|'.join(re.escape(kw) for kw in keywords)})(?!\w)"
-
-            # Замена совпадений с обёртыванием в span
-            text = re.sub(
-                pattern,
-                lambda m: f'<span class="sql-keyword">{m.group(0).upper()}</span>',
-                text,
-                flags=re.IGNORECASE
-            )
-            return text
-
-    def perform_all(self):
-        total = len(self.functions)
-        processed = 0
-
-        for func_name, func in self.functions.items():
-            func.function_definition, func.called_functions = self.wrap_functions(func.function_definition)
-            func.function_definition, func.called_tables = self.wrap_tables(func.function_definition)
-            func.function_definition = SQLProcessor._highlight_keywords(func.function_definition)
-            func.function_definition = func.highlight_arguments(func.function_definition)
-            func.function_definition = SQLProcessor.wrap_comments(func.function_definition)
-            # костыль в случае если функция добавляет сама себя при парсинге ддл
-            func.called_functions.remove(str(func))
-            processed += 1
-            print(f"Processed {processed} of {total} functions")
-
-
-
-    def wrap_tables(self, text: str) -> Tuple[str, Set[str]]:
-        """
-        Подсвечивает таблицы как <span class="table-tooltip" ...>.
-        Добавляет таблицу в self.called_tables только если она была найдена в тексте.
-        При щелчке по элементу создаёт ссылку на соответствующую таблицу.
+    def stream(self, jobs: int = 1, chunk_size: int = 64, cache: Optional['AnalysisCache'] = None,
+               profiler: Optional['Profiler'] = None,
+               definitions: Optional[Iterable[Tuple[str, str]]] = None,
+               keys: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, 'SQLFunction']]:
         """
-        tables_in_text: Set[str] = set()
+        То же, что perform_all, но отдаёт пары (ключ, функция), как только обработаны все
+        перегрузки функции, чтобы её страницы можно было записать и освободить память сразу.
+        definitions — поток пар (ключ функции, DDL) в порядке перегрузок, например
+        dataloader.iter_definitions для каталога, загруженного без DDL; по умолчанию DDL
+        берётся из самих перегрузок. В пул процессов одновременно отдаётся не больше
+        2 * jobs пачек, так что в памяти находятся только DDL обрабатываемых пачек.
+        keys ограничивает обработку частью каталога (например, схемами шарда): ссылки
+        по-прежнему распознаются по всем функциям и таблицам, а DDL остальных функций пропускается.
+        Обратные индексы и cache.finish заполняются, когда поток исчерпан.
+        """
+        keys = list(self.functions) if keys is None else list(keys)
+        self.overruns = []
+        if definitions is None:
+            definitions = ((func_name, overload.function_definition)
+                           for func_name in keys for overload in self.functions[func_name].overloads)
+        remaining: Dict[str, int] = {func_name: len(self.functions[func_name].overloads) for func_name in keys}
+        counts = {"processed": 0, "from_cache": 0}
+        changed_names = cache.changed_names(self.tables, self.functions) if cache is not None else set()
+
+        def items() -> Iterator[Item]:
+            filled: Dict[str, int] = {}
+            for func_name, text in definitions:
+                if func_name not in remaining:
+                    continue
+                number = filled.get(func_name, 0)
+                filled[func_name] = number + 1
+                overload = self.functions[func_name].overloads[number]
+                task = (overload.key(func_name), text, overload.arguments)
+                cached = (cache.lookup(task[0], text, overload.arguments, changed_names, self.max_definition_size)
+                          if cache is not None else None)
+                yield func_name, overload, task, cached
+
+        progress = Progress("Обработано перегрузок функций", sum(remaining.values()))
+        for (func_name, overload, (overload_key, text, arguments), cached), timed in self._highlight_stream(
+                items(), jobs, chunk_size):
+            if cached is not None:
+                (overload.function_definition, overload.called_functions,
+                 overload.called_tables, overload.identifiers, overload.used_columns) = cached
+                counts["from_cache"] += 1
+            else:
+                (html, called_functions, called_tables, candidates, identifiers, used_columns), seconds, mode = timed
+                if mode is not None:
+                    self.overruns.append((overload_key, mode, len(text), seconds))
+                if profiler is not None:
+                    profiler.record("highlight", overload_key, seconds)
+                    profiler.count("matches", len(called_functions) + len(called_tables))
+                    profiler.count("ddl_bytes", len(text))
+                    if mode is not None:
+                        profiler.count(f"budget_{mode}")
+                # функция всегда находит саму себя в заголовке CREATE FUNCTION
+                called_functions.discard(func_name)
+                # Обрезанный по времени результат зависит от загрузки машины, поэтому в кеш не попадает
+                if cache is not None and mode != PLAIN:
+                    cache.store(overload_key, text, arguments, html, called_functions, called_tables, candidates,
+                                identifiers, used_columns, self.max_definition_size)
+                overload.function_definition = html
+                overload.called_functions = called_functions
+                overload.called_tables = called_tables
+                overload.identifiers = identifiers
+                overload.used_columns = used_columns
+                counts["processed"] += 1
+            progress.advance()
 
-        def replacer(match):
-            table_name = match.group(0)
-            tbl = self.tables[table_name.lower()]
+            remaining[func_name] -= 1
+            if remaining[func_name] == 0:
+                func = self.functions[func_name]
+                func.called_functions = set().union(*(overload.called_functions for overload in func.overloads))
+                func.called_tables = set().union(*(overload.called_tables for overload in func.overloads))
+                func.identifiers = set().union(*(overload.identifiers for overload in func.overloads))
+                func.used_columns = set().union(*(overload.used_columns for overload in func.overloads))
+                yield func_name, func
+        progress.finish()
 
-            # Сериализация данных для HTML
-            columns_json = json.dumps(tbl.colum_names, ensure_ascii=False)
-            types_json = json.dumps(tbl.data_types, ensure_ascii=False)
+        if cache is not None:
+            print(f"Из кеша: {counts['from_cache']} перегрузок, обработано: {counts['processed']}")
+        if profiler is not None:
+            profiler.count("functions", len(self.functions))
+            profiler.count("overloads_processed", counts["processed"])
+            profiler.count("overloads_from_cache", counts["from_cache"])
+        if self.overruns:
+            print(f"Превышен бюджет обработки у {len(self.overruns)} перегрузок "
+                  f"({CHUNKED} — подсветка кусками, {PLAIN} — простой текст):")
+            for overload_key, mode, size, seconds in self.overruns:
+                print(f"  {overload_key:<40} {mode:<8} {size} символов, {seconds:.2f} сек.")
+            if profiler is not None:
+                profiler.extra["budget_overruns"] = [
+                    {"overload": overload_key, "mode": mode, "size": size, "seconds": seconds}
+                    for overload_key, mode, size, seconds in self.overruns]
 
-            # Генерация HTML с безопасными данными и ссылкой
-            replacement = (
-                f'<a href="../tables/{table_name}.html" target="content" class="table-link">'
-                f'<span class="table-tooltip" '
-                f'data-columns=\'{columns_json}\' '
-                f'data-types=\'{types_json}\'>'
-                f'{table_name}'
-                f'</span>'
-                f'</a>'
-            )
+        # Индексы строятся в порядке каталога, а не завершения, чтобы вывод не зависел от порядка DDL
+        self.index_callers()
 
-            # Добавляем таблицу в список, если она была найдена
-            tables_in_text.add(table_name)
-            return replacement
+        if cache is not None:
+            cache.finish(self.tables, self.functions)
 
-        # Проверяем и заменяем все совпадения за один проход
-        text = self.table_pattern.sub(replacer, text)
-        return text, tables_in_text
+    def index_callers(self) -> None:
+        """
+        Строит обратные индексы table_callers и column_callers по called_tables и used_columns
+        всех функций каталога (например, после слияния шардов).
+        """
+        self.table_callers = {}
+        self.column_callers = {}
+        for func in self.functions.values():
+            self._index_callers(func)
 
-    def wrap_functions(self, text: str) -> Tuple[str, Set[str]]:
+    def _index_callers(self, func: 'SQLFunction') -> None:
         """
-        Оборачивает имена других функций в DDL на ссылки, кроме самой себя.
+        Добавляет функцию в обратные индексы таблиц и колонок, которые она использует.
+        """
+        for table_key in func.called_tables:
+            self.table_callers.setdefault(table_key, {}).setdefault(func.schema, []).append(func)
+        column_callers = self.column_callers
+        for table_key, column in func.used_columns:
+            column_callers.setdefault(table_key, {}).setdefault(column, []).append(func)
+
+    def _highlight_stream(self, items: Iterator[Item], jobs: int,
+                          chunk_size: int) -> Iterator[Tuple[Item, Optional[Timed]]]:
+        """
+        Подсвечивает перегрузки без результата из кеша и отдаёт их в исходном порядке вместе
+        с (результатом, временем, режимом); для перегрузок из кеша вместо результата — None.
+        При jobs > 1 задачи обрабатываются в пуле процессов: каждый процесс один раз строит
+        свой SQLProcessor из имён таблиц и функций (без DDL), а затем получает пачки задач.
+        Новые пачки читаются из items, только когда в работе меньше 2 * jobs пачек.
+        """
+        if jobs <= 1:
+            for item in items:
+                yield item, None if item[3] is not None else self.highlight_timed(item[2][1], item[2][2])
+            return
+
+        function_names = {key: SQLObject(name=func.name, schema_name=func.schema)
+                          for key, func in self.functions.items()}
+        window: Deque[Tuple[List[Item], Future]] = deque()
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 initializer=_init_worker,
+                                 initargs=(self.tables, function_names, self.max_definition_size,
+                                           self.time_budget)) as executor:
+            while True:
+                while len(window) < 2 * jobs:
+                    chunk = list(islice(items, chunk_size))
+                    if not chunk:
+                        break
+                    window.append((chunk, executor.submit(_highlight_chunk,
+                                                          [task for _, _, task, cached in chunk if cached is None])))
+                if not window:
+                    return
+                chunk, future = window.popleft()
+                results = iter(future.result())
+                for item in chunk:
+                    yield item, None if item[3] is not None else next(results)
+
+    def highlight_timed(self, text: str, arguments: List[str]) -> Timed:
+        """
+        highlight в пределах бюджета, время его работы в секундах и режим обработки.
+        DDL длиннее max_definition_size подсвечивается независимыми кусками лексером
+        FALLBACK_TOKEN_PATTERN (режим CHUNKED): разбор линеен по длине DDL, а куски режутся
+        только по пробелам и разделителям между токенами (см. _highlight), поэтому литералы,
+        комментарии и пары schema.name не разрываются даже в DDL без переводов строк.
+        Если time_budget исчерпан, остаток DDL выводится простым экранированным текстом
+        (режим PLAIN, см. _plain). Для DDL в пределах бюджета режим — None.
+        Бюджет проверяется при разборе, при обработке токенов и между кусками, а просмотр
+        остатка в режиме PLAIN ограничен PLAIN_SCAN_SHARE бюджета, так что превышение мало.
+        """
+        start = time.perf_counter()
+        deadline = start + self.time_budget if self.time_budget else None
+        parts: List[str] = []
+        found: Tuple[set, ...] = (set(), set(), set(), set(), set())
+        size = len(text)
+        oversized = bool(self.max_definition_size) and size > self.max_definition_size
+        chunk_size, pattern = (FALLBACK_CHUNK_SIZE, FALLBACK_TOKEN_PATTERN) if oversized else (size, TOKEN_PATTERN)
+        position = 0
+        window = chunk_size
+        while position < size and (deadline is None or time.perf_counter() < deadline):
+            end = min(position + window, size)
+            cut = end < size
+            result, consumed = self._highlight(text[position:end], arguments, deadline, pattern, cut)
+            if cut and not consumed:
+                # В окне нет ни одной границы (огромный литерал или комментарий): окно увеличивается
+                window *= 2
+                continue
+            window = chunk_size
+            parts.append(result[0])
+            for target, source in zip(found, result[1:]):
+                target.update(source)
+            position += consumed
+            if (not cut and position < end) or (deadline is not None and time.perf_counter() > deadline):
+                break
+
+        mode = CHUNKED if oversized else None
+        if position < size:
+            scan_deadline = time.perf_counter() + self.time_budget * PLAIN_SCAN_SHARE if deadline else None
+            result = self._plain(text[position:], scan_deadline)
+            parts.append(result[0])
+            for target, source in zip(found, result[1:]):
+                target.update(source)
+            mode = PLAIN
+        return ("".join(parts), *found), time.perf_counter() - start, mode
+
+    def highlight(self, text: str, arguments: List[str]) -> Result:
+        """
+        Подсвечивает DDL функции за один проход по потоку токенов:
+        ссылки на функции и таблицы, ключевые слова, аргументы и комментарии.
+        Имена внутри комментариев не подсвечиваются и не считаются зависимостями,
+        имена внутри строковых литералов (динамический SQL) учитываются как зависимости,
+        но остаются обычным текстом.
+        Возвращает HTML, ключи найденных функций и таблиц, все встреченные пары
+        schema.name (кандидаты), по которым кеш определяет, затронет ли функцию
+        появление или удаление объекта в каталоге, и все идентификаторы кода
+        в нижнем регистре (для поискового индекса).
+        По пути разрешаются ссылки на колонки таблиц (см. _resolve_columns).
+        """
+        return self._highlight(text, arguments)[0]
+
+    def _highlight(self, text: str, arguments: List[str], deadline: Optional[float] = None,
+                   pattern: Pattern = TOKEN_PATTERN, cut: bool = False) -> Tuple[Result, int]:
+        """
+        highlight с лексером pattern, который прекращает разбор, когда time.perf_counter() превышает deadline.
+        cut — text обрезан из более длинного DDL, и последний токен мог быть разорван:
+        тогда обрабатывается начало до последнего пробела или разделителя (SEPARATOR_PATTERN) перед ним.
+        Возвращает результат по обработанному началу текста и длину этого начала.
         """
         functions_in_text: Set[str] = set()
+        tables_in_text: Set[str] = set()
+        candidates: Set[str] = set()
+        identifiers: Set[str] = set()
+        # Для колонок: псевдоним или имя таблицы -> ключи таблиц, пары (квалификатор, имя)
+        # и идентификаторы без точек рядом
+        aliases: Dict[str, Set[str]] = {}
+        qualified: Set[Tuple[str, str]] = set()
+        bare: Set[str] = set()
+        tokens = []
+        tokenize_deadline = None
+        if deadline is not None:
+            now = time.perf_counter()
+            tokenize_deadline = now + (deadline - now) * TOKENIZE_SHARE
+        for token in tokenize(text, arguments, pattern):
+            tokens.append(token)
+            if (tokenize_deadline is not None and len(tokens) % BUDGET_CHECK_INTERVAL == 0
+                    and time.perf_counter() > tokenize_deadline):
+                break
+        if cut:
+            last = len(tokens) - 2
+            while last >= 0 and not (tokens[last][0] in (WHITESPACE, OTHER) and SEPARATOR_PATTERN.match(tokens[last][1])):
+                last -= 1
+            del tokens[last + 1:]
+        parts: List[str] = []
+        count = len(tokens)
+        next_check = BUDGET_CHECK_INTERVAL
+        i = 0
+
+        while i < count:
+            if deadline is not None and i >= next_check:
+                next_check = i + BUDGET_CHECK_INTERVAL
+                if time.perf_counter() > deadline:
+                    # Необработанные токены уйдут в простой текст вместе с остатком DDL
+                    del tokens[i:]
+                    break
+            kind, value = tokens[i]
 
-        def replacer(match):
-            function_name = match.group(0)
-            func = self.functions[function_name.lower()]
-
-            # Генерация ссылки на функцию
-            f_full = f"{func.schema_name}.{func.function_name}"
-            replacement = (
-                f'<a href="{f_full}_text.html" target="content" class="function-link">'
-                f'{f_full}'
-                f'</a>'
-            )
-            # Добавляем функцию в список, если она была найдена
-            functions_in_text.add(function_name)
-            return replacement
-
-        # Проверяем и заменяем все совпадения за один проход
-        text = self.function_pattern.sub(replacer, text)
-        return text, functions_in_text
+            if kind == IDENTIFIER:
+                word = unquote_identifier(value).lower()
+                if not value[0].isdigit():
+                    identifiers.add(word)
+                # schema.name: идентификатор, точка вплотную и ещё один идентификатор
+                if i + 2 < count and tokens[i + 1][1] == '.' and tokens[i + 2][0] == IDENTIFIER:
+                    name = tokens[i + 2][1]
+                    identifiers.add(unquote_identifier(name).lower())
+                    key = SQLMatcher.qualified_key(value, name)
+                    candidates.add(key)
+                    if key in self.function_matcher:
+                        parts.append(self._function_link(key))
+                        functions_in_text.add(key)
+                        i += 3
+                        continue
+                    if key in self.table_matcher:
+                        parts.append(self._table_link(key, f"{value}.{name}"))
+                        tables_in_text.add(key)
+                        aliases.setdefault(unquote_identifier(name).lower(), set()).add(key)
+                        alias = self._alias(tokens, i + 3)
+                        if alias is not None:
+                            aliases.setdefault(alias, set()).add(key)
+                        # schema.table.column
+                        if i + 4 < count and tokens[i + 3][1] == '.' and tokens[i + 4][0] == IDENTIFIER:
+                            qualified.add((key, unquote_identifier(tokens[i + 4][1]).lower()))
+                        i += 3
+                        continue
+                    if i == 0 or tokens[i - 1][1] != '.':
+                        qualified.add((word, unquote_identifier(name).lower()))
+                elif (i == 0 or tokens[i - 1][1] != '.') and (i + 1 == count or tokens[i + 1][1] not in '.('):
+                    bare.add(word)
+                parts.append(escape(value, quote=False))
+            elif kind == KEYWORD:
+                parts.append(f'<span class="sql-keyword">{value.upper()}</span>')
+            elif kind == ARGUMENT:
+                parts.append(f'<span class="function-input">{escape(value, quote=False)}</span>')
+            elif kind == COMMENT:
+                parts.append(f'<span class="sql-comment">{escape(value.strip(), quote=False)}</span>')
+            elif kind == WHITESPACE:
+                # Удаляем лишние пустые строки
+                first = value.find('\n')
+                last = value.rfind('\n')
+                if first != last:
+                    value = f"{value[:first]}\n{value[last + 1:]}"
+                parts.append(value)
+            else:
+                if kind == STRING:
+                    for key in SQLMatcher.candidates(value):
+                        candidates.add(key)
+                        if key in self.function_matcher:
+                            functions_in_text.add(key)
+                        if key in self.table_matcher:
+                            tables_in_text.add(key)
+                parts.append(escape(value, quote=False))
+            i += 1
+
+        consumed = sum(len(value) for _, value in tokens)
+        columns = self._resolve_columns(aliases, qualified, bare)
+        return ("".join(parts), functions_in_text, tables_in_text, candidates, identifiers, columns), consumed
 
     @staticmethod
-    def wrap_comments(text: str) -> str:
+    def _alias(tokens: List[Tuple[str, str]], start: int) -> Optional[str]:
+        """
+        Псевдоним таблицы, ссылка на которую заканчивается перед токеном start:
+        следующий значимый идентификатор (после необязательного AS), если он не продолжает запрос.
         """
-        Находит все комментарии в SQL-коде (как однострочные --, так и многострочные /* */),
-        оборачивает их в <span class="sql-comment"> и удаляет все HTML-теги внутри комментария.
-        Удаляет лишние переносы строк после обработки.
+        count = len(tokens)
+        i = start
+        while i < count and tokens[i][0] in (WHITESPACE, COMMENT):
+            i += 1
+        if i < count and tokens[i][0] == IDENTIFIER and tokens[i][1].lower() == 'as':
+            i += 1
+            while i < count and tokens[i][0] in (WHITESPACE, COMMENT):
+                i += 1
+        if i >= count or tokens[i][0] != IDENTIFIER or tokens[i][1][0].isdigit():
+            return None
+        alias = unquote_identifier(tokens[i][1]).lower()
+        if alias in NOT_ALIASES or (i + 1 < count and tokens[i + 1][1] in '.('):
+            return None
+        return alias
+
+    def _resolve_columns(self, aliases: Dict[str, Set[str]], qualified: Set[Tuple[str, str]],
+                         bare: Set[str]) -> Set[Tuple[str, str]]:
+        """
+        Колонки (ключ таблицы, колонка), на которые ссылается текст: квалифицированные
+        псевдонимом, именем таблицы или schema.table, и неквалифицированные имена,
+        которые есть среди колонок ровно одной таблицы, упомянутой в этом же тексте.
+        Псевдонимы действуют на весь текст, а не на отдельный запрос, поэтому
+        неоднозначный псевдоним относится ко всем своим таблицам, а неквалифицированное
+        имя, общее для нескольких таблиц, пропускается: владельца по тексту не определить.
+        Проверки — поиск в множествах колонок, без прохода по тексту на каждую колонку.
         """
-        # Регулярное выражение для поиска комментариев
-        comment_pattern = re.compile(r'(?:--.*?$)|(?:/\*.*?\*/)', flags=re.MULTILINE | re.DOTALL)
+        columns: Set[Tuple[str, str]] = set()
+        if not aliases:
+            return columns
+        for qualifier, column in qualified:
+            for table_key in aliases.get(qualifier, (qualifier,) if qualifier in self.table_matcher else ()):
+                if column in self._columns(table_key):
+                    columns.add((table_key, column))
+        owners: Dict[str, List[str]] = {}
+        for table_key in set().union(*aliases.values()):
+            for column in self._columns(table_key).intersection(bare):
+                owners.setdefault(column, []).append(table_key)
+        columns.update((table_keys[0], column) for column, table_keys in owners.items() if len(table_keys) == 1)
+        return columns
 
-        # Функция для обработки совпадений
-        def replacer(match):
-            comment = match.group(0)
-            # Удаляем все HTML-теги внутри комментария
-            clean_comment = re.sub(r'<[^>]+>', '', comment)
-            # Оборачиваем в <span class="sql-comment">
-            return f'<span class="sql-comment">{clean_comment.strip()}</span>'
+    def _columns(self, table_key: str) -> FrozenSet[str]:
+        columns = self.table_columns.get(table_key)
+        if columns is None:
+            columns = self.table_columns[table_key] = frozenset(
+                column.lower() for column in self.tables[table_key].colum_names)
+        return columns
 
-        # Заменяем все комментарии за один проход
-        text = comment_pattern.sub(replacer, text)
+    def _plain(self, text: str, deadline: Optional[float] = None) -> Result:
+        """
+        Запасной вариант без подсветки: экранированный текст, а зависимости, кандидаты
+        и идентификаторы ищутся линейным проходом регулярных выражений по словам, включая
+        комментарии. Текст просматривается кусками по FALLBACK_CHUNK_SIZE, разрезанными
+        между словами; после deadline просмотр прекращается и текст только экранируется.
+        Колонки в этом режиме не разрешаются.
+        """
+        candidates: Set[str] = set()
+        identifiers: Set[str] = set()
+        position = 0
+        while position < len(text):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            boundary = SEPARATOR_PATTERN.search(text, position + FALLBACK_CHUNK_SIZE)
+            end = boundary.start() if boundary else len(text)
+            part = text[position:end].lower()
+            identifiers.update(WORD_PATTERN.findall(part))
+            candidates.update(f"{schema}.{name}" for schema, name in QUALIFIED_PATTERN.findall(part))
+            position = end
+        return (escape(text, quote=False),
+                {key for key in candidates if key in self.function_matcher},
+                {key for key in candidates if key in self.table_matcher},
+                candidates, identifiers, set())
 
-        # Удаляем лишние пустые строки
-        text = re.sub(r'\n\s*\n', '\n', text)
+    def _table_link(self, key: str, text: str) -> str:
+        """
+        Ссылка на страницу таблицы с подсказкой о колонках.
+        Колонки берутся подсказкой из блока метаданных страницы по ключу data-table.
+        """
+        tbl = self.tables[key]
+        return (
+            f'<a href="../tables/{tbl}.html" target="content" class="table-link">'
+            f'<span class="table-tooltip" data-table="{escape(key)}">'
+            f'{escape(text, quote=False)}'
+            f'</span>'
+            f'</a>'
+        )
+
+    def _function_link(self, key: str) -> str:
+        """
+        Ссылка на текстовую страницу другой функции.
+        """
+        func = self.functions[key]
+        f_full = f"{func.schema}.{func.name}"
+        return (
+            f'<a href="{f_full}_text.html" target="content" class="function-link">'
+            f'{f_full}'
+            f'</a>'
+        )
 
-        return text
 
+# Процессор, построенный в процессе-воркере пула
+_worker_processor: Optional[SQLProcessor] = None
 
 
+def _init_worker(tables: Dict[str, 'SQLTable'], function_names: Dict[str, 'SQLObject'],
+                 max_definition_size: int, time_budget: float) -> None:
+    global _worker_processor
+    _worker_processor = SQLProcessor(tables=tables, functions=function_names,
+                                     max_definition_size=max_definition_size, time_budget=time_budget)
 
 
+def _highlight_chunk(chunk: List[Task]) -> List[Timed]:
+    return [_worker_processor.highlight_timed(text, arguments) for _, text, arguments in chunk]
@@ -0,0 +1,85 @@
+from typing import Dict, List, Set, Tuple
+
+from model.SQLFunction import SQLFunction
+from model.SQLTable import SQLTable
+
+# Число первых символов термина, по которым термины раскладываются по шардам.
+# Поиск начинается с запроса такой длины, поэтому более короткие термины не индексируются.
+SHARD_PREFIX_LENGTH = 2
+
+# Слова PL/pgSQL и типы, которые есть почти в каждой функции и только засоряют выдачу
+STOP_WORDS = frozenset((
+    'create', 'table', 'and', 'or', 'not', 'null', 'is', 'in', 'on', 'as', 'by', 'if', 'then', 'else',
+    'elsif', 'end', 'begin', 'declare', 'return', 'returns', 'language', 'plpgsql', 'sql', 'function', 'replace',
+    'loop', 'for', 'while', 'into', 'values', 'set', 'with', 'case', 'when', 'distinct', 'exists',
+    'perform', 'execute', 'raise', 'notice', 'exception', 'others', 'true', 'false', 'void',
+    'volatile', 'stable', 'immutable', 'security', 'definer', 'integer', 'int', 'bigint', 'numeric',
+    'text', 'varchar', 'date', 'timestamp', 'boolean', 'count', 'sum', 'max', 'min', 'coalesce',
+))
+
+# Виды объектов и причины попадания в выдачу
+FUNCTION, TABLE = 'f', 't'
+NAME, COLUMN, REFERENCE = 'n', 'c', 'r'
+
+Entry = Tuple[str, str, str]
+
+
+def shard_name(term: str) -> str:
+    """
+    Имя шарда термина: коды первых символов, чтобы имя файла не зависело от алфавита.
+    js/search.js вычисляет его так же.
+    """
+    return "search_" + "_".join(format(ord(char), 'x') for char in term[:SHARD_PREFIX_LENGTH])
+
+
+class SQLSearchIndex:
+    def __init__(self, terms: Dict[str, Set[Entry]]):
+        """
+        Инвертированный индекс для поиска по префиксу в браузере.
+        terms: термин (в нижнем регистре) -> объекты (вид, отображаемое имя, причина):
+        вид 'f' — функция, 't' — таблица; причина 'n' — имя объекта,
+        'c' — колонка таблицы, 'r' — идентификатор в коде функции.
+        Термины раскладываются по шардам по первым символам, поэтому браузер
+        загружает только шард введённого префикса, а не весь каталог.
+        """
+        self.terms = terms
+
+    @classmethod
+    def build(cls, functions: Dict[str, 'SQLFunction'], tables: Dict[str, 'SQLTable']) -> 'SQLSearchIndex':
+        """
+        Строит индекс по результатам SQLProcessor.perform_all: имена функций и таблиц,
+        колонки таблиц и идентификаторы из кода функций.
+        """
+        terms: Dict[str, Set[Entry]] = {}
+        # Имена схем встречаются почти в каждой функции и сами по себе ничего не находят
+        schemas = {func.schema.lower() for func in functions.values()}
+        schemas.update(table.schema.lower() for table in tables.values())
+
+        def add(term: str, entry: Entry) -> None:
+            if len(term) >= SHARD_PREFIX_LENGTH and term not in STOP_WORDS:
+                terms.setdefault(term, set()).add(entry)
+
+        for func in functions.values():
+            name = str(func)
+            own_name = func.name.lower()
+            add(own_name, (FUNCTION, name, NAME))
+            for identifier in func.identifiers:
+                if identifier != own_name and identifier not in schemas:
+                    add(identifier, (FUNCTION, name, REFERENCE))
+
+        for table in tables.values():
+            name = str(table)
+            add(table.name.lower(), (TABLE, name, NAME))
+            for column in table.colum_names:
+                add(column.lower(), (TABLE, name, COLUMN))
+
+        return cls(terms)
+
+    def shards(self) -> Dict[str, Dict[str, List[List[str]]]]:
+        """
+        Шарды индекса: имя шарда -> {термин: отсортированные объекты}.
+        """
+        shards: Dict[str, Dict[str, List[List[str]]]] = {}
+        for term in sorted(self.terms):
+            shards.setdefault(shard_name(term), {})[term] = [list(entry) for entry in sorted(self.terms[term])]
+        return shards
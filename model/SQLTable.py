@@ -1,23 +1,42 @@
-from typing import List, Dict
+import json
+from typing import Tuple, Optional
 from model.SQLObject import SQLObject
 
 
 class SQLTable(SQLObject):
-    all_tables: Dict[str, 'SQLTable'] = {}
-    table_names: List[str] = []
+    __slots__ = ('colum_names', 'data_types', '_metadata_json')
 
-    def __init__(self, schema_name: str, table_name: str, columns: List[str], data_types: List[str]):
+    def __init__(self, schema_name: str, table_name: str, columns: Tuple[str, ...], data_types: Tuple[str, ...]):
+        """
+        Таблица каталога. Списки колонок и типов — кортежи; при загрузке через SQLCatalog
+        одинаковые кортежи и строки разделяются между таблицами.
+        Реестр всех таблиц хранит SQLCatalog, а не сам класс.
+        """
         super().__init__(name=table_name, schema_name=schema_name)
-        self.schema_name = schema_name
-        self.table_name = table_name
-        self.colum_names: List[str] = columns
-        self.data_types: List[str] = data_types
-        SQLTable.table_names.append(str(self))
-        SQLTable.all_tables[str(self)] = self
+        self.colum_names: Tuple[str, ...] = tuple(columns)
+        self.data_types: Tuple[str, ...] = tuple(data_types)
+        self._metadata_json: Optional[str] = None
+
+    @property
+    def schema_name(self) -> str:
+        return self.schema
+
+    @property
+    def table_name(self) -> str:
+        return self.name
+
+    @property
+    def metadata_json(self) -> str:
+        """
+        Колонки и типы для подсказки в JSON; сериализуются один раз на таблицу.
+        """
+        if self._metadata_json is None:
+            self._metadata_json = json.dumps({"columns": self.colum_names, "types": self.data_types},
+                                             ensure_ascii=False, separators=(',', ':'))
+        return self._metadata_json
 
     def __str__(self) -> str:
         return f"{self.schema}.{self.name}"
 
     def __repr__(self) -> str:
         return f"{self.schema}.{self.name}"
-
@@ -1,111 +1,74 @@
+import io
 import os
+import json
+from html import escape
 import time
-import hashlib
-from typing import List, Dict
+import argparse
+from typing import List, Dict, Optional
 
 from model.SQLFunction import SQLFunction
 from model.SQLTable import SQLTable
-from utils.dataloader import load_functions, load_tables
-from model.SQLProcessor import SQLProcessor
+from model.SQLCatalog import SQLCatalog
+from utils.dataloader import load_functions, load_tables, iter_definitions
+from utils.dbextract import extract_catalog, extract_delta, connect_dsn
+from model.SQLProcessor import SQLProcessor, DEFAULT_MAX_DEFINITION_SIZE, DEFAULT_TIME_BUDGET
+from model.SQLCallGraph import SQLCallGraph, DEFAULT_MAX_DEPTH, DEFAULT_MAX_FANOUT
+from utils.cache import AnalysisCache
+from utils.pagewriter import PageWriter
+from utils.profiler import Profiler, python_profile
+from utils.shards import SHARDS_DIR, parse_shard, select_schemas, save_shard, load_shards
+from model.SQLDependencyIndex import SQLDependencyIndex
+from model.SQLSearchIndex import SQLSearchIndex
+
+
+def table_metadata_block(func: SQLFunction, tables: Dict[str, 'SQLTable']) -> str:
+    """
+    Блок с колонками и типами всех таблиц, упомянутых в функции, — по одному разу на таблицу.
+    tooltip.js ищет в нём таблицу по ключу из атрибута data-table.
+    """
+    entries = ",".join(f'{json.dumps(key, ensure_ascii=False)}:{tables[key].metadata_json}' for key in sorted(func.called_tables))
+    # "</" внутри JSON закрыл бы тег script раньше времени
+    return ('<script type="application/json" id="table-metadata">{' + entries.replace("</", "<\\/") + '}</script>')
 
 
-def generate_dependency_graph(func: SQLFunction, functions: Dict[str, SQLFunction], output_dir: str = 'output') -> None:
+def generate_dependency_graph(func: SQLFunction, key: str, name: str, call_graph: SQLCallGraph,
+                              writer: PageWriter, output_dir: str = 'output') -> None:
     """
     Генерирует граф зависимостей для функции, включая вызванные функции и таблицы,
     с отображением стилей Mermaid и легендой цветов для схем.
+    Строки графа берутся из общего для всего каталога SQLCallGraph с его ограничениями
+    глубины и ширины; дальнейшие уровни js/graph.js догружает из манифестов смежности
+    (write_graph_manifests) по щелчку на узле.
+    key — ключ функции в каталоге, name — её отображаемое имя.
     """
-
-    visited_functions = set()  # Для предотвращения зацикливания
-    graph_lines = []  # Линии графа для Mermaid
-    schema_colors = {}  # Цвета для схем
-    node_schema = {}  # Словарь для хранения схем каждого узла
-
-    def get_color(schema: str) -> str:
-        """Генерация цвета на основе схемы."""
-        hash_obj = hashlib.md5(schema.encode('utf-8'))
-        return f"#{hash_obj.hexdigest()[:6]}"
-
-    def get_text_color(hex_color: str) -> str:
-        """
-        Определяет цвет текста (белый или чёрный) в зависимости от яркости фона.
-        Используется формула вычисления относительной яркости.
-        """
-        hex_color = hex_color.lstrip('#')
-        r = int(hex_color[0:2], 16)
-        g = int(hex_color[2:4], 16)
-        b = int(hex_color[4:6], 16)
-        # Вычисление относительной яркости по стандартной формуле
-        brightness = (r * 299 + g * 587 + b * 114) / 1000
-        # Порог яркости 128 для определения тёмного или светлого цвета
-        return "#FFFFFF" if brightness < 128 else "#000000"
-
-    def process_function(current_func: SQLFunction):
-        if str(current_func) in visited_functions:
-            return
-
-        visited_functions.add(str(current_func))
-
-        # Разделяем имя функции на схему и имя
-        schema, _, name = str(current_func).partition('.')
-        graph_lines.append(f"{name}(({name}))")
-        node_schema[name] = schema  # сохраняем схему для узла
-        if schema not in schema_colors:
-            schema_colors[schema] = get_color(schema)
-
-        # Обработка таблиц
-        for table in current_func.called_tables:
-            table_schema, _, table_name = table.partition('.')
-            graph_lines.append(f"{name} --> {table_name}[{table_name}]")
-            node_schema[table_name] = table_schema  # сохраняем схему для таблицы
-            if table_schema not in schema_colors:
-                schema_colors[table_schema] = get_color(table_schema)
-
-        # Обработка вызовов функций
-        for called_func_name in current_func.called_functions:
-            if called_func_name in functions:
-                called_func = functions[called_func_name]
-                called_schema, _, called_name = str(called_func).partition('.')
-                graph_lines.append(f"{name} --> {called_name}")
-                if called_schema not in schema_colors:
-                    schema_colors[called_schema] = get_color(called_schema)
-                process_function(called_func)  # рекурсивная обработка вызванной функции
-
-    # Начало обработки с корневой функции
-    process_function(func)
-
-    # Добавление инструкций стилей для каждого узла после определения структуры графа
-    for node, schema in node_schema.items():
-        bg_color = schema_colors.get(schema, "#FFFFFF")  # цвет фона по умолчанию белый
-        text_color = get_text_color(bg_color)            # определение цвета текста
-        # Добавляем инструкцию стиля для узла с установкой цвета заливки и текста
-        graph_lines.append(
-            f"style {node} fill:{bg_color},stroke:#333,stroke-width:2px,color:{text_color}"
-        )
+    graph_lines, schema_colors, state = call_graph.mermaid(key)
 
     # Формируем Mermaid-граф
     graph_content = "\n".join(graph_lines)
 
     # Создание легенды
     legend_content = "\n".join(
-        [f'<div style="display:inline-block; padding:5px; background-color:{color}; color:white; margin:5px; border-radius:5px;">{schema}</div>'
+        [f'<div style="display:inline-block; padding:5px; background-color:{color}; color:white; margin:5px; border-radius:5px;">{escape(schema)}</div>'
          for schema, color in schema_colors.items()]
     )
+    shown = sum(1 for entry in state["names"].values() if entry[3])
+    if shown < state["reachable"]:
+        legend_content += (f'\n<span class="graph-limit">Показано функций: {shown} из {state["reachable"]}. '
+                           'Узлы с пунктирной рамкой раскрываются щелчком.</span>')
+    # "</" внутри JSON закрыл бы тег script раньше времени
+    state_json = json.dumps(state, ensure_ascii=False, separators=(',', ':')).replace("</", "<\\/")
 
-    # Обновлённый HTML-контент с интеграцией zoom-container и zoom-content
-    # ... предыдущий код функции generate_dependency_graph ...
-
-    # Обновлённый HTML-контент с интеграцией zoom-container и zoom-content
     html_content = f"""<!DOCTYPE html>
     <html lang="ru">
     <head>
         <meta charset="UTF-8">
-        <title>{str(func)} - Граф зависимостей</title>
+        <title>{name} - Граф зависимостей</title>
         <link rel="stylesheet" href="../../css/graph.css">
         <!-- Подключение Mermaid.js -->
         <script src="../../libs/js/mermaid.min.js"></script> 
         <script>
             document.addEventListener("DOMContentLoaded", function() {{
-                mermaid.initialize({{ startOnLoad: true }});
+                mermaid.initialize({{ startOnLoad: true, maxEdges: 5000 }});
             }});
         </script>
     </head>
@@ -120,7 +83,7 @@ def generate_dependency_graph(func: SQLFunction, functions: Dict[str, SQLFunctio
             <div class="switch-container">
                 <a id="mode-button"
                    class="switch-button"
-                   href="{str(func)}_text.html">
+                   href="{name}_text.html">
                     Переключить на текст
                 </a>
             </div>
@@ -134,62 +97,60 @@ def generate_dependency_graph(func: SQLFunction, functions: Dict[str, SQLFunctio
             </div>
         </div>
 
+        <script type="application/json" id="graph-state">{state_json}</script>
         <script src="../../js/zoom-script.js"></script>
+        <script src="../../js/graph.js"></script>
         <script src="../../js/frames.js" defer></script>
     </body>
     </html>
     """
 
-    # Убедимся, что директория для вывода существует
-    os.makedirs(output_dir, exist_ok=True)
-
     # Сохранение HTML-файла
-    output_path = os.path.join(output_dir, f"{str(func)}_visual.html")
-    try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
-        print(f"Граф для функции {str(func)} успешно сохранён в {output_path}")
-    except Exception as e:
-        print(f"Ошибка при сохранении графа для функции {str(func)}: {e}")
+    writer.write(os.path.join(output_dir, f"{name}_visual.html"), html_content)
+
+
+def write_graph_manifests(call_graph: SQLCallGraph, writer: PageWriter, output_dir: str) -> None:
+    """
+    Пишет манифесты смежности по схемам в output/manifest/graph_*.js (JSONP, как и манифесты меню):
+    из них страница графа раскрывает узлы, не показанные из-за ограничений глубины и ширины.
+    """
+    for name, manifest in call_graph.adjacency().items():
+        writer.write(os.path.join(output_dir, "manifest", f"{name}.js"),
+                     f"loadManifest({json.dumps(name)}, {json.dumps(manifest, ensure_ascii=False, separators=(',', ':'))});\n")
 
 
 def generate_function_htmls(functions: Dict[str, 'SQLFunction'],
                             tables: Dict[str, 'SQLTable'],
+                            table_callers: Dict[str, Dict[str, List['SQLFunction']]],
+                            writer: PageWriter,
                             output_dir="output",
                             index_file="index.html"):
     """
     Генерирует HTML-страницу со списком функций и таблиц, сгруппированных по схемам (слева),
     а также iframe (справа). Добавлены кнопки "Свернуть все", "Развернуть все" и переключения визуализации.
+    table_callers — обратный индекс SQLProcessor: таблица -> схема -> вызывающие функции.
+    Страницы функций и таблиц генерируют generate_html_text_page, generate_dependency_graph
+    и generate_table_html_page.
     """
-    print(f"Создаём директории под странички, если их нет")
-    os.makedirs(output_dir, exist_ok=True)
-    functions_output_dir = os.path.join(output_dir, "functions")
-    os.makedirs(functions_output_dir, exist_ok=True)
-    table_output_dir = os.path.join(output_dir, "tables")
-    os.makedirs(table_output_dir, exist_ok=True)
-
-    # Генерация HTML-страниц для каждой функции
+    # Сгруппированные функции по схемам: (имя, число перегрузок)
+    schema_functions: Dict[str, List[list]] = {}
     for func in functions.values():
-        generate_html_text_page(func, functions_output_dir)
+        schema_functions.setdefault(func.schema, []).append([func.name, func.overload])
 
-    # Генерация HTML-страниц для каждой таблицы
+    # Сгруппированные таблицы по схемам: (имя, число использующих функций)
+    schema_tables: Dict[str, List[list]] = {}
     for table_name, table in tables.items():
-        generate_table_html_page(table, functions, table_output_dir)
-
-    # Сгруппированные функции по схемам
-    schema_functions: Dict[str, List[SQLFunction]] = {}
-    for func in functions.values():
-        schema_functions.setdefault(func.schema, []).append(func)
+        callers_count = sum(len(callers) for callers in table_callers.get(table_name, {}).values())
+        schema_tables.setdefault(table.schema, []).append([table.name, callers_count])
 
-    # Сгруппированные таблицы по схемам
-    schema_tables: Dict[str, List[SQLTable]] = {}
-    for table in tables.values():
-        schema_tables.setdefault(table.schema_name, []).append(table)
+    function_headers = write_schema_manifests("functions", schema_functions, f"{output_dir}/functions",
+                                              writer, output_dir)
+    table_headers = write_schema_manifests("tables", schema_tables, f"{output_dir}/tables", writer, output_dir)
 
     print(f"Формируем главный файл '{index_file}'.")
     try:
-        with open(index_file, "w", encoding="utf-8") as f:
-            f.write("""<!DOCTYPE html>
+        with io.StringIO() as f:
+            f.write(f"""<!DOCTYPE html>
 <html lang="ru">
 <head>
     <meta charset="UTF-8">
@@ -198,6 +159,7 @@ def generate_function_htmls(functions: Dict[str, 'SQLFunction'],
     <link rel="stylesheet" href="css/stylefunc.css">
     <link rel="stylesheet" href="css/switchmode.css">
     <script src="js/leftmenu.js" defer></script>
+    <script src="js/search.js" defer></script>
     <script src="js/switchmode.js" defer></script> 
 </head>
 <body>
@@ -208,44 +170,15 @@ def generate_function_htmls(functions: Dict[str, 'SQLFunction'],
             <button id="expand-all" onclick="expandAll()">Развернуть все</button>
             <button id="collapse-all" onclick="collapseAll()">Свернуть все</button>
         </div>
-        <div id="schema-list">
+        <div id="schema-list" data-manifest-dir="{output_dir}/manifest">
+            <input type="search" id="search-box" placeholder="Поиск: функция, таблица, колонка" autocomplete="off">
+            <div id="search-results"></div>
 """)
-            # Генерация списка функций
+            # Только заголовки схем: списки подгружает leftmenu.js при раскрытии схемы
             f.write("<h2>Список функций</h2>\n")
-            for schema_name, schema_functions_list in schema_functions.items():
-                f.write(f"""
-            <div class="schema">
-                <div class="schema-header" onclick="toggleSchema('{schema_name}_functions')">{schema_name}</div>
-                <ul class="function-list" id="list-{schema_name}_functions">
-""")
-                for function in schema_functions_list:
-                    overload_text = f" ({function.overload})" if function.overload > 1 else ""
-                    f.write(
-                        f'                    <li><a href="{output_dir}/functions/{str(function)}_text.html" target="content" class="function-link" data-function="{str(function)}">'
-                        f'{function.name}{overload_text}</a></li>\n'
-                    )
-                f.write("""
-                </ul>
-            </div>
-""")
-
-            # Генерация списка таблиц
+            f.write(function_headers)
             f.write("<h2>Список таблиц</h2>\n")
-            for schema_name, schema_tables_list in schema_tables.items():
-                f.write(f"""
-            <div class="schema">
-                <div class="schema-header" onclick="toggleSchema('{schema_name}_tables')">{schema_name}</div>
-                <ul class="table-list" id="list-{schema_name}_tables">
-""")
-                for table in schema_tables_list:
-                    f.write(
-                        f'                    <li><a href="output/tables/{str(table)}.html" target="content" class="table-link" data-table="{str(table)}">'
-                        f'{table.name}</a></li>\n'
-                    )
-                f.write("""
-                </ul>
-            </div>
-""")
+            f.write(table_headers)
             f.write("""
         </div>
     </nav>
@@ -253,20 +186,57 @@ def generate_function_htmls(functions: Dict[str, 'SQLFunction'],
 </body>
 </html>
 """)
+            writer.write(index_file, f.getvalue())
     except Exception as e:
-        print(f"Ошибка при записи главной страницы {index_file}: {e}")
+        writer.fail(index_file, e)
+
 
-    print(f"Готово. Все HTML-страницы сгенерированы в директории: '{output_dir}'.")
+def write_search_index(functions: Dict[str, 'SQLFunction'], tables: Dict[str, 'SQLTable'],
+                       writer: PageWriter, output_dir: str) -> None:
+    """
+    Пишет шарды поискового индекса в output/manifest/search_*.js (JSONP, как и манифесты меню).
+    """
+    base = {"f": f"{output_dir}/functions", "t": f"{output_dir}/tables"}
+    shards = SQLSearchIndex.build(functions, tables).shards()
+    for name, terms in shards.items():
+        shard = {"base": base, "terms": terms}
+        writer.write(os.path.join(output_dir, "manifest", f"{name}.js"),
+                     f"loadManifest({json.dumps(name)}, {json.dumps(shard, ensure_ascii=False, separators=(',', ':'))});\n")
+    print(f"Поисковый индекс: {sum(len(terms) for terms in shards.values())} терминов в {len(shards)} шардах.")
+
+
+def write_schema_manifests(kind: str, schemas: Dict[str, List[list]], base: str,
+                           writer: PageWriter, output_dir: str) -> str:
+    """
+    Пишет манифест каждой схемы в output/manifest/{kind}_{номер}.js и возвращает HTML заголовков схем.
+    Манифест — JS-файл с вызовом loadManifest (JSONP), поэтому документация
+    работает и при открытии с диска (file://), где fetch недоступен.
+    Записи — пары [имя, число]: перегрузки для функций, использующие функции для таблиц.
+    """
+    headers = []
+    for number, (schema_name, entries) in enumerate(schemas.items()):
+        manifest_name = f"{kind}_{number}"
+        manifest = {"schema": schema_name, "kind": kind, "base": base, "entries": entries}
+        path = os.path.join(output_dir, "manifest", f"{manifest_name}.js")
+        writer.write(path, f"loadManifest({json.dumps(manifest_name)}, "
+                           f"{json.dumps(manifest, ensure_ascii=False, separators=(',', ':'))});\n")
+        headers.append(f"""
+            <div class="schema">
+                <div class="schema-header" title="Объектов: {len(entries)}">{escape(schema_name)}</div>
+                <div class="virtual-list {kind[:-1]}-list" data-manifest="{manifest_name}" style="display: none;"><ul></ul></div>
+            </div>
+""")
+    return "".join(headers)
 
 
-def generate_html_text_page(func: SQLFunction, output_dir: str) -> None:
+def generate_html_text_page(func: SQLFunction, name: str, tables: Dict[str, 'SQLTable'], writer: PageWriter,
+                            output_dir: str) -> None:
     """
-    Генерирует HTML-страницу функции с кнопкой переключения режима.
+    Генерирует текстовую HTML-страницу функции с кнопкой переключения на граф.
     """
-    # Генерация текстовой страницы
-    text_html_path = os.path.join(output_dir, f"{str(func)}_text.html")
+    text_html_path = os.path.join(output_dir, f"{name}_text.html")
     try:
-        with open(text_html_path, "w", encoding="utf-8") as f:
+        with io.StringIO() as f:
             f.write(f"""<!DOCTYPE html>
         <html lang="ru">
         <head>
@@ -274,69 +244,50 @@ def generate_html_text_page(func: SQLFunction, output_dir: str) -> None:
             <meta name="viewport" content="width=device-width, initial-scale=1.0">
             <link rel="stylesheet" href="../../css/stylefunc.css">
             <script src="../../js/tooltip.js"></script>
-            <title>{str(func)}</title>
+            <title>{name}</title>
         </head>
         <body style="margin: 0; padding: 0;">
             <div class="header">                
 <div class="switch-container" style="float: right;">
     <a id="mode-button" 
        class="switch-button" 
-       href="{str(func)}_visual.html" 
+       href="{name}_visual.html" 
        >
         Переключить на визуализацию
     </a>
 </div>   
-            <h1>{str(func)}</h1>
+            <h1>{name}</h1>
            </div>
             <pre>{func.function_definition}</pre>
-            
+            {table_metadata_block(func, tables)}
             <script src="../../js/frames.js" defer></script>
         </body>
         </html>
     """)
+            writer.write(text_html_path, f.getvalue())
     except Exception as e:
-        print(f"Ошибка при записи файлов для функции {str(func)}: {e}")
+        writer.fail(text_html_path, e)
 
-    # Генерация визуальной страницы
-    visual_html_path = os.path.join(output_dir, f"{str(func)}_visual.html")
-    try:
-        with open(visual_html_path, "w", encoding="utf-8") as f:
-            f.write(f"""<!DOCTYPE html>
-<html lang="ru">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <link rel="stylesheet" href="../../css/stylefunc.css">
-    <script src="../../js/frames.js" defer></script>
-    <title>{str(func)} - Визуализация</title>
-</head>
-<body>
-    <h1>{str(func)} - Визуализация</h1>
-    <div>Визуализация для функции {str(func)}</div>
-</body>
-</html>
-""")
-    except Exception as e:
-        print(f"Ошибка при записи файлов для функции {str(func)}: {e}")
 
-def generate_table_html_page(table: SQLTable, functions: Dict[str, 'SQLFunction'], output_dir: str):
+def generate_table_html_page(table: SQLTable, schema_functions: Dict[str, List['SQLFunction']], writer: PageWriter,
+                             output_dir: str, column_functions: Optional[Dict[str, List['SQLFunction']]] = None):
     """
     Генерирует HTML-страницу для таблицы с колонками (слева) и функциями (справа),
     сгруппированными по схемам. Если функции не найдены, выводится сообщение.
+    schema_functions — функции, использующие таблицу, из обратного индекса SQLProcessor,
+    column_functions — функции, ссылающиеся на каждую колонку (ключ — колонка в нижнем регистре).
     """
-    # Проверяем и создаём директорию, если её нет
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    table_file_path = os.path.join(output_dir, f"{str(table)}.html")
-    with open(table_file_path, 'w', encoding='utf-8') as f:
+    column_functions = column_functions or {}
+    name = str(table)
+    table_file_path = os.path.join(output_dir, f"{name}.html")
+    with io.StringIO() as f:
         # Формирование HTML с использованием многострочных строк
         f.write(f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{str(table)}</title>
+    <title>{name}</title>
     <link rel="stylesheet" href="../../css/stylefunc.css">
     <link rel="stylesheet" href="../../css/styletable.css">
     <script src="../../js/frames.js"></script>
@@ -350,15 +301,20 @@ def generate_table_html_page(table: SQLTable, functions: Dict[str, 'SQLFunction'
                 <tr>
                     <th>Column Name</th>
                     <th>Data Type</th>
+                    <th>Used In</th>
                 </tr>
             </thead>
             <tbody>
 """)
         # Заполнение данных о колонках таблицы
         for column_name, data_type in zip(table.colum_names, table.data_types):
+            users = "<br>".join(
+                f'<a href="../functions/{function}_text.html" target="content" class="function-link">{function}</a>'
+                for function in column_functions.get(column_name.lower(), [])) or "&mdash;"
             f.write(f"""                <tr>
                     <td>{column_name}</td>
                     <td>{data_type}</td>
+                    <td>{users}</td>
                 </tr>
 """)
         f.write("""            </tbody>
@@ -369,12 +325,6 @@ def generate_table_html_page(table: SQLTable, functions: Dict[str, 'SQLFunction'
         <ul class="functions-list">
 """)
 
-        # Группируем функции по схемам
-        schema_functions: Dict[str, List['SQLFunction']] = {}
-        for func_name, function in functions.items():
-            if str(table) in function.called_tables:
-                schema_functions.setdefault(function.schema, []).append(function)
-
         # Если функций не найдено
         if not schema_functions:
             f.write("""<p style="color: #d9534f; font-weight: bold;">Не найдено функций, где эта таблица используется явным образом.</p>
@@ -399,7 +349,7 @@ def generate_table_html_page(table: SQLTable, functions: Dict[str, 'SQLFunction'
 </body>
 </html>
 """)
-    print(f"HTML page generated for table '{table.name}' at {table_file_path}")
+        writer.write(table_file_path, f.getvalue())
 
 
 def format_elapsed_time(elapsed_time):
@@ -415,23 +365,236 @@ def format_elapsed_time(elapsed_time):
         return f"Генерация HTML завершена за {seconds:.2f} сек."
 
 
-if __name__ == "__main__":
-    start_time = time.perf_counter()
+def render_catalog(funcs: Dict[str, SQLFunction], tables: Dict[str, 'SQLTable'], sp: SQLProcessor,
+                   writer: PageWriter, args: argparse.Namespace, profiler: Profiler) -> None:
+    """
+    Общие страницы всего каталога по уже известным зависимостям функций: индекс зависимостей,
+    главная страница с манифестами меню, поиск, страницы таблиц и графы.
+    """
+    # Компактный индекс зависимостей для быстрых запросов cli.py --index
+    with profiler.stage("dependency_index"):
+        SQLDependencyIndex.build(funcs, tables).save(os.path.join("output", "dependency_index.json"))
+
+    with profiler.stage("render_index"):
+        generate_function_htmls(functions=funcs, tables=tables, table_callers=sp.table_callers, writer=writer,
+                                output_dir="output", index_file="index.html")
+        write_search_index(funcs, tables, writer, output_dir="output")
+
+    with profiler.stage("render_tables"):
+        for table_name, table in tables.items():
+            started = time.perf_counter()
+            generate_table_html_page(table, sp.table_callers.get(table_name, {}), writer,
+                                     output_dir=os.path.join("output", "tables"),
+                                     column_functions=sp.column_callers.get(table_name))
+            profiler.record("render_table", table_name, time.perf_counter() - started)
+
+    with profiler.stage("call_graph"):
+        call_graph = SQLCallGraph(functions=funcs, tables=tables, max_depth=args.graph_depth,
+                                  max_fanout=args.graph_fanout)
+    with profiler.stage("render_graphs"):
+        write_graph_manifests(call_graph, writer, output_dir="output")
+        for key, func in funcs.items():
+            started = time.perf_counter()
+            generate_dependency_graph(func, key, str(func), call_graph, writer, os.path.join("output", "functions"))
+            profiler.record("render_graph", key, time.perf_counter() - started)
+
+
+def main(args: argparse.Namespace, profiler: Profiler) -> None:
+    catalog = SQLCatalog()
+    # DDL каталога из файлов не держится в памяти: его потоково читает SQLProcessor.stream.
+    # Ссылки на функции разрешаются по всему каталогу, поэтому до первой страницы файлы функций
+    # разбираются ещё раз ради имён; это второе чтение (около 2 сек. на 440 МБ синтетической
+    # выгрузки) занимает меньше 1% времени подсветки тех же DDL
+    definitions = None
+    if args.dsn and args.delta:
+        print(f"Дельта-выгрузка каталога из БД (снимок {args.snapshot})...")
+        with profiler.stage("extract"):
+            _, stats = extract_delta(connect_dsn(args.dsn), args.snapshot, schemas=args.schemas,
+                                     workers=args.db_workers, catalog=catalog)
+        funcs, tables = catalog.functions, catalog.tables
+        for name, value in stats.items():
+            profiler.count(f"extract_{name}", value)
+        print(f"Функций: {stats['functions']} (выгружено заново {stats['functions_fetched']}, "
+              f"удалено {stats['functions_removed']}); таблиц: {stats['tables']} "
+              f"(выгружено заново {stats['tables_fetched']}, удалено {stats['tables_removed']}).")
+    elif args.dsn:
+        print("Выгрузка каталога из БД...")
+        with profiler.stage("extract"):
+            extract_catalog(connect_dsn(args.dsn), schemas=args.schemas, workers=args.db_workers, catalog=catalog)
+        funcs, tables = catalog.functions, catalog.tables
+        print(f"Выгружено {len(funcs)} функций и {len(tables)} таблиц.")
+    else:
+        print("Загрузка функций...")
+        with profiler.stage("load_functions"):
+            funcs = load_functions(jobs=args.jobs, catalog=catalog, definitions=False)
+            definitions = iter_definitions()
+        print(f"Загружено {len(funcs)} функций.")
+
+        print("Загрузка таблиц...")
+        with profiler.stage("load_tables"):
+            tables: Dict[str, SQLTable] = load_tables(jobs=args.jobs, catalog=catalog)
+        print(f"Загружено {len(tables)} таблиц.")
+    sharded = args.shard is not None or args.shard_schemas is not None
+    keys = None
+    if sharded:
+        shard_name, shard_schemas = select_schemas({func.schema for func in funcs.values()},
+                                                   shard=args.shard, names=args.shard_schemas)
+        keys = [key for key, func in funcs.items() if func.schema in shard_schemas]
+        print(f"Шард {shard_name}: схем {len(shard_schemas)}, функций {len(keys)}.")
+        # У каждого шарда свой кеш: его записи и страницы не пересекаются с другими шардами
+        cache_path = args.cache or os.path.join("output", SHARDS_DIR, f".{shard_name}.sqlite")
+    elif args.merge:
+        cache_path = args.cache or os.path.join("output", SHARDS_DIR, ".merge.sqlite")
+    else:
+        cache_path = args.cache or os.path.join("output", ".analysis_cache.sqlite")
+    cache: Optional[AnalysisCache] = None if args.no_cache else AnalysisCache(cache_path)
+    writer = PageWriter(workers=args.writers, cache=cache, profiler=profiler)
+    sp: SQLProcessor = SQLProcessor(tables=tables, functions=funcs, max_definition_size=args.max_definition_size,
+                                    time_budget=args.time_budget)
+    if args.merge:
+        # Зависимости берутся из результатов шардов, текстовые страницы шарды уже записали
+        with profiler.stage("merge_shards"):
+            missing_schemas = load_shards("output", funcs)
+            sp.index_callers()
+        if missing_schemas:
+            print(f"Нет результатов шардов для схем: {', '.join(missing_schemas)}")
+    else:
+        # Загрузка DDL -> подсветка -> страница -> запись: текстовая страница функции пишется,
+        # как только обработаны все её перегрузки, после чего HTML освобождается,
+        # а для индексов и графов остаются только зависимости. Страница графа строится
+        # отдельно в render_catalog: ей нужны зависимости всех функций каталога
+        with profiler.stage("stream_functions"):
+            for key, func in sp.stream(jobs=args.jobs, cache=cache, profiler=profiler, definitions=definitions,
+                                       keys=keys):
+                started = time.perf_counter()
+                generate_html_text_page(func, str(func), tables, writer, os.path.join("output", "functions"))
+                func.release_definition()
+                profiler.record("render_function", key, time.perf_counter() - started)
+
+    if sharded:
+        path = save_shard("output", shard_name, shard_schemas, {key: funcs[key] for key in keys})
+        print(f"Результат шарда сохранён в {path}; общие страницы соберёт запуск с --merge.")
+    else:
+        render_catalog(funcs, tables, sp, writer, args, profiler)
+    # Ожидание записи оставшихся в очереди страниц
+    with profiler.stage("render_flush"):
+        writer.close()
+
+    if cache is not None:
+        stale_pages = cache.remove_stale_pages()
+        print(f"Удалено устаревших страниц: {len(stale_pages)}")
+        cache.close()
 
-    print("Загрузка функций...")
-    funcs = load_functions()
-    print(f"Загружено {len(funcs)} функций.")
 
-    print("Загрузка таблиц...")
-    tables: Dict[str, SQLTable] = load_tables()
-    print(f"Загружено {len(tables)} таблиц.")
-    sp: SQLProcessor = SQLProcessor(tables=tables, functions=funcs)
-    sp.perform_all()
-    generate_function_htmls(functions=funcs, tables=tables, output_dir="output", index_file="index.html")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генерация HTML-документации по функциям и таблицам.")
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help="Количество процессов для подсветки функций (по умолчанию 1).")
+    parser.add_argument(
+        '--cache',
+        help="Файл кеша анализа для инкрементальной пересборки "
+             "(по умолчанию output/.analysis_cache.sqlite, у шардов и слияния — свой в output/shards).")
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Обработать все функции и перезаписать все страницы заново.")
+    parser.add_argument(
+        '-w', '--writers',
+        type=int,
+        default=8,
+        help="Количество потоков записи страниц (по умолчанию 8).")
+    parser.add_argument(
+        '--max-definition-size',
+        type=int,
+        default=DEFAULT_MAX_DEFINITION_SIZE,
+        help="Длина DDL перегрузки в символах, после которой он подсвечивается кусками "
+             f"(по умолчанию {DEFAULT_MAX_DEFINITION_SIZE}, 0 — без ограничения).")
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        default=DEFAULT_TIME_BUDGET,
+        help="Секунд на подсветку одной перегрузки; не успевший обработаться остаток выводится простым текстом "
+             f"(по умолчанию {DEFAULT_TIME_BUDGET:g}, 0 — без ограничения).")
+    parser.add_argument(
+        '--graph-depth',
+        type=int,
+        default=DEFAULT_MAX_DEPTH,
+        help=f"Уровней вызовов на странице графа (по умолчанию {DEFAULT_MAX_DEPTH}, 0 — все).")
+    parser.add_argument(
+        '--graph-fanout',
+        type=int,
+        default=DEFAULT_MAX_FANOUT,
+        help=f"Вызовов и таблиц у узла графа (по умолчанию {DEFAULT_MAX_FANOUT}, 0 — все).")
+    parser.add_argument(
+        '--dsn',
+        help="Строка подключения к Greenplum/PostgreSQL: каталог выгружается напрямую, без JSON в data/.")
+    parser.add_argument(
+        '--schemas',
+        nargs='+',
+        help="Вместе с --dsn: выгружаемые схемы (по умолчанию все пользовательские).")
+    parser.add_argument(
+        '--db-workers',
+        type=int,
+        default=4,
+        help="Вместе с --dsn: количество соединений для параллельной выгрузки схем (по умолчанию 4).")
+    parser.add_argument(
+        '--delta',
+        action='store_true',
+        help="Вместе с --dsn: выгружать полные определения только новых и изменённых объектов.")
+    parser.add_argument(
+        '--snapshot',
+        default=os.path.join("data", "snapshot"),
+        help="Каталог снимка для --delta (по умолчанию data/snapshot).")
+    sharding = parser.add_mutually_exclusive_group()
+    sharding.add_argument(
+        '--shard',
+        help="Обработать только схемы шарда k/N (схема попадает в шард по хешу имени); "
+             "текстовые страницы пишутся сразу, зависимости — в output/shards для --merge.")
+    sharding.add_argument(
+        '--shard-schemas',
+        nargs='+',
+        help="Как --shard, но шард задаётся списком схем.")
+    sharding.add_argument(
+        '--merge',
+        action='store_true',
+        help="Собрать результаты шардов из output/shards: главная страница, меню, поиск, таблицы и графы.")
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help="Замерять этапы, счётчики и самые медленные объекты; отчёт пишется в output/profile_report.json.")
+    parser.add_argument(
+        '--profile-cprofile',
+        action='store_true',
+        help="Вместе с --profile запустить cProfile (статистика в output/profile.pstats).")
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help="Вместе с --profile отслеживать память через tracemalloc.")
+    args = parser.parse_args()
+    if args.shard is not None:
+        try:
+            parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    start_time = time.perf_counter()
 
-    for _, func in funcs.items():
-        generate_dependency_graph(func, funcs, output_dir="output/functions")
+    # Каталоги создаются один раз до генерации страниц
+    PageWriter.make_dirs("output", os.path.join("output", "functions"), os.path.join("output", "tables"),
+                         os.path.join("output", "manifest"))
+    profiler = Profiler(enabled=args.profile or args.profile_cprofile or args.profile_memory)
+    cprofile_path = os.path.join("output", "profile.pstats") if args.profile_cprofile else None
+    with python_profile(profiler, cprofile_path=cprofile_path, memory=args.profile_memory):
+        main(args, profiler)
     end_time = time.perf_counter()
 
     elapsed_time = end_time - start_time
     print(format_elapsed_time(elapsed_time))
+    if profiler.enabled:
+        profiler.print_summary()
+        report_path = os.path.join("output", "profile_report.json")
+        profiler.save(report_path)
+        print(f"Отчёт профилирования сохранён в {report_path}")
@@ -0,0 +1,257 @@
+import os
+import time
+import argparse
+import posixpath
+import threading
+import mimetypes
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+from typing import Dict, List, Optional, Tuple
+
+from model.SQLFunction import SQLFunction
+from model.SQLTable import SQLTable
+from model.SQLCatalog import SQLCatalog
+from model.SQLProcessor import SQLProcessor
+from model.SQLCallGraph import SQLCallGraph
+from utils.dataloader import load_functions, load_tables
+from utils.cache import AnalysisCache, content_hash
+from utils.pagewriter import PageCollector
+from processing import (generate_function_htmls, write_search_index, write_graph_manifests,
+                        generate_html_text_page, generate_dependency_graph, generate_table_html_page)
+
+# Каталоги со статикой, которые отдаются с диска как есть
+STATIC_DIRS = ('css', 'js', 'libs')
+# Каталог, под которым страницы лежат при обычной генерации; ссылки в шаблонах ведут туда
+OUTPUT_DIR = "output"
+# Корень проекта: статика ищется в нём, а не в текущем каталоге процесса
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (содержимое, ETag)
+Page = Tuple[bytes, str]
+
+
+class DocumentationSite:
+    def __init__(self, functions: Dict[str, 'SQLFunction'], tables: Dict[str, 'SQLTable'],
+                 table_callers: Dict[str, Dict[str, List['SQLFunction']]],
+                 column_callers: Dict[str, Dict[str, List['SQLFunction']]], max_pages: int = 256):
+        """
+        Страницы документации, которые генерируются по запросу теми же функциями,
+        что и в processing.py, вместо записи всего сайта на диск.
+        Последние max_pages страниц функций и таблиц хранятся в LRU-кеше.
+        Главная страница, манифесты меню и графов и шарды поиска строятся один раз при первом запросе.
+        Страницы генерируются вне общей блокировки, поэтому запросы обслуживаются параллельно;
+        одновременные запросы одной страницы ждут одну генерацию (rendering).
+        """
+        self.functions = functions
+        self.tables = tables
+        self.table_callers = table_callers
+        self.column_callers = column_callers
+        self.call_graph = SQLCallGraph(functions=functions, tables=tables)
+        # Страницы называются по отображаемому имени объекта
+        self.function_keys: Dict[str, str] = {str(func): key for key, func in functions.items()}
+        self.table_keys: Dict[str, str] = {str(table): key for key, table in tables.items()}
+        self.max_pages = max_pages
+        self.pages: 'OrderedDict[str, Page]' = OrderedDict()
+        self.site_pages: Optional[Dict[str, Page]] = None
+        self.rendering: Dict[str, 'Future'] = {}
+        # lock защищает только LRU-кеш и rendering, site_lock — однократную сборку общих страниц
+        self.lock = threading.Lock()
+        self.site_lock = threading.Lock()
+
+    @staticmethod
+    def _page(content: str) -> Page:
+        return content.encode('utf-8'), f'"{content_hash(content)}"'
+
+    def _render_site(self) -> Dict[str, Page]:
+        collector = PageCollector()
+        generate_function_htmls(functions=self.functions, tables=self.tables, table_callers=self.table_callers,
+                                writer=collector, output_dir=OUTPUT_DIR, index_file="index.html")
+        write_search_index(self.functions, self.tables, collector, output_dir=OUTPUT_DIR)
+        write_graph_manifests(self.call_graph, collector, output_dir=OUTPUT_DIR)
+        return {path: self._page(content) for path, content in collector.pages.items()}
+
+    def _render(self, path: str) -> Optional[str]:
+        """Генерирует страницу функции, графа или таблицы; None, если такого объекта нет."""
+        collector = PageCollector()
+        directory, file_name = posixpath.split(path)
+        if directory == f"{OUTPUT_DIR}/functions":
+            if file_name.endswith("_text.html"):
+                name = file_name[:-len("_text.html")]
+                key = self.function_keys.get(name)
+                if key is None:
+                    return None
+                generate_html_text_page(self.functions[key], name, self.tables, collector, directory)
+            elif file_name.endswith("_visual.html"):
+                name = file_name[:-len("_visual.html")]
+                key = self.function_keys.get(name)
+                if key is None:
+                    return None
+                generate_dependency_graph(self.functions[key], key, name, self.call_graph, collector, directory)
+            else:
+                return None
+        elif directory == f"{OUTPUT_DIR}/tables" and file_name.endswith(".html"):
+            key = self.table_keys.get(file_name[:-len(".html")])
+            if key is None:
+                return None
+            generate_table_html_page(self.tables[key], self.table_callers.get(key, {}), collector, directory,
+                                     column_functions=self.column_callers.get(key))
+        else:
+            return None
+        if collector.errors:
+            raise RuntimeError(collector.errors[0][1])
+        return collector.pages.get(path)
+
+    def page(self, path: str) -> Optional[Page]:
+        """
+        Возвращает (содержимое, ETag) страницы по пути относительно корня сайта или None.
+        """
+        if self.site_pages is None:
+            with self.site_lock:
+                if self.site_pages is None:
+                    self.site_pages = self._render_site()
+        page = self.site_pages.get(path)
+        if page is not None:
+            return page
+
+        with self.lock:
+            page = self.pages.get(path)
+            if page is not None:
+                self.pages.move_to_end(path)
+                return page
+            future = self.rendering.get(path)
+            if future is None:
+                future = self.rendering[path] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            content = self._render(path)
+            page = None if content is None else self._page(content)
+        except Exception as e:
+            with self.lock:
+                del self.rendering[path]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.rendering[path]
+            if page is not None:
+                self.pages[path] = page
+                if len(self.pages) > self.max_pages:
+                    self.pages.popitem(last=False)
+        future.set_result(page)
+        return page
+
+
+class DocumentationHandler(BaseHTTPRequestHandler):
+    server: 'DocumentationServer'
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body: bool) -> None:
+        path = posixpath.normpath(unquote(urlsplit(self.path).path).lstrip('/') or "index.html")
+        if path.startswith('..') or path.startswith('/'):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        if path.split('/')[0] in STATIC_DIRS:
+            page = self._static(path)
+        else:
+            try:
+                page = self.server.site.page(path)
+            except Exception as e:
+                self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"Ошибка генерации страницы: {e}")
+                return
+        if page is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        body, etag = page
+        # Браузер перепроверяет страницу по ETag и при совпадении получает пустой ответ 304
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    @staticmethod
+    def _static(path: str) -> Optional[Page]:
+        path = os.path.join(ROOT_DIR, path)
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            return f.read(), f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+class DocumentationServer(ThreadingHTTPServer):
+    def __init__(self, address: Tuple[str, int], site: DocumentationSite):
+        super().__init__(address, DocumentationHandler)
+        self.site = site
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Локальный сервер документации: страницы генерируются по запросу, без записи файлов.")
+    parser.add_argument('--host', default="127.0.0.1", help="Адрес сервера (по умолчанию 127.0.0.1).")
+    parser.add_argument('-p', '--port', type=int, default=8000, help="Порт сервера (по умолчанию 8000).")
+    parser.add_argument(
+        '--pages',
+        type=int,
+        default=256,
+        help="Сколько последних страниц держать в памяти (по умолчанию 256).")
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help="Количество процессов для подсветки функций (по умолчанию 1).")
+    parser.add_argument(
+        '--cache',
+        help="Файл кеша анализа processing.py для быстрого старта; только читается (по умолчанию не используется).")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    catalog = SQLCatalog()
+    print("Загрузка функций...")
+    funcs = load_functions(jobs=args.jobs, catalog=catalog)
+    print(f"Загружено {len(funcs)} функций.")
+
+    print("Загрузка таблиц...")
+    tables: Dict[str, SQLTable] = load_tables(jobs=args.jobs, catalog=catalog)
+    print(f"Загружено {len(tables)} таблиц.")
+
+    cache: Optional[AnalysisCache] = AnalysisCache(args.cache, read_only=True) if args.cache else None
+    sp: SQLProcessor = SQLProcessor(tables=tables, functions=funcs)
+    sp.perform_all(jobs=args.jobs, cache=cache)
+    if cache is not None:
+        cache.close()
+
+    site = DocumentationSite(funcs, tables, sp.table_callers, sp.column_callers, max_pages=args.pages)
+    with DocumentationServer((args.host, args.port), site) as server:
+        print(f"Каталог готов за {time.perf_counter() - start_time:.2f} сек.")
+        print(f"Документация доступна по адресу http://{args.host}:{args.port}/ (Ctrl+C — остановить)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Сервер остановлен.")
@@ -0,0 +1,11 @@
+SELECT
+    n.nspname AS schema_name,
+    p.proname AS function_name,
+    p.oid::bigint AS oid,
+    pg_catalog.pg_get_function_result(p.oid) AS return_type,
+    pg_catalog.pg_get_function_arguments(p.oid) AS arguments,
+    pg_catalog.pg_get_functiondef(p.oid) AS function_definition
+FROM pg_proc p
+JOIN pg_namespace n ON p.pronamespace = n.oid
+WHERE p.oid = ANY('your_oid_list'::oid[])
+ORDER BY schema_name, function_name, oid;
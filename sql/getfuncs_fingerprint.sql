@@ -0,0 +1,16 @@
+SELECT
+    n.nspname AS schema_name,
+    p.proname AS function_name,
+    p.oid::bigint AS oid,
+    md5(concat_ws(E'\n',
+                  pg_catalog.pg_get_function_result(p.oid),
+                  pg_catalog.pg_get_function_arguments(p.oid),
+                  l.lanname,
+                  p.provolatile::text,
+                  p.prosecdef::text,
+                  p.prosrc)) AS fingerprint
+FROM pg_proc p
+JOIN pg_namespace n ON p.pronamespace = n.oid
+JOIN pg_language l ON p.prolang = l.oid
+WHERE n.nspname = 'your_schema_name'
+ORDER BY schema_name, function_name, oid;
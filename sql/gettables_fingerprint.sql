@@ -0,0 +1,12 @@
+SELECT
+    c.table_schema,
+    c.table_name,
+    md5(string_agg(c.column_name::text || ' ' || c.data_type::text, ',' ORDER BY c.ordinal_position)) AS fingerprint
+FROM information_schema.columns c
+WHERE c.table_schema = 'your_schema_name'
+  AND c.table_name NOT IN (
+      SELECT c.relname
+      FROM pg_inherits i
+      JOIN pg_class c ON i.inhrelid = c.oid
+  )
+GROUP BY c.table_schema, c.table_name;
@@ -0,0 +1,112 @@
+from model.SQLFunction import SQLFunction
+from model.SQLProcessor import SQLProcessor
+from model.SQLTable import SQLTable
+from utils.cache import AnalysisCache
+from utils.pagewriter import PageWriter
+
+
+def write_pages(cache_path, pages):
+    cache = AnalysisCache(cache_path)
+    writer = PageWriter(workers=2, cache=cache)
+    for path, content in pages.items():
+        writer.write(path, content)
+    writer.close()
+    cache.close()
+    return writer
+
+
+def test_failed_write_is_not_recorded_as_current(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "cache.sqlite")
+    page = tmp_path / "page.html"
+    write_pages(cache_path, {str(page): "old"})
+
+    def failing_open(*args, **kwargs):
+        raise OSError("disk full")
+
+    # Новая версия не записалась: на диске осталась старая страница
+    monkeypatch.setattr("utils.pagewriter.open", failing_open, raising=False)
+    assert write_pages(cache_path, {str(page): "new"}).errors
+    monkeypatch.undo()
+
+    writer = write_pages(cache_path, {str(page): "new"})
+    assert writer.written == 1
+    assert page.read_text(encoding="utf-8") == "new"
+
+
+def test_unchanged_page_is_skipped(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    page = str(tmp_path / "page.html")
+    assert write_pages(cache_path, {page: "same"}).written == 1
+    writer = write_pages(cache_path, {page: "same"})
+    assert (writer.written, writer.skipped) == (0, 1)
+
+
+def analyze_cached(cache_path, tables, definition):
+    functions = {'stg.load': SQLFunction('stg', 'load', 'void', [], definition)}
+    cache = AnalysisCache(cache_path)
+    SQLProcessor(tables=tables, functions=functions).perform_all(cache=cache)
+    cache.close()
+    return functions['stg.load']
+
+
+def test_cached_result_is_dropped_when_referenced_table_changes(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    orders = {'stg.orders': SQLTable('stg', 'orders', ('id', 'status'), ('integer',) * 2)}
+    definition = "SELECT status FROM stg.orders; SELECT * FROM dm.clients"
+    func = analyze_cached(cache_path, orders, definition)
+    assert func.called_tables == {'stg.orders'} and func.used_columns == {('stg.orders', 'status')}
+
+    # Таблицу удалили: ссылка из кеша стала бы битой
+    func = analyze_cached(cache_path, {}, definition)
+    assert func.called_tables == set() and 'table-link' not in func.function_definition
+
+    # Появилась таблица, которая упоминалась в тексте, но не была в каталоге
+    clients = {'dm.clients': SQLTable('dm', 'clients', ('id',), ('integer',))}
+    assert analyze_cached(cache_path, clients, definition).called_tables == {'dm.clients'}
+
+    # У таблицы поменялись колонки: колонки функции пересчитываются
+    renamed = {'stg.orders': SQLTable('stg', 'orders', ('id', 'state'), ('integer',) * 2)}
+    analyze_cached(cache_path, orders, definition)
+    assert analyze_cached(cache_path, renamed, definition).used_columns == set()
+
+
+def run_cached(cache_path, definition, read_only=False, **budget):
+    functions = {'stg.load': SQLFunction('stg', 'load', 'void', [], definition)}
+    processor = SQLProcessor(tables={}, functions=functions, **budget)
+    cache = AnalysisCache(cache_path, read_only=read_only)
+    processor.perform_all(cache=cache)
+    cache.close()
+    return processor.overruns
+
+
+def test_chunk_size_is_part_of_cache_key(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    definition = "SELECT 1;\n" * 20
+    assert run_cached(cache_path, definition, max_definition_size=100)
+    # Тот же размер куска: результат из кеша, перегрузка не обрабатывается заново
+    assert not run_cached(cache_path, definition, max_definition_size=100)
+    # Другие границы кусков дают другой HTML: кеш не подходит
+    assert run_cached(cache_path, definition, max_definition_size=150)
+    # DDL короче куска не зависит от его размера
+    short = "SELECT 1;\n"
+    run_cached(cache_path, short, max_definition_size=100)
+    cache = AnalysisCache(cache_path)
+    assert cache.lookup('stg.load()', short, [], set(), 1000) is not None
+    cache.close()
+
+
+def test_read_only_cache_is_not_modified(tmp_path):
+    cache_path = tmp_path / "cache.sqlite"
+    definition = "SELECT 1;\n" * 20
+    run_cached(str(cache_path), definition, max_definition_size=100)
+    content = cache_path.read_bytes()
+    # serve.py и cli.py со своим размером куска и другим DDL: кеш processing.py не меняется
+    assert run_cached(str(cache_path), definition, read_only=True, max_definition_size=150)
+    run_cached(str(cache_path), "SELECT 2;", read_only=True)
+    assert cache_path.read_bytes() == content
+    assert not run_cached(str(cache_path), definition, read_only=True, max_definition_size=100)
+    assert not run_cached(str(cache_path), definition, max_definition_size=100)
+    # Файла нет: кеш пустой, файл не создаётся
+    missing = tmp_path / "missing" / "cache.sqlite"
+    assert run_cached(str(missing), definition, read_only=True, max_definition_size=100)
+    assert not missing.parent.exists()
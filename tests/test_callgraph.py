@@ -0,0 +1,68 @@
+import time
+
+from model.SQLCallGraph import SQLCallGraph
+from model.SQLFunction import SQLFunction
+
+
+def make_graph(calls, **limits):
+    functions = {}
+    for key, called in calls.items():
+        schema, name = key.split('.')
+        functions[key] = SQLFunction(schema, name, 'void', [], '')
+        functions[key].called_functions = set(called)
+    return SQLCallGraph(functions, {}, **limits)
+
+
+def test_reachable_count_with_cycles():
+    # a -> b <-> c -> d, e не связана ни с кем
+    graph = make_graph({'s.a': ['s.b'], 's.b': ['s.c'], 's.c': ['s.b', 's.d'], 's.d': [], 's.e': []})
+    assert graph.reachable_count('s.a') == 4
+    assert graph.reachable_count('s.b') == 3
+    assert graph.reachable_count('s.c') == 3
+    assert graph.reachable_count('s.d') == 1
+    assert graph.reachable_count('s.e') == 1
+
+
+def test_reachable_count_ignores_view_limits():
+    # Цепочка длиннее max_depth: страница показывает часть, подпись — все функции
+    chain = {f's.f{i}': [f's.f{i + 1}'] for i in range(10)}
+    chain['s.f10'] = []
+    graph = make_graph(chain, max_depth=3)
+    _, _, state = graph.mermaid('s.f0')
+    functions, *_ = graph.view('s.f0')
+    assert len(functions) == 4
+    assert state['reachable'] == 11
+
+
+def test_mutual_calls_form_one_component():
+    graph = make_graph({'s.a': ['s.b'], 's.b': ['s.a', 's.c'], 's.c': ['s.c']})
+    assert graph.component_of['s.a'] == graph.component_of['s.b'] != graph.component_of['s.c']
+    assert graph.reachable_count('s.c') == 1
+
+
+def test_reachable_counts_on_long_chain_are_computed_once():
+    # Цепочка длиннее лимита рекурсии; обход с каждой страницы был бы квадратичным
+    size = 6000
+    chain = {f's.f{i}': [f's.f{i + 1}'] if i + 1 < size else [] for i in range(size)}
+    started = time.perf_counter()
+    graph = make_graph(chain)
+    counts = [graph.mermaid(key)[2]['reachable'] for key in chain]
+    assert counts == list(range(size, 0, -1))
+    assert time.perf_counter() - started < 1.5
+
+
+def test_node_ids_do_not_depend_on_other_objects():
+    calls = {'s.a': ['s.b'], 's.b': [], 's.c': []}
+    before = make_graph(calls)
+    del calls['s.a']
+    after = make_graph(calls)
+    assert after.node_ids['s.b'] == before.node_ids['s.b']
+    assert after.mermaid('s.b') == before.mermaid('s.b')
+    assert len(set(before.node_ids.values())) == 3
+
+
+def test_quoted_identifiers_are_escaped_in_mermaid():
+    graph = make_graph({'s"q.f<1>': []})
+    lines, _, _ = graph.mermaid('s"q.f<1>')
+    assert lines[0] == 'subgraph sg0["s#quot;q"]'
+    assert lines[1].endswith('(("f#lt;1#gt;"))')
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from utils.dataloader import iter_json_entries
+
+ENTRIES = [
+    {"schema": "stg", "name": "load", "definition": "SELECT '[', \"}\", 1 -- ]\n"},
+    {"schema": "Схема", "name": "загрузка", "definition": "x" * 100, "args": []},
+    {"schema": "dm", "name": "empty", "definition": ""},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 20])
+@pytest.mark.parametrize("layout", ["array", "lines", "bom"])
+def test_entries_are_read_across_chunk_boundaries(tmp_path, chunk_size, layout):
+    path = tmp_path / "functions.json"
+    if layout == "lines":
+        text = "\n".join(json.dumps(entry, ensure_ascii=False) for entry in ENTRIES) + "\n"
+    else:
+        text = json.dumps(ENTRIES, ensure_ascii=False, indent=2)
+    path.write_text(("\ufeff" if layout == "bom" else "") + text, encoding="utf-8")
+    assert list(iter_json_entries(str(path), chunk_size=chunk_size)) == ENTRIES
+
+
+def test_truncated_file_is_an_error(tmp_path):
+    path = tmp_path / "functions.json"
+    path.write_text(json.dumps(ENTRIES)[:-10], encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_entries(str(path), chunk_size=16))
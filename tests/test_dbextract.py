@@ -0,0 +1,192 @@
+import hashlib
+import json
+import sqlite3
+
+import pytest
+
+from utils.dbextract import ConnectionPool, SCHEMAS_SQL, fetch_rows, list_schemas, extract_catalog, extract_delta
+
+
+class FakeCursor:
+    """Курсор в духе psycopg2: параметры подставляются через %, описание колонок — после первой выборки."""
+
+    def __init__(self, connection, name=None):
+        self.connection = connection
+        self.name = name
+        self.description = None
+        self.rows = []
+
+    def execute(self, query, params=None):
+        if params is not None:
+            # Как psycopg: при переданных параметрах каждый % в тексте — плейсхолдер
+            query = query % tuple(repr(param) for param in params)
+        self.connection.queries.append(query)
+        self.rows = list(self.connection.results[query])
+        if self.name is None:
+            self.description = [(column,) for column in self.connection.columns]
+
+    def fetchmany(self, size):
+        self.connection.batches.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.description = [(column,) for column in self.connection.columns]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, results, columns):
+        self.results = results
+        self.columns = columns
+        self.queries = []
+        self.batches = []
+        self.cursors = []
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        cursor = FakeCursor(self, name)
+        self.cursors.append(cursor)
+        return cursor
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+def test_list_schemas_does_not_pass_params():
+    # С параметрами psycopg прочитал бы %' в LIKE 'pg\_%' как плейсхолдер
+    connection = FakeConnection({SCHEMAS_SQL: [('dm',), ('stg',)]}, ['nspname'])
+    with ConnectionPool(lambda: connection, size=1) as pool:
+        assert list_schemas(pool) == ['dm', 'stg']
+    assert connection.queries == [SCHEMAS_SQL]
+
+
+def test_fetch_rows_batches_with_named_cursor():
+    rows = [(i, f"f{i}") for i in range(7)]
+    connection = FakeConnection({"select": rows}, ['oid', 'name'])
+    result = list(fetch_rows(connection, "select", batch_size=3, name="extract"))
+    assert result == [{'oid': i, 'name': f"f{i}"} for i in range(7)]
+    assert connection.cursors[0].name == "extract"
+    assert connection.batches == [3, 3, 3, 3]
+    assert connection.rollbacks == 1
+
+
+def test_fetch_rows_falls_back_without_named_cursors(tmp_path):
+    # sqlite3 не знает именованных курсоров: cursor(name=...) падает с TypeError
+    connection = sqlite3.connect(str(tmp_path / "db.sqlite"))
+    connection.execute("CREATE TABLE t (a, b)")
+    connection.executemany("INSERT INTO t VALUES (?, ?)", [(i, i * i) for i in range(5)])
+    result = list(fetch_rows(connection, "SELECT a, b FROM t WHERE a >= ? ORDER BY a", (1,), batch_size=2,
+                             name="extract"))
+    assert result == [{'a': i, 'b': i * i} for i in range(1, 5)]
+
+
+CATALOG_QUERIES = {
+    'getfuncs.sql': "SELECT * FROM f WHERE schema_name = ? ORDER BY rowid",
+    'gettables.sql': "SELECT * FROM t WHERE table_schema = ? ORDER BY rowid",
+    'getfuncs_fingerprint.sql': "SELECT schema_name, function_name, rowid AS oid, "
+                                "md5(arguments || function_definition) AS fingerprint "
+                                "FROM f WHERE schema_name = ? ORDER BY rowid",
+    'getfuncs_by_oid.sql': "SELECT schema_name, function_name, rowid AS oid, return_type, arguments, "
+                           "function_definition FROM f WHERE rowid IN (SELECT value FROM json_each(?)) ORDER BY rowid",
+    'gettables_fingerprint.sql': "SELECT table_schema, table_name, md5(column_names || data_types) AS fingerprint "
+                                 "FROM t WHERE table_schema = ?",
+}
+
+
+def make_sqlite_catalog(path):
+    """База sqlite с таблицами f и t в формате sql/getfuncs.sql и sql/gettables.sql."""
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE f (schema_name, function_name, return_type, arguments, function_definition)")
+    connection.execute("CREATE TABLE t (table_schema, table_name, column_names, data_types)")
+    connection.executemany("INSERT INTO f VALUES (?, ?, ?, ?, ?)", [
+        ('stg', 'load', 'void', 'p_date date', 'CREATE FUNCTION stg.load(p_date date) ...'),
+        ('stg', 'load', 'void', '', 'CREATE FUNCTION stg.load() ...'),
+        ('dm', 'build', 'void', '', 'CREATE FUNCTION dm.build() ...'),
+    ])
+    connection.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", [
+        ('stg', 'orders', '{id,amount}', '{integer,numeric}'),
+        ('dm', 'clients', '{id}', '{integer}'),
+    ])
+    connection.commit()
+    return connection
+
+
+def sqlite_connect(path):
+    def connect():
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.create_function("md5", 1, lambda value: hashlib.md5(value.encode()).hexdigest())
+        return connection
+    return connect
+
+
+def test_extract_catalog_from_sqlite(tmp_path):
+    path = str(tmp_path / "catalog.sqlite")
+    make_sqlite_catalog(path).close()
+
+    catalog = extract_catalog(sqlite_connect(path), schemas=['stg', 'dm'], workers=2, batch_size=1,
+                              placeholder='?', queries=CATALOG_QUERIES)
+    assert list(catalog.functions) == ['stg.load', 'dm.build']
+    assert [overload.signature for overload in catalog.functions['stg.load'].overloads] == ['p_date date', '']
+    assert catalog.tables['stg.orders'].colum_names == ('id', 'amount')
+
+
+def test_extract_delta_matches_full_extract(tmp_path, monkeypatch):
+    # Список oid передаётся одним параметром: в sqlite он приходит строкой JSON для json_each
+    monkeypatch.setitem(sqlite3.adapters, (list, sqlite3.PrepareProtocol), json.dumps)
+    path = str(tmp_path / "catalog.sqlite")
+    connection = make_sqlite_catalog(path)
+    connect = sqlite_connect(path)
+    snapshot_dir = str(tmp_path / "snapshot")
+
+    def delta(schemas=('stg', 'dm')):
+        catalog, stats = extract_delta(connect, snapshot_dir, schemas=list(schemas), workers=2, batch_size=2,
+                                       placeholder='?', queries=CATALOG_QUERIES)
+        full = extract_catalog(connect, schemas=['stg', 'dm'], placeholder='?', queries=CATALOG_QUERIES)
+        assert {key: [(o.signature, o.function_definition) for o in func.overloads]
+                for key, func in catalog.functions.items()} == \
+            {key: [(o.signature, o.function_definition) for o in func.overloads]
+             for key, func in full.functions.items()}
+        assert {key: table.colum_names for key, table in catalog.tables.items()} == \
+            {key: table.colum_names for key, table in full.tables.items()}
+        return stats
+
+    assert delta() == {'functions': 3, 'functions_fetched': 3, 'functions_removed': 0,
+                       'tables': 2, 'tables_fetched': 2, 'tables_removed': 0}
+    # Ничего не изменилось: полные тексты не запрашиваются
+    assert delta()['functions_fetched'] == 0
+
+    connection.execute("UPDATE f SET function_definition = function_definition || ' -- v2' WHERE rowid = 1")
+    connection.execute("DELETE FROM f WHERE rowid = 3")
+    connection.execute("UPDATE t SET column_names = '{id,amount,status}' WHERE rowid = 1")
+    connection.execute("INSERT INTO t VALUES ('dm', 'regions', '{id}', '{integer}')")
+    connection.commit()
+    stats = delta()
+    assert (stats['functions_fetched'], stats['functions_removed']) == (1, 1)
+    assert stats['tables_fetched'] == 2
+
+    # Выгрузка одной схемы не теряет объекты остальных из снимка
+    assert delta(['dm'])['functions'] == 2
+    connection.close()
+
+
+def test_pool_opens_at_most_size_connections():
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection({}, []))
+        return opened[-1]
+
+    pool = ConnectionPool(connect, size=2)
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+    with pool.connection() as third:
+        assert third in (first, second)
+    assert len(opened) == 2
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection():
+            1 / 0
+    pool.close()
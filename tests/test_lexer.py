@@ -0,0 +1,40 @@
+from model.SQLLexer import (tokenize, FALLBACK_TOKEN_PATTERN, COMMENT, STRING, DOLLAR, KEYWORD, IDENTIFIER,
+                            ARGUMENT, WHITESPACE, OTHER)
+
+
+def significant(text, arguments=(), **kwargs):
+    return [(kind, value) for kind, value in tokenize(text, arguments, **kwargs) if kind != WHITESPACE]
+
+
+def test_tokens_cover_text():
+    text = "CREATE FUNCTION s.f(p int) AS $body$ SELECT 'a''b', E'\\'' /* x */ -- y\n$body$"
+    assert "".join(value for _, value in tokenize(text)) == text
+
+
+def test_token_kinds():
+    tokens = significant("select p_id, \"Quoted\"\"Name\" from s.update /* from */ where x = 'from' -- from", ['P_ID'])
+    assert tokens == [
+        (KEYWORD, 'select'), (ARGUMENT, 'p_id'), (OTHER, ','), (IDENTIFIER, '"Quoted""Name"'),
+        (KEYWORD, 'from'), (IDENTIFIER, 's'), (OTHER, '.'), (IDENTIFIER, 'update'),
+        (COMMENT, '/* from */'), (KEYWORD, 'where'), (IDENTIFIER, 'x'), (OTHER, '='), (STRING, "'from'"),
+        (COMMENT, '-- from'),
+    ]
+
+
+def test_dollar_quoted_body_is_tokenized_as_code():
+    tokens = significant("AS $fn$ SELECT 1 $fn$")
+    assert tokens == [(IDENTIFIER, 'AS'), (DOLLAR, '$fn$'), (KEYWORD, 'SELECT'), (IDENTIFIER, '1'), (DOLLAR, '$fn$')]
+
+
+def test_multiword_keywords():
+    assert significant("GROUP BY x ORDER  BY y") == [
+        (KEYWORD, 'GROUP BY'), (IDENTIFIER, 'x'), (IDENTIFIER, 'ORDER'), (IDENTIFIER, 'BY'), (IDENTIFIER, 'y')]
+    # Ключевое слово внутри другого слова не выделяется
+    assert significant("selected") == [(IDENTIFIER, 'selected')]
+
+
+def test_fallback_pattern_closes_unterminated_constructs_at_end():
+    for text in ("select /* never closed", "select 'never closed", 'select "never closed'):
+        tokens = list(tokenize(text, pattern=FALLBACK_TOKEN_PATTERN))
+        assert "".join(value for _, value in tokens) == text
+        assert len(tokens) == 3
@@ -0,0 +1,12 @@
+from utils.pagewriter import PageWriter
+
+
+def test_encoding_error_is_reported(tmp_path):
+    # Одиночный суррогат из JSON ("\ud800") не кодируется в UTF-8
+    page = tmp_path / "page.html"
+    writer = PageWriter(workers=1)
+    writer.write(str(page), "bad \ud800")
+    writer.write(str(tmp_path / "good.html"), "good")
+    writer.close()
+    assert writer.written == 1
+    assert [path for path, _ in writer.errors] == [str(page)]
@@ -0,0 +1,144 @@
+import html as html_module
+import re
+import time
+
+from model.SQLFunction import SQLFunction
+from model.SQLTable import SQLTable
+from model.SQLLexer import tokenize
+from model.SQLProcessor import SQLProcessor, CHUNKED, PLAIN, FALLBACK_CHUNK_SIZE
+
+
+def make_processor(**budget):
+    tables = {'stg.orders': SQLTable('stg', 'orders', ('id', 'amount', 'status'), ('integer',) * 3)}
+    functions = {'stg.load': SQLFunction('stg', 'load', 'void', [], '')}
+    return SQLProcessor(tables=tables, functions=functions, **budget)
+
+
+def test_highlight_links_objects_outside_comments_and_strings():
+    processor = make_processor()
+    text = "SELECT stg.load(p_x) FROM stg.orders -- stg.orders\n WHERE 'stg.load'"
+    html, functions, tables, *_ = processor.highlight(text, ['p_x'])
+    assert (functions, tables) == ({'stg.load'}, {'stg.orders'})
+    assert html.count('class="function-link"') == 1 and html.count('class="table-link"') == 1
+    assert '<span class="sql-comment">-- stg.orders</span>' in html
+    assert '<span class="function-input">p_x</span>' in html
+    assert html.endswith(" <span class=\"sql-keyword\">WHERE</span> 'stg.load'")
+
+
+def make_catalog(size=60):
+    """Каталог, где функции вызывают друг друга и читают таблицы по фиксированному правилу."""
+    tables = {f'stg.t{i}': SQLTable('stg', f't{i}', ('id', f'c{i}'), ('integer',) * 2) for i in range(size // 2)}
+    functions = {}
+    for i in range(size):
+        definition = (f"CREATE FUNCTION s{i % 3}.f{i}() AS $$\n"
+                      f"  SELECT * FROM stg.t{i % (size // 2)} JOIN stg.t{i * 7 % (size // 2)} USING (id);\n"
+                      f"  -- stg.t{(i + 1) % (size // 2)}\n"
+                      f"  PERFORM s{(i + 1) % 3}.f{(i + 1) % size}(), s{(i * 5) % 3}.f{i * 5 % size}();\n$$")
+        functions[f's{i % 3}.f{i}'] = SQLFunction(f's{i % 3}', f'f{i}', 'void', [], definition)
+    return tables, functions
+
+
+def analyze(jobs):
+    tables, functions = make_catalog()
+    SQLProcessor(tables=tables, functions=functions).perform_all(jobs=jobs, chunk_size=7)
+    return {key: (func.function_definition, func.called_functions, func.called_tables)
+            for key, func in functions.items()}
+
+
+def test_process_pool_matches_single_process():
+    results = analyze(jobs=1)
+    assert analyze(jobs=2) == results
+    assert results['s0.f0'][1:] == ({'s1.f1'}, {'stg.t0'})
+
+
+def make_column_processor():
+    tables = {'stg.orders': SQLTable('stg', 'orders', ('id', 'Amount', 'client_id', 'status'), ('integer',) * 4),
+              'dm.clients': SQLTable('dm', 'clients', ('id', 'name', 'region'), ('integer',) * 3)}
+    return SQLProcessor(tables=tables, functions={})
+
+
+def test_columns_are_resolved_through_aliases():
+    processor = make_column_processor()
+    text = ("SELECT o.amount, c.\"name\", stg.orders.status FROM stg.orders o JOIN dm.clients AS c ON c.id = o.client_id\n"
+            "-- o.id в комментарии не считается\n"
+            "WHERE region = 'x'")
+    *_, columns = processor.highlight(text, [])
+    assert columns == {('stg.orders', 'amount'), ('stg.orders', 'status'), ('stg.orders', 'client_id'),
+                       ('dm.clients', 'name'), ('dm.clients', 'id'), ('dm.clients', 'region')}
+
+
+def test_ambiguous_bare_column_is_skipped():
+    processor = make_column_processor()
+    # id есть у обеих таблиц: без квалификатора владельца не определить
+    *_, columns = processor.highlight("SELECT id, status FROM stg.orders, dm.clients", [])
+    assert columns == {('stg.orders', 'status')}
+    *_, columns = processor.highlight("SELECT id FROM stg.orders", [])
+    assert columns == {('stg.orders', 'id')}
+
+
+def test_keywords_are_not_aliases():
+    for text in (" where id = 1", " group\nby status", " LEFT JOIN dm.clients", " o WHERE", " AS x"):
+        alias = SQLProcessor._alias(list(tokenize(text)), 0)
+        assert alias == {" o WHERE": "o", " AS x": "x"}.get(text)
+
+
+# Незакрытые /* заставляют обычный лексер заново просматривать остаток текста: разбор квадратичен
+PATHOLOGICAL = "SELECT * FROM stg.orders;\n" + "/* x\n" * 30000 + "PERFORM stg.load();\n"
+
+
+# Обычный, но большой DDL: после разбора ещё остаются обработка токенов и просмотр остатка
+LARGE = "SELECT o.amount, o.status FROM stg.orders o WHERE o.id IN (" + ", ".join(map(str, range(400000))) + ");\n"
+
+
+def test_time_budget_is_respected():
+    processor = make_processor(max_definition_size=0, time_budget=0.3)
+    (html, functions, tables, *_), seconds, mode = processor.highlight_timed(PATHOLOGICAL, [])
+    assert mode == PLAIN
+    assert seconds < 0.3 * 1.5
+    # Остаток выведен экранированным текстом, зависимости из него всё равно найдены
+    assert tables == {'stg.orders'} and functions == {'stg.load'}
+    assert html.endswith("PERFORM stg.load();\n")
+
+    (html, _, tables, *_), seconds, mode = processor.highlight_timed(LARGE, [])
+    assert mode == PLAIN
+    assert seconds < 0.3 * 1.5
+    # Начало подсвечено, остаток выведен как есть: без разметки получается исходный текст
+    assert tables == {'stg.orders'}
+    assert html_module.unescape(re.sub(r'<[^>]+>', '', html)) == LARGE
+
+
+def test_oversized_definition_is_chunked_in_linear_time():
+    processor = make_processor(max_definition_size=1000, time_budget=0)
+    started = time.perf_counter()
+    (html, functions, tables, *_), _, mode = processor.highlight_timed(PATHOLOGICAL, [])
+    assert mode == CHUNKED
+    assert time.perf_counter() - started < 2
+    assert tables == {'stg.orders'}
+
+
+def test_single_line_chunks_are_cut_between_tokens():
+    processor = make_processor(max_definition_size=1000, time_budget=0)
+    # Ни одного перевода строки, а stg.orders и строка с пробелом накрывают границу куска
+    head = ("SELECT 1 FROM stg.t; " * (FALLBACK_CHUNK_SIZE // 21)).ljust(FALLBACK_CHUNK_SIZE - 4)
+    text = head + "stg.orders o WHERE o.status = '" + head[:2000] + "' AND stg.load() IS NULL"
+    (html, functions, tables, *_), _, mode = processor.highlight_timed(text, [])
+    assert mode == CHUNKED
+    assert (functions, tables) == ({'stg.load'}, {'stg.orders'})
+    assert html_module.unescape(re.sub(r'<[^>]+>', '', html)).lower() == text.lower()
+
+
+def test_definition_within_budget_matches_highlight():
+    processor = make_processor()
+    text = "CREATE FUNCTION stg.load() AS $$ SELECT o.amount FROM stg.orders o $$"
+    result, _, mode = processor.highlight_timed(text, [])
+    assert mode is None
+    assert result == processor.highlight(text, [])
+
+
+def test_overruns_are_reset_per_run():
+    functions = {'stg.load': SQLFunction('stg', 'load', 'void', [], "SELECT 1;\n" * 200)}
+    processor = SQLProcessor(tables={}, functions=functions, max_definition_size=100)
+    for _ in range(2):
+        functions['stg.load'].overloads[0].function_definition = "SELECT 1;\n" * 200
+        processor.perform_all()
+        assert [(key, mode) for key, mode, *_ in processor.overruns] == [('stg.load()', CHUNKED)]
@@ -0,0 +1,63 @@
+import time
+import threading
+
+from model.SQLFunction import SQLFunction
+from model.SQLTable import SQLTable
+from model.SQLProcessor import SQLProcessor
+from serve import DocumentationSite, DocumentationHandler
+
+
+def make_site():
+    functions = {
+        'stg.load': SQLFunction('stg', 'load', 'void', [], 'CREATE FUNCTION stg.load() AS $$ SELECT * FROM stg.orders $$'),
+        'dm.build': SQLFunction('dm', 'build', 'void', [], 'CREATE FUNCTION dm.build() AS $$ PERFORM stg.load() $$'),
+    }
+    tables = {'stg.orders': SQLTable('stg', 'orders', ('id', 'amount'), ('integer', 'numeric'))}
+    processor = SQLProcessor(tables=tables, functions=functions)
+    processor.perform_all()
+    return DocumentationSite(functions, tables, processor.table_callers, processor.column_callers)
+
+
+def test_pages_render_on_demand():
+    site = make_site()
+    body, etag = site.page("output/functions/stg.load_text.html")
+    assert b'stg.orders' in body
+    assert site.page("output/functions/stg.load_text.html") == (body, etag)
+    assert site.page("output/tables/stg.orders.html") is not None
+    assert site.page("output/functions/missing_text.html") is None
+
+
+def test_renders_run_outside_the_lock(monkeypatch):
+    site = make_site()
+    site.page("index.html")
+    calls = []
+    render = site._render
+
+    def slow_render(path):
+        calls.append(path)
+        time.sleep(0.3)
+        return render(path)
+
+    monkeypatch.setattr(site, "_render", slow_render)
+    paths = ["output/functions/stg.load_text.html"] * 3 + ["output/functions/dm.build_text.html"]
+    results = {}
+
+    def fetch(number, path):
+        results[number] = site.page(path)
+
+    threads = [threading.Thread(target=fetch, args=(number, path)) for number, path in enumerate(paths)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Разные страницы генерируются параллельно, одна и та же — один раз
+    assert time.perf_counter() - started < 0.55
+    assert sorted(calls) == sorted(set(paths))
+    assert results[0] == results[1] == results[2]
+
+
+def test_static_files_do_not_depend_on_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert DocumentationHandler._static("css/graph.css") is not None
+    assert DocumentationHandler._static("css/missing.css") is None
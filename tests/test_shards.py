@@ -0,0 +1,50 @@
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+
+from utils.synthetic import generate_catalog
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_project(directory, data_dir):
+    """Копия проекта с синтетической выгрузкой: processing.py читает data/ рядом с собой и пишет в ./output."""
+    shutil.copytree(ROOT_DIR, directory,
+                    ignore=shutil.ignore_patterns('.git', 'output', 'data', 'tests', '__pycache__', '*.sqlite'))
+    shutil.copytree(data_dir, os.path.join(directory, 'data'))
+    return directory
+
+
+def run(directory, *args):
+    subprocess.run([sys.executable, 'processing.py', '--no-cache', *args], cwd=directory, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def different_files(left, right, ignore=('shards',)):
+    comparison = filecmp.dircmp(left, right, ignore=list(ignore))
+    different = [os.path.join(left, name) for name in
+                 comparison.left_only + comparison.right_only + comparison.funny_files]
+    # dircmp сравнивает по os.stat, а здесь нужно содержимое
+    _, mismatch, errors = filecmp.cmpfiles(left, right, comparison.common_files, shallow=False)
+    different += [os.path.join(left, name) for name in mismatch + errors]
+    for name in comparison.common_dirs:
+        different += different_files(os.path.join(left, name), os.path.join(right, name), ignore)
+    return different
+
+
+def test_merged_shards_match_single_build(tmp_path):
+    data_dir = str(tmp_path / 'data')
+    generate_catalog(data_dir, tables=30, functions=60, schemas=4, definition_size=500, overloads=5)
+    single = make_project(str(tmp_path / 'single'), data_dir)
+    sharded = make_project(str(tmp_path / 'sharded'), data_dir)
+
+    run(single)
+    run(sharded, '--shard', '1/2')
+    run(sharded, '--shard', '2/2')
+    run(sharded, '--merge')
+
+    assert different_files(os.path.join(single, 'output'), os.path.join(sharded, 'output')) == []
+    # Главная страница пишется в корень проекта
+    assert filecmp.cmp(os.path.join(single, 'index.html'), os.path.join(sharded, 'index.html'), shallow=False)
@@ -0,0 +1,204 @@
+import os
+import json
+import sqlite3
+import hashlib
+import pathlib
+from typing import Dict, List, Set, Tuple, Optional, Iterable
+
+from model.SQLTable import SQLTable
+from model.SQLFunction import SQLFunction
+
+# Увеличивается при любом изменении формата подсветки: старый кеш тогда сбрасывается целиком
+CACHE_VERSION = 5
+
+
+def content_hash(*parts: str) -> str:
+    """Хеш нескольких строк (разделитель исключает склейку соседних частей)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, path: str, read_only: bool = False):
+        """
+        Кеш результатов анализа между запусками (SQLite).
+        Хранит для каждой перегрузки функции хеш DDL, готовый HTML, найденные зависимости,
+        все пары schema.name, идентификаторы и колонки из текста, а также отпечатки объектов каталога
+        и хеши записанных страниц.
+        read_only — только чтение чужого кеша (serve.py, cli.py): store, finish и учёт страниц
+        ничего не меняют, иначе отпечатки каталога и записи, сделанные processing.py
+        с другими настройками, были бы перезаписаны. Кеш без файла или другой версии считается пустым.
+        """
+        self.path = path
+        self.read_only = read_only
+        if read_only:
+            self.connection = self._open_read_only(path)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(CACHE_VERSION):
+                # Формат таблиц мог измениться, поэтому они пересоздаются
+                self.connection.executescript(
+                    "DROP TABLE IF EXISTS functions; DROP TABLE IF EXISTS names; DROP TABLE IF EXISTS pages;")
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+            self._create_tables(self.connection)
+        self.written_pages: Set[str] = set()
+        # Хеши страниц, отданных на запись; в кеш попадают только после успешной записи (pages_saved)
+        self.pending_pages: Dict[str, str] = {}
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection) -> None:
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS functions (
+                key TEXT PRIMARY KEY,
+                definition_hash TEXT,
+                html TEXT,
+                called_functions TEXT,
+                called_tables TEXT,
+                candidates TEXT,
+                identifiers TEXT,
+                columns TEXT
+            );
+            CREATE TABLE IF NOT EXISTS names (key TEXT PRIMARY KEY, fingerprint TEXT);
+            CREATE TABLE IF NOT EXISTS pages (path TEXT PRIMARY KEY, hash TEXT);
+        """)
+
+    @classmethod
+    def _open_read_only(cls, path: str) -> sqlite3.Connection:
+        """Открывает файл кеша только на чтение; если он непригоден — пустой кеш в памяти."""
+        if os.path.exists(path):
+            connection = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            except sqlite3.DatabaseError:
+                row = None
+            if row is not None and row[0] == str(CACHE_VERSION):
+                return connection
+            connection.close()
+        connection = sqlite3.connect(":memory:")
+        cls._create_tables(connection)
+        return connection
+
+    @staticmethod
+    def _fingerprints(tables: Dict[str, 'SQLTable'], functions: Dict[str, 'SQLFunction']) -> Dict[str, str]:
+        """
+        Отпечатки всего, что из объекта каталога влияет на анализ других функций:
+        отображаемое имя, а у таблиц ещё и колонки, по которым разрешаются ссылки на них.
+        """
+        fingerprints = {f"f:{key}": str(func) for key, func in functions.items()}
+        fingerprints.update((f"t:{key}", content_hash(str(table), "\0".join(table.colum_names))) for key, table in tables.items())
+        return fingerprints
+
+    def changed_names(self, tables: Dict[str, 'SQLTable'], functions: Dict[str, 'SQLFunction']) -> Set[str]:
+        """
+        Ключи объектов, которые добавлены, удалены или изменены с прошлого запуска.
+        """
+        previous = dict(self.connection.execute("SELECT key, fingerprint FROM names"))
+        current = self._fingerprints(tables, functions)
+        changed = {name for name, fingerprint in current.items() if previous.get(name) != fingerprint}
+        changed.update(name for name in previous if name not in current)
+        return {name[2:] for name in changed}
+
+    @staticmethod
+    def _definition_hash(definition: str, arguments: List[str], max_definition_size: int) -> str:
+        """
+        Хеш DDL с аргументами. Размер куска входит в хеш, только если DDL подсвечивается кусками:
+        от него зависят границы кусков, а значит и HTML.
+        """
+        if 0 < max_definition_size < len(definition):
+            return content_hash(definition, *arguments, f"chunk:{max_definition_size}")
+        return content_hash(definition, *arguments)
+
+    def lookup(self, key: str, definition: str, arguments: List[str], changed_names: Set[str],
+               max_definition_size: int = 0) -> Optional[Tuple[str, Set[str], Set[str], Set[str], Set[Tuple[str, str]]]]:
+        """
+        Возвращает (HTML, вызванные функции, вызванные таблицы, идентификаторы, колонки) из кеша, если DDL
+        (и размер куска для DDL длиннее max_definition_size) не изменился и ни одна из упомянутых
+        в нём пар schema.name не изменилась в каталоге.
+        """
+        row = self.connection.execute(
+            "SELECT definition_hash, html, called_functions, called_tables, candidates, identifiers, columns "
+            "FROM functions WHERE key = ?",
+            (key,)).fetchone()
+        if row is None or row[0] != self._definition_hash(definition, arguments, max_definition_size):
+            return None
+        if changed_names and not changed_names.isdisjoint(json.loads(row[4])):
+            return None
+        return (row[1], set(json.loads(row[2])), set(json.loads(row[3])), set(json.loads(row[5])),
+                {tuple(column) for column in json.loads(row[6])})
+
+    def store(self, key: str, definition: str, arguments: List[str], html: str,
+              called_functions: Iterable[str], called_tables: Iterable[str], candidates: Iterable[str],
+              identifiers: Iterable[str], columns: Iterable[Tuple[str, str]], max_definition_size: int = 0) -> None:
+        if self.read_only:
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO functions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, self._definition_hash(definition, arguments, max_definition_size), html,
+             json.dumps(sorted(called_functions)), json.dumps(sorted(called_tables)), json.dumps(sorted(candidates)),
+             json.dumps(sorted(identifiers), ensure_ascii=False), json.dumps(sorted(columns), ensure_ascii=False)))
+
+    def finish(self, tables: Dict[str, 'SQLTable'], functions: Dict[str, 'SQLFunction']) -> None:
+        """
+        Запоминает текущий состав каталога и удаляет записи исчезнувших перегрузок.
+        """
+        if self.read_only:
+            return
+        self.connection.execute("DELETE FROM names")
+        self.connection.executemany("INSERT INTO names VALUES (?, ?)", self._fingerprints(tables, functions).items())
+        live_keys = {overload.key(func_name) for func_name, func in functions.items() for overload in func.overloads}
+        stored = [row[0] for row in self.connection.execute("SELECT key FROM functions")]
+        self.connection.executemany("DELETE FROM functions WHERE key = ?",
+                                    [(key,) for key in stored if key not in live_keys])
+        self.connection.commit()
+
+    def page_changed(self, path: str, content: str) -> bool:
+        """
+        Проверяет, нужно ли записывать страницу: файла нет или его содержимое изменилось.
+        Страница в любом случае отмечается как актуальная для remove_stale_pages.
+        Новый хеш запоминается, только когда запись подтверждена через pages_saved:
+        иначе страница, которую не удалось записать, считалась бы актуальной и в следующих запусках.
+        """
+        path = os.path.normpath(path)
+        self.written_pages.add(path)
+        page_hash = content_hash(content)
+        row = self.connection.execute("SELECT hash FROM pages WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == page_hash and os.path.exists(path):
+            return False
+        self.pending_pages[path] = page_hash
+        return True
+
+    def pages_saved(self, paths: Iterable[str]) -> None:
+        """Запоминает хеши успешно записанных страниц из числа переданных в page_changed."""
+        if self.read_only:
+            return
+        hashes = ((path, self.pending_pages.pop(path, None)) for path in map(os.path.normpath, paths))
+        self.connection.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?)",
+                                    [(path, page_hash) for path, page_hash in hashes if page_hash is not None])
+
+    def remove_stale_pages(self) -> List[str]:
+        """
+        Удаляет страницы, записанные в прошлых запусках, но не сгенерированные в этом.
+        """
+        if self.read_only:
+            return []
+        stale = [row[0] for row in self.connection.execute("SELECT path FROM pages")
+                 if row[0] not in self.written_pages]
+        for path in stale:
+            if os.path.exists(path):
+                os.remove(path)
+        self.connection.executemany("DELETE FROM pages WHERE path = ?", [(path,) for path in stale])
+        self.connection.commit()
+        return stale
+
+    def close(self) -> None:
+        if not self.read_only:
+            self.connection.commit()
+        self.connection.close()
@@ -1,81 +1,250 @@
 import os
 from os import path
-from typing import List, Dict, Tuple
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Iterator, Optional, Iterable
 import json
 from model.SQLFunction import SQLFunction
 from model.SQLTable import SQLTable
+from model.SQLCatalog import SQLCatalog
 
+# Режимы аргументов, которые pg_get_function_arguments пишет перед именем
+ARGUMENT_MODES = ('IN', 'OUT', 'INOUT', 'VARIADIC')
+# Поле со схемой объекта в записях выгрузки
+SCHEMA_FIELDS = {'functions': 'schema_name', 'tables': 'table_schema'}
 
-def load_functions() -> Dict[str, 'SQLFunction']:
+
+def data_files(kind: str, data_dir: Optional[str] = None) -> List[str]:
+    """
+    Возвращает отсортированный список файлов выгрузки (.json и .jsonl) из data/<kind>.
+    data_dir заменяет каталог data проекта (например, для синтетического каталога benchmark.py).
+    """
+    if data_dir is None:
+        datapath = path.abspath(path.dirname(__file__))
+        data_dir = os.path.join(os.path.dirname(datapath), 'data')
+    filepath = os.path.join(data_dir, kind)
+    return [os.path.join(filepath, file) for file in sorted(os.listdir(filepath))
+            if file.endswith('.json') or file.endswith('.jsonl')]
+
+
+def iter_json_entries(file_path: str, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Потоково читает объекты из файла выгрузки, не загружая его целиком.
+    Поддерживаются JSON-массив ([{...}, {...}]) и JSON Lines (по объекту на строку).
+    Буфер растёт только до размера самого большого объекта.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        buffer = f.read(chunk_size)
+        position = 0
+        while True:
+            # Пропускаем разделители между объектами и скобки массива
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+            if position == len(buffer):
+                buffer = f.read(chunk_size)
+                position = 0
+                if not buffer:
+                    return
+                continue
+            try:
+                entry, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Объект не поместился в буфер: дочитываем не меньше, чем уже есть
+                more = f.read(max(chunk_size, len(buffer) - position))
+                if not more:
+                    raise
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            yield entry
+            position = end
+            if position >= chunk_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+def parse_argument_names(arguments: str) -> List[str]:
+    """
+    Извлекает имена аргументов из строки pg_get_function_arguments
+    ("p_date date, OUT p_result integer" -> ["p_date", "p_result"]).
+    """
+    names = []
+    for argument in arguments.split(','):
+        words = argument.split()
+        if words and words[0].upper() in ARGUMENT_MODES and len(words) > 1:
+            words = words[1:]
+        names.append(words[0] if words else '')
+    return names
+
+
+def function_key(entry: dict) -> str:
+    return f"{entry['schema_name'].lower()}.{entry['function_name'].lower()}"
+
+
+def make_function(entry: dict, catalog: SQLCatalog, definitions: bool = True) -> Tuple[str, SQLFunction]:
+    """
+    Создаёт SQLFunction из записи выгрузки sql/getfuncs.sql и возвращает её вместе с ключом.
+    С definitions=False DDL не сохраняется: его потом отдаёт iter_definitions.
+    """
+    return (function_key(entry),
+            SQLFunction(
+                schema_name=catalog.intern(entry['schema_name']),
+                function_name=entry['function_name'],
+                return_type=catalog.intern(entry['return_type']),
+                arguments=catalog.shared_tuple(parse_argument_names(entry['arguments'])),
+                function_definition=entry['function_definition'] if definitions else '',
+                signature=catalog.intern(entry['arguments']),
+            ))
+
+
+def add_functions(functions: Dict[str, SQLFunction], items: List[Tuple[str, SQLFunction]]) -> None:
+    """Добавляет функции в словарь; функция с уже известным ключом становится ещё одной перегрузкой."""
+    for key, function in items:
+        if key in functions:
+            functions[key].add_overload(function.overloads[0])
+        else:
+            functions[key] = function
+
+
+def _read_functions(file_path: str, catalog: SQLCatalog, definitions: bool = True) -> List[Tuple[str, SQLFunction]]:
+    """Создаёт SQLFunction для каждой записи файла по мере чтения."""
+    return [make_function(entry, catalog, definitions) for entry in iter_json_entries(file_path)]
+
+
+def load_functions(jobs: int = 1, data_dir: Optional[str] = None,
+                   catalog: Optional[SQLCatalog] = None, definitions: bool = True) -> Dict[str, 'SQLFunction']:
     """
     Загружает данные из JSON-файлов в объекты SQLFunction и возвращает их в виде словаря.
-    Если функция с таким ключом уже существует, увеличивает её overload и добавляет новый DDL.
-    """
-    from os import path
-
-    # Определяем путь к директории с JSON-файлами
-    datapath = path.abspath(path.dirname(__file__))
-    datapath = os.path.dirname(datapath)
-    filepath = os.path.join(datapath, 'data', 'functions')
-    datalist = os.listdir(filepath)
-
-    functions: Dict[str, SQLFunction] = {}
-
-    for file in datalist:
-        if file.endswith('.json'):
-            with open(os.path.join(filepath, file), 'r', encoding='utf-8') as f:
-                data = json.loads(f.read())
-                for entry in data:
-                    key = f"{entry['schema_name'].lower()}.{entry['function_name'].lower()}"
-                    new_function_ddl = entry['function_definition']
-
-                    # Если функция уже существует в словаре
-                    if key in functions:
-                        existing_function = functions[key]
-                        existing_function.overload += 1
-                        # Добавляем новый DDL с разделителем из двух пустых строк
-                        existing_function.function_definition += f"\n\n{new_function_ddl}"
-                    else:
-                        # Создаём новый объект SQLFunction
-                        functions[key] = SQLFunction(
-                            schema_name=entry['schema_name'],
-                            function_name=entry['function_name'],
-                            return_type=entry['return_type'],
-                            arguments=[a.strip().split(' ')[0] for a in entry['arguments'].split(',')],
-                            function_definition=new_function_ddl,
-                            overload=1  # Новый объект всегда начинает с overload = 1
-                        )
+    Если функция с таким ключом уже существует, запись добавляется к ней как ещё одна перегрузка.
+    Файлы читаются потоково; при jobs > 1 несколько файлов читаются параллельно,
+    а результаты объединяются в порядке имён файлов.
+    Функции добавляются в catalog (по умолчанию — в новый каталог).
+    С definitions=False загружаются только имена, сигнатуры и аргументы, а DDL
+    читается потом потоково через iter_definitions.
+    """
+    catalog = catalog if catalog is not None else SQLCatalog()
+    functions = catalog.functions
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        for file_functions in executor.map(partial(_read_functions, catalog=catalog, definitions=definitions),
+                                           data_files('functions', data_dir)):
+            add_functions(functions, file_functions)
 
     return functions
 
 
+def iter_definitions(data_dir: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Потоково отдаёт пары (ключ функции, DDL) в том же порядке, в котором load_functions
+    добавляет перегрузки, — для SQLProcessor.stream по каталогу, загруженному без DDL.
+    """
+    for file_path in data_files('functions', data_dir):
+        for entry in iter_json_entries(file_path):
+            yield function_key(entry), entry['function_definition']
+
+
 def parse_list_from_string(value: str) -> List[str]:
     """Преобразует строку формата {value1,value2,...} в список [value1, value2, ...]."""
     return value.strip("{}").split(",")
 
 
-def load_tables() -> Dict[str, SQLTable]:
-    """Загружает данные из JSON-файлов в объекты SQLTable."""
-    datapath = path.abspath(path.dirname(__file__))
-    datapath = os.path.dirname(datapath)
-    filepath = os.path.join(datapath, 'data', 'tables')
-    datalist = os.listdir(filepath)
-    tables: Dict[str, SQLTable] = {}
-
-    for file in datalist:
-        if file.endswith('.json'):
-            with open(os.path.join(filepath, file), 'r') as f:
-                data = json.loads(f.read())
-                for entry in data:
-                    tables[f"{entry['table_schema'].lower()}.{entry['table_name'].lower()}"] = SQLTable(
-                        schema_name=entry["table_schema"],
-                        table_name=entry["table_name"],
-                        columns=parse_list_from_string(entry["column_names"]),
-                        data_types=parse_list_from_string(entry["data_types"]),
-                    )
+def make_table(entry: dict, catalog: SQLCatalog) -> Tuple[str, SQLTable]:
+    """
+    Создаёт SQLTable из записи выгрузки sql/gettables.sql и возвращает её вместе с ключом.
+    Колонки и типы принимаются и строкой {a,b} из JSON, и списком, как их отдаёт драйвер БД.
+    """
+    columns, data_types = entry["column_names"], entry["data_types"]
+    return (f"{entry['table_schema'].lower()}.{entry['table_name'].lower()}",
+            SQLTable(
+                schema_name=catalog.intern(entry["table_schema"]),
+                table_name=entry["table_name"],
+                columns=catalog.shared_tuple(parse_list_from_string(columns) if isinstance(columns, str) else columns),
+                data_types=catalog.shared_tuple(
+                    parse_list_from_string(data_types) if isinstance(data_types, str) else data_types),
+            ))
+
+
+def _read_tables(file_path: str, catalog: SQLCatalog) -> List[Tuple[str, SQLTable]]:
+    """Создаёт SQLTable для каждой записи файла по мере чтения."""
+    return [make_table(entry, catalog) for entry in iter_json_entries(file_path)]
+
+
+def load_tables(jobs: int = 1, data_dir: Optional[str] = None,
+                catalog: Optional[SQLCatalog] = None) -> Dict[str, SQLTable]:
+    """Загружает данные из JSON-файлов в объекты SQLTable (потоково, см. load_functions)."""
+    catalog = catalog if catalog is not None else SQLCatalog()
+    tables = catalog.tables
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        for file_tables in executor.map(partial(_read_tables, catalog=catalog), data_files('tables', data_dir)):
+            tables.update(file_tables)
     return tables
 
 
+def load_catalog(jobs: int = 1, data_dir: Optional[str] = None) -> SQLCatalog:
+    """
+    Загружает функции и таблицы в один каталог: строки и кортежи разделяются между ними.
+    """
+    catalog = SQLCatalog()
+    load_functions(jobs=jobs, data_dir=data_dir, catalog=catalog)
+    load_tables(jobs=jobs, data_dir=data_dir, catalog=catalog)
+    return catalog
+
+
+def snapshot_key(kind: str, entry: dict) -> str:
+    """
+    Ключ записи снимка: oid для функций (у перегрузок он разный) и schema.name для таблиц.
+    """
+    if kind == 'functions':
+        return str(entry['oid'])
+    return f"{entry['table_schema'].lower()}.{entry['table_name'].lower()}"
+
+
+def read_snapshot(kind: str, snapshot_dir: str) -> Dict[str, dict]:
+    """Читает записи снимка каталога (с отпечатками) по ключам snapshot_key; без снимка — пустой словарь."""
+    if not os.path.isdir(os.path.join(snapshot_dir, kind)):
+        return {}
+    return {snapshot_key(kind, entry): entry
+            for file_path in data_files(kind, snapshot_dir) for entry in iter_json_entries(file_path)}
+
+
+def write_snapshot(kind: str, snapshot_dir: str, entries: Iterable[dict]) -> None:
+    """
+    Записывает снимок в snapshot_dir/<kind>/<kind>.jsonl в формате выгрузки,
+    поэтому load_functions и load_tables читают его с data_dir=snapshot_dir как обычные данные.
+    Файл заменяется целиком только после успешной записи.
+    """
+    os.makedirs(os.path.join(snapshot_dir, kind), exist_ok=True)
+    file_path = os.path.join(snapshot_dir, kind, f"{kind}.jsonl")
+    with open(file_path + '.tmp', 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False))
+            f.write('\n')
+    os.replace(file_path + '.tmp', file_path)
+
+
+def merge_delta(kind: str, previous: Dict[str, dict], fetched: Iterable[dict],
+                current: Iterable[dict], schemas: Iterable[str]) -> List[dict]:
+    """
+    Объединяет прошлый снимок с дельтой.
+    current — отпечатки всех объектов выгруженных схем в их порядке, fetched — полные записи
+    новых и изменённых объектов. Неизменённые объекты берутся из прошлого снимка, объекты
+    выгруженных схем, которых больше нет в current, удаляются, а остальные схемы остаются как были.
+    """
+    field = SCHEMA_FIELDS[kind]
+    schemas = set(schemas)
+    fetched = {snapshot_key(kind, entry): entry for entry in fetched}
+    merged = [entry for entry in previous.values() if entry[field] not in schemas]
+    for row in current:
+        key = snapshot_key(kind, row)
+        # Объект, удалённый между запросом отпечатков и выгрузкой, остаётся в старом виде до следующего запуска
+        entry = fetched.get(key) or previous.get(key)
+        if entry is not None:
+            merged.append(entry)
+    return merged
+
+
 if __name__ == '__main__':
     f, schema_functions = load_functions()
     print(schema_functions)
\ No newline at end of file
@@ -0,0 +1,254 @@
+import os
+import re
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from model.SQLCatalog import SQLCatalog
+from utils.dataloader import (make_function, make_table, add_functions, load_functions, load_tables,
+                              snapshot_key, read_snapshot, write_snapshot, merge_delta)
+
+# Плейсхолдеры в запросах из sql/ ('your_schema_name', 'your_oid_list'), которые заменяются параметром запроса
+PLACEHOLDER = re.compile(r"'your_\w+'")
+# Запросы отпечатков для дельта-выгрузки
+FINGERPRINT_QUERIES = {'functions': 'getfuncs_fingerprint.sql', 'tables': 'gettables_fingerprint.sql'}
+# Пользовательские схемы: всё, кроме системных схем PostgreSQL и Greenplum
+SCHEMAS_SQL = """SELECT n.nspname
+FROM pg_namespace n
+WHERE n.nspname NOT LIKE 'pg\\_%'
+  AND n.nspname NOT IN ('information_schema', 'gp_toolkit')
+ORDER BY n.nspname"""
+
+
+def catalog_query(file_name: str, placeholder: str = "%s") -> str:
+    """
+    Читает запрос выгрузки из sql/ и подставляет вместо плейсхолдера параметр драйвера
+    (placeholder — в стиле paramstyle модуля DB-API: %s для psycopg2, ? для sqlite3).
+    """
+    sql_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql')
+    with open(os.path.join(sql_dir, file_name), 'r', encoding='utf-8') as f:
+        return PLACEHOLDER.sub(lambda match: placeholder, f.read().strip().rstrip(';'))
+
+
+def connect_dsn(dsn: str) -> Callable[[], object]:
+    """
+    Фабрика соединений с PostgreSQL/Greenplum по строке подключения.
+    Драйвер (psycopg2 или psycopg 3) нужен только для прямой выгрузки, поэтому импортируется здесь.
+    """
+    try:
+        import psycopg2 as driver
+    except ImportError:
+        try:
+            import psycopg as driver
+        except ImportError:
+            raise ImportError("Для выгрузки из БД установите psycopg2 (pip install psycopg2-binary) "
+                              "или psycopg") from None
+    return lambda: driver.connect(dsn)
+
+
+class ConnectionPool:
+    def __init__(self, connect: Callable[[], object], size: int = 4):
+        """
+        Небольшой пул соединений DB-API: соединения открываются по мере надобности
+        (не больше size) и переиспользуются между запросами по разным схемам.
+        """
+        self.connect = connect
+        self.size = max(size, 1)
+        self.idle: 'queue.LifoQueue' = queue.LifoQueue()
+        self.opened: List[object] = []
+        self.lock = threading.Lock()
+        self.count = 0
+
+    @contextmanager
+    def connection(self):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                opening = self.count < self.size
+                if opening:
+                    self.count += 1
+            if opening:
+                try:
+                    connection = self.connect()
+                except Exception:
+                    with self.lock:
+                        self.count -= 1
+                    raise
+                with self.lock:
+                    self.opened.append(connection)
+            else:
+                connection = self.idle.get()
+        try:
+            yield connection
+        finally:
+            self.idle.put(connection)
+
+    def close(self) -> None:
+        for connection in self.opened:
+            connection.close()
+        self.opened.clear()
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def fetch_rows(connection, query: str, params: Sequence = (), batch_size: int = 1000,
+               name: Optional[str] = None) -> Iterator[dict]:
+    """
+    Выполняет запрос и отдаёт строки словарями {колонка: значение} пачками по batch_size.
+    Если драйвер поддерживает именованные (серверные) курсоры, как psycopg2, результат
+    не материализуется на клиенте целиком: строки приходят с сервера по мере чтения.
+    """
+    cursor = None
+    if name is not None:
+        try:
+            cursor = connection.cursor(name=name)
+            cursor.itersize = batch_size
+        except TypeError:
+            cursor = None
+    if cursor is None:
+        cursor = connection.cursor()
+    try:
+        # Без параметров запрос передаётся как есть: иначе psycopg разбирает % в литералах (LIKE 'pg\_%')
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        columns = None
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if columns is None:
+                # У серверного курсора описание колонок появляется только после первой выборки
+                columns = [column[0] for column in cursor.description]
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        cursor.close()
+        # Серверный курсор живёт в транзакции: закрываем её, чтобы соединение вернулось в пул чистым
+        connection.rollback()
+
+
+def list_schemas(pool: ConnectionPool, batch_size: int = 1000) -> List[str]:
+    with pool.connection() as connection:
+        return [row['nspname'] for row in fetch_rows(connection, SCHEMAS_SQL, batch_size=batch_size)]
+
+
+def extract_catalog(connect: Callable[[], object],
+                    schemas: Optional[Sequence[str]] = None,
+                    workers: int = 4,
+                    batch_size: int = 1000,
+                    placeholder: str = "%s",
+                    queries: Optional[Dict[str, str]] = None,
+                    catalog: Optional[SQLCatalog] = None) -> SQLCatalog:
+    """
+    Выгружает функции и таблицы напрямую из БД запросами sql/getfuncs.sql и sql/gettables.sql,
+    без промежуточных JSON-файлов. connect — функция без аргументов, возвращающая соединение DB-API
+    (например, connect_dsn(dsn)), поэтому подойдёт и любой совместимый заменитель драйвера.
+    queries заменяет текст запросов по имени файла в sql/.
+    Схемы (по умолчанию — все пользовательские) выгружаются параллельно через пул из workers соединений;
+    объекты создаются по мере чтения пачек строк, а в каталог попадают в порядке schemas,
+    так что результат не зависит от того, какой запрос завершился первым.
+    """
+    catalog = catalog if catalog is not None else SQLCatalog()
+    queries = queries or {}
+    functions_sql = queries.get('getfuncs.sql') or catalog_query('getfuncs.sql', placeholder)
+    tables_sql = queries.get('gettables.sql') or catalog_query('gettables.sql', placeholder)
+
+    def extract(kind: str, schema: str) -> List[Tuple[str, object]]:
+        query, make = (functions_sql, make_function) if kind == 'functions' else (tables_sql, make_table)
+        with pool.connection() as connection:
+            return [make(row, catalog)
+                    for row in fetch_rows(connection, query, (schema,), batch_size, name=f"extract_{kind}")]
+
+    with ConnectionPool(connect, size=workers) as pool:
+        if schemas is None:
+            schemas = list_schemas(pool, batch_size)
+        tasks = [(kind, schema) for kind in ('functions', 'tables') for schema in schemas]
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            results: Dict[Tuple[str, str], List[Tuple[str, object]]] = dict(
+                zip(tasks, executor.map(lambda task: extract(*task), tasks)))
+
+    for schema in schemas:
+        add_functions(catalog.functions, results[('functions', schema)])
+    for schema in schemas:
+        catalog.tables.update(results[('tables', schema)])
+    return catalog
+
+
+def extract_delta(connect: Callable[[], object],
+                  snapshot_dir: str,
+                  schemas: Optional[Sequence[str]] = None,
+                  workers: int = 4,
+                  batch_size: int = 1000,
+                  placeholder: str = "%s",
+                  queries: Optional[Dict[str, str]] = None,
+                  catalog: Optional[SQLCatalog] = None) -> Tuple[SQLCatalog, Dict[str, int]]:
+    """
+    Дельта-выгрузка: по каждой схеме запрашиваются только отпечатки объектов
+    (sql/getfuncs_fingerprint.sql, sql/gettables_fingerprint.sql), и полный текст
+    pg_get_functiondef забирается лишь для новых и изменённых функций (sql/getfuncs_by_oid.sql,
+    пачками по batch_size oid). Таблицы перечитываются только в схемах, где изменилась хотя бы одна.
+    Результат объединяется с прошлым снимком из snapshot_dir (merge_delta), снимок перезаписывается,
+    и каталог загружается из него. Параметры — как у extract_catalog.
+    Возвращает каталог и счётчики: всего объектов, выгружено заново, удалено.
+    """
+    catalog = catalog if catalog is not None else SQLCatalog()
+    queries = queries or {}
+
+    def query(file_name: str) -> str:
+        return queries.get(file_name) or catalog_query(file_name, placeholder)
+
+    def rows(sql: str, params: Sequence, name: str) -> List[dict]:
+        with pool.connection() as connection:
+            return list(fetch_rows(connection, sql, params, batch_size, name=name))
+
+    kinds = ('functions', 'tables')
+    previous = {kind: read_snapshot(kind, snapshot_dir) for kind in kinds}
+    with ConnectionPool(connect, size=workers) as pool, \
+            ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        if schemas is None:
+            schemas = list_schemas(pool, batch_size)
+        tasks = [(kind, schema) for kind in kinds for schema in schemas]
+        fingerprints = dict(zip(tasks, executor.map(
+            lambda task: rows(query(FINGERPRINT_QUERIES[task[0]]), (task[1],), f"fingerprint_{task[0]}"), tasks)))
+        current = {kind: [row for schema in schemas for row in fingerprints[(kind, schema)]] for kind in kinds}
+        changed = {kind: {snapshot_key(kind, row): row['fingerprint'] for row in current[kind]
+                          if previous[kind].get(snapshot_key(kind, row), {}).get('fingerprint') != row['fingerprint']}
+                   for kind in kinds}
+
+        oids = [int(key) for key in changed['functions']]
+        functions_sql = query('getfuncs_by_oid.sql')
+        fetched_functions = [entry for batch in executor.map(
+            lambda batch: rows(functions_sql, (batch,), "delta_functions"),
+            [oids[start:start + batch_size] for start in range(0, len(oids), batch_size)]) for entry in batch]
+
+        changed_schemas = [schema for schema in schemas
+                           if any(snapshot_key('tables', row) in changed['tables']
+                                  for row in fingerprints[('tables', schema)])]
+        tables_sql = query('gettables.sql')
+        fetched_tables = [entry for batch in executor.map(
+            lambda schema: rows(tables_sql, (schema,), "delta_tables"), changed_schemas) for entry in batch
+            if snapshot_key('tables', entry) in changed['tables']]
+
+    stats: Dict[str, int] = {}
+    for kind, fetched in (('functions', fetched_functions), ('tables', fetched_tables)):
+        for entry in fetched:
+            entry['fingerprint'] = changed[kind][snapshot_key(kind, entry)]
+        merged = merge_delta(kind, previous[kind], fetched, current[kind], schemas)
+        write_snapshot(kind, snapshot_dir, merged)
+        stats[kind] = len(merged)
+        stats[f"{kind}_fetched"] = len(fetched)
+        merged_keys = {snapshot_key(kind, entry) for entry in merged}
+        stats[f"{kind}_removed"] = sum(1 for key in previous[kind] if key not in merged_keys)
+    load_functions(data_dir=snapshot_dir, catalog=catalog)
+    load_tables(data_dir=snapshot_dir, catalog=catalog)
+    return catalog, stats
@@ -0,0 +1,117 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional
+
+from utils.cache import AnalysisCache
+from utils.profiler import Profiler
+
+
+class PageWriter:
+    def __init__(self, workers: int = 8, cache: Optional['AnalysisCache'] = None, max_pending: int = 0,
+                 profiler: Optional['Profiler'] = None):
+        """
+        Записывает готовые страницы в пуле потоков: генерация страниц не ждёт файловую систему.
+        Страница передаётся одним буфером; в очереди одновременно не больше max_pending
+        страниц (по умолчанию workers * 4), чтобы не держать в памяти весь сайт.
+        С кешем страница, не изменившаяся с прошлого запуска, не перезаписывается.
+        Ошибки не печатаются по одной, а собираются и выводятся в close().
+        В profiler при закрытии передаются число записанных страниц и байт.
+        """
+        self.cache = cache
+        self.profiler = profiler
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.slots = threading.BoundedSemaphore(max_pending or max(1, workers) * 4)
+        self.lock = threading.Lock()
+        self.errors: List[Tuple[str, str]] = []
+        # Успешно записанные страницы: их хеши передаются в кеш в close()
+        self.saved: List[str] = []
+        self.written = 0
+        self.written_bytes = 0
+        self.skipped = 0
+        self.start_time = time.perf_counter()
+
+    @staticmethod
+    def make_dirs(*directories: str) -> None:
+        """Создаёт каталоги вывода один раз до начала записи."""
+        for directory in directories:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, path: str, content: str) -> None:
+        """Ставит страницу в очередь на запись (блокируется, если очередь заполнена)."""
+        # Кеш страниц работает с SQLite, поэтому проверяется в вызывающем потоке
+        if self.cache is not None and not self.cache.page_changed(path, content):
+            self.skipped += 1
+            return
+        self.slots.acquire()
+        future = self.executor.submit(self._write, path, content)
+        future.add_done_callback(lambda _: self.slots.release())
+
+    def fail(self, path: str, error: Exception) -> None:
+        """Запоминает ошибку генерации страницы, чтобы вывести её вместе с ошибками записи."""
+        with self.lock:
+            self.errors.append((path, str(error)))
+
+    def _write(self, path: str, content: str) -> None:
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+                size = f.tell()
+        except Exception as e:
+            # Ошибка в потоке записи иначе осталась бы в future, который никто не читает
+            self.fail(path, e)
+            return
+        with self.lock:
+            self.written += 1
+            self.written_bytes += size
+            self.saved.append(path)
+
+    def close(self) -> None:
+        """Дожидается записи всех страниц и печатает итог."""
+        self.executor.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.pages_saved(self.saved)
+        self.saved = []
+        elapsed = time.perf_counter() - self.start_time
+        rate = self.written / elapsed if elapsed > 0 else 0.0
+        print(f"Записано страниц: {self.written}, без изменений: {self.skipped} "
+              f"за {elapsed:.2f} сек. ({rate:.0f}/с)")
+        if self.profiler is not None:
+            self.profiler.count("pages_written", self.written)
+            self.profiler.count("pages_unchanged", self.skipped)
+            self.profiler.count("bytes_written", self.written_bytes)
+            self.profiler.count("write_errors", len(self.errors))
+        if self.errors:
+            print(f"Ошибок при генерации и записи страниц: {len(self.errors)}")
+            for path, error in self.errors[:20]:
+                print(f"  {path}: {error}")
+            if len(self.errors) > 20:
+                print(f"  ... и ещё {len(self.errors) - 20}")
+
+    def __enter__(self) -> 'PageWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PageCollector:
+    def __init__(self):
+        """
+        Собирает страницы в памяти вместо записи на диск (для serve.py).
+        Интерфейс тот же, что у PageWriter, поэтому генераторы страниц не меняются.
+        Ключи pages — нормализованные пути с прямыми слешами.
+        """
+        self.pages: Dict[str, str] = {}
+        self.errors: List[Tuple[str, str]] = []
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        return os.path.normpath(path).replace(os.sep, '/')
+
+    def write(self, path: str, content: str) -> None:
+        self.pages[self.normalize(path)] = content
+
+    def fail(self, path: str, error: Exception) -> None:
+        self.errors.append((self.normalize(path), str(error)))
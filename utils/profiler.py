@@ -0,0 +1,130 @@
+import json
+import time
+import heapq
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Optional
+
+
+class Profiler:
+    def __init__(self, enabled: bool = True, slowest: int = 20):
+        """
+        Инструментирование генерации: время этапов, счётчики и списки самых медленных объектов.
+        С enabled=False все методы ничего не делают, поэтому вызовы можно оставлять в коде
+        без проверок. slowest — длина каждого списка самых медленных объектов.
+        """
+        self.enabled = enabled
+        self.slowest_count = slowest
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        # Категория -> куча (время, имя) из slowest_count самых медленных
+        self.slowest: Dict[str, List[Tuple[float, str]]] = {}
+        self.extra: Dict[str, object] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Замеряет этап; повторные замеры одного этапа суммируются."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, name: str, value: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, category: str, name: str, seconds: float) -> None:
+        """Учитывает время обработки объекта name в списке самых медленных категории category."""
+        if not self.enabled:
+            return
+        with self.lock:
+            heap = self.slowest.setdefault(category, [])
+            if len(heap) < self.slowest_count:
+                heapq.heappush(heap, (seconds, name))
+            elif seconds > heap[0][0]:
+                heapq.heapreplace(heap, (seconds, name))
+
+    def rates(self) -> Dict[str, float]:
+        """Производные показатели из счётчиков и времени этапов."""
+        rates: Dict[str, float] = {}
+        processed = self.counters.get("overloads_processed", 0)
+        if processed:
+            rates["matches_per_overload"] = self.counters.get("matches", 0) / processed
+        # Страницы пишутся на этапах render* и в потоке stream_functions вместе с подсветкой
+        pages_time = sum(seconds for name, seconds in self.stages.items() if name.startswith(("render", "stream")))
+        if pages_time > 0:
+            rates["pages_per_second"] = self.counters.get("pages_written", 0) / pages_time
+            rates["bytes_per_second"] = self.counters.get("bytes_written", 0) / pages_time
+        return rates
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "stages": self.stages,
+            "counters": self.counters,
+            "rates": self.rates(),
+            "slowest": {category: [[name, seconds] for seconds, name in sorted(heap, reverse=True)]
+                        for category, heap in self.slowest.items()},
+            **self.extra,
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def print_summary(self, top: int = 5) -> None:
+        if not self.enabled:
+            return
+        print("Профиль по этапам:")
+        for name, seconds in self.stages.items():
+            print(f"  {name:<24} {seconds:8.3f} сек.")
+        for name, value in self.counters.items():
+            print(f"  {name:<24} {value}")
+        for name, value in self.rates().items():
+            print(f"  {name:<24} {value:.1f}")
+        for category, heap in self.slowest.items():
+            print(f"Самые медленные ({category}):")
+            for seconds, name in sorted(heap, reverse=True)[:top]:
+                print(f"  {name:<40} {seconds * 1000:8.1f} мс")
+
+
+@contextmanager
+def python_profile(profiler: Profiler, cprofile_path: Optional[str] = None, memory: bool = False):
+    """
+    Дополнительно оборачивает запуск в cProfile (статистика сохраняется в cprofile_path)
+    и/или tracemalloc (пик памяти и главные места выделения попадают в отчёт профилировщика).
+    """
+    profile = None
+    if cprofile_path:
+        import cProfile
+        profile = cProfile.Profile()
+    if memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(cprofile_path)
+            profiler.extra["cprofile"] = cprofile_path
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            profiler.extra["memory"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top_allocations": [[str(stat.traceback), stat.size, stat.count]
+                                    for stat in snapshot.statistics('lineno')[:20]],
+            }
@@ -0,0 +1,29 @@
+import time
+
+
+class Progress:
+    def __init__(self, label: str, total: int, interval: float = 1.0):
+        """
+        Печатает прогресс не чаще одного раза в interval секунд вместо строки на каждый объект.
+        """
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.start_time = time.perf_counter()
+        self.last_report = self.start_time
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self._print(now)
+
+    def finish(self) -> None:
+        self._print(time.perf_counter())
+
+    def _print(self, now: float) -> None:
+        elapsed = now - self.start_time
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        print(f"{self.label}: {self.done} из {self.total} ({rate:.0f}/с)")
@@ -0,0 +1,89 @@
+import os
+import json
+import hashlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from model.SQLFunction import SQLFunction
+
+# Каталог с частичными результатами шардов внутри output
+SHARDS_DIR = "shards"
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Разбирает номер шарда "k/N" (1 <= k <= N)."""
+    try:
+        number, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Шард задаётся как k/N, получено: {value!r}") from None
+    if not 1 <= number <= count:
+        raise ValueError(f"Номер шарда должен быть от 1 до {count}, получено: {value!r}")
+    return number, count
+
+
+def shard_of(schema: str, count: int) -> int:
+    """
+    Номер шарда (с 1) для схемы: по хешу имени, поэтому одна и та же схема
+    попадает в один и тот же шард на любой машине и при любом составе каталога.
+    """
+    digest = hashlib.md5(schema.lower().encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % count + 1
+
+
+def select_schemas(schemas: Iterable[str], shard: Optional[str] = None,
+                   names: Optional[Iterable[str]] = None) -> Tuple[str, Set[str]]:
+    """
+    Схемы шарда: по номеру "k/N" или явным списком names (без учёта регистра).
+    Возвращает имя шарда для файлов результатов и множество схем в том виде, как они записаны в каталоге.
+    """
+    schemas = set(schemas)
+    if shard is not None:
+        number, count = parse_shard(shard)
+        return f"shard_{number}_of_{count}", {schema for schema in schemas if shard_of(schema, count) == number}
+    wanted = {name.lower() for name in names or ()}
+    digest = hashlib.md5(",".join(sorted(wanted)).encode('utf-8')).hexdigest()[:8]
+    return f"schemas_{digest}", {schema for schema in schemas if schema.lower() in wanted}
+
+
+def save_shard(output_dir: str, name: str, schemas: Iterable[str], functions: Dict[str, 'SQLFunction']) -> str:
+    """
+    Сохраняет частичный результат шарда в output/shards/<name>.json: обработанные схемы
+    и для каждой функции — число перегрузок (частичный манифест меню), вызовы, таблицы,
+    идентификаторы и колонки (частичный индекс зависимостей, из которого слияние строит обратный).
+    """
+    path = os.path.join(output_dir, SHARDS_DIR, f"{name}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shard = {
+        "schemas": sorted(schemas),
+        "functions": {key: [func.overload, sorted(func.called_functions), sorted(func.called_tables),
+                            sorted(func.identifiers), sorted(func.used_columns)]
+                      for key, func in functions.items()},
+    }
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(shard, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def load_shards(output_dir: str, functions: Dict[str, 'SQLFunction']) -> List[str]:
+    """
+    Переносит зависимости функций из всех файлов output/shards/*.json в каталог functions.
+    Если схема есть в нескольких шардах (например, после смены N), берётся более новый файл.
+    Функции, которых нет в каталоге, пропускаются. Возвращает схемы каталога, ни в одном шарде не найденные.
+    """
+    directory = os.path.join(output_dir, SHARDS_DIR)
+    paths = [os.path.join(directory, file) for file in os.listdir(directory) if file.endswith('.json')] \
+        if os.path.isdir(directory) else []
+    covered: Set[str] = set()
+    for path in sorted(paths, key=os.path.getmtime):
+        with open(path, 'r', encoding='utf-8') as f:
+            shard = json.load(f)
+        covered.update(shard["schemas"])
+        for key, (_, called_functions, called_tables, identifiers, used_columns) in shard["functions"].items():
+            func = functions.get(key)
+            if func is None:
+                continue
+            func.called_functions = set(called_functions)
+            func.called_tables = set(called_tables)
+            func.identifiers = set(identifiers)
+            func.used_columns = {tuple(column) for column in used_columns}
+    return sorted({func.schema for func in functions.values()} - covered)
@@ -0,0 +1,131 @@
+import os
+import json
+import random
+from typing import Dict, List
+
+# Типы колонок синтетических таблиц
+DATA_TYPES = ('integer', 'bigint', 'numeric', 'text', 'character varying', 'date',
+              'timestamp without time zone', 'boolean')
+
+
+def _table_name(number: int) -> str:
+    return f"table_{number:05d}"
+
+
+def _function_name(number: int) -> str:
+    return f"load_{number:05d}"
+
+
+def generate_catalog(data_dir: str,
+                     tables: int = 1000,
+                     functions: int = 1000,
+                     schemas: int = 5,
+                     columns: int = 20,
+                     definition_size: int = 2000,
+                     overloads: int = 0,
+                     depth: int = 5,
+                     calls: int = 3,
+                     seed: int = 0) -> Dict[str, int]:
+    """
+    Пишет синтетическую выгрузку Greenplum в data_dir/functions/functions.json
+    и data_dir/tables/tables.json в том же виде, что возвращают sql/getfuncs.sql и sql/gettables.sql.
+    tables, functions — число таблиц и функций, распределённых по schemas схемам;
+    columns — колонок в таблице; definition_size — примерный размер DDL функции в символах;
+    overloads — сколько функций получают дополнительную перегрузку;
+    depth — глубина графа вызовов: функции разбиты на depth слоёв, и функция вызывает
+    до calls функций только из следующего слоя.
+    При одинаковом seed выгрузка получается одинаковой. Возвращает фактические размеры каталога.
+    """
+    rng = random.Random(seed)
+    schema_names = [f"schema_{number:02d}" for number in range(max(1, schemas))]
+    depth = max(1, depth)
+
+    table_entries = []
+    table_refs: List[str] = []
+    for number in range(tables):
+        schema = schema_names[number % len(schema_names)]
+        name = _table_name(number)
+        column_names = ['id'] + [f"col_{column:03d}" for column in range(1, max(1, columns))]
+        table_entries.append({
+            "table_schema": schema,
+            "table_name": name,
+            "column_names": "{" + ",".join(column_names) + "}",
+            "data_types": "{" + ",".join(rng.choice(DATA_TYPES) for _ in column_names) + "}",
+        })
+        table_refs.append(f"{schema}.{name}")
+
+    function_refs = [f"{schema_names[number % len(schema_names)]}.{_function_name(number)}"
+                     for number in range(functions)]
+    # Слой функции определяет, кого она может вызывать: граф вызовов ациклический и глубиной depth
+    layer_size = max(1, -(-functions // depth))
+    layers = [function_refs[start:start + layer_size] for start in range(0, functions, layer_size)]
+
+    def statement(number: int) -> str:
+        target = rng.choice(table_refs) if table_refs else "public.missing"
+        source = rng.choice(table_refs) if table_refs else "public.missing"
+        kind = rng.randrange(5)
+        if kind == 0:
+            return (f"    INSERT INTO {target} (id, col_001)\n"
+                    f"    SELECT s.id, s.col_001\n      FROM {source} s\n"
+                    f"     WHERE s.col_002 > p_date; -- шаг {number}\n")
+        if kind == 1:
+            return (f"    UPDATE {target} t\n       SET col_001 = s.col_001\n      FROM {source} s\n"
+                    f"     WHERE t.id = s.id AND s.col_003 IS NOT NULL;\n")
+        if kind == 2:
+            return f"    DELETE FROM {target} WHERE id < p_limit;\n"
+        if kind == 3:
+            return f"    EXECUTE 'TRUNCATE {target}';\n"
+        return f"    /* {source} пересчитывается в следующем шаге */\n    v_count := v_count + {number};\n"
+
+    def definition(schema: str, name: str, arguments: str, callees: List[str]) -> str:
+        parts = [f"CREATE OR REPLACE FUNCTION {schema}.{name}({arguments})\n"
+                 f" RETURNS void\n LANGUAGE plpgsql\nAS $function$\nDECLARE\n    v_count integer := 0;\nBEGIN\n"]
+        size = len(parts[0])
+        for callee in callees:
+            parts.append(f"    PERFORM {callee}(p_date, p_limit);\n")
+        number = 0
+        while size < definition_size:
+            text = statement(number)
+            parts.append(text)
+            size += len(text)
+            number += 1
+        parts.append("    RETURN;\nEND;\n$function$\n")
+        return "".join(parts)
+
+    function_entries = []
+    arguments = "p_date date, p_limit integer"
+    for layer_number, layer in enumerate(layers):
+        next_layer = layers[layer_number + 1] if layer_number + 1 < len(layers) else []
+        for ref in layer:
+            schema, name = ref.split('.')
+            callees = rng.sample(next_layer, min(calls, len(next_layer)))
+            function_entries.append({
+                "schema_name": schema,
+                "function_name": name,
+                "return_type": "void",
+                "arguments": arguments,
+                "function_definition": definition(schema, name, arguments, callees),
+            })
+
+    for ref in rng.sample(function_refs, min(overloads, len(function_refs))):
+        schema, name = ref.split('.')
+        overload_arguments = "p_date date, p_limit integer, OUT p_rows bigint"
+        function_entries.append({
+            "schema_name": schema,
+            "function_name": name,
+            "return_type": "bigint",
+            "arguments": overload_arguments,
+            "function_definition": definition(schema, name, overload_arguments, []),
+        })
+
+    for kind, entries in (("functions", function_entries), ("tables", table_entries)):
+        os.makedirs(os.path.join(data_dir, kind), exist_ok=True)
+        with open(os.path.join(data_dir, kind, f"{kind}.json"), "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+
+    return {
+        "tables": len(table_entries),
+        "functions": functions,
+        "overloads": len(function_entries) - functions,
+        "definition_bytes": sum(len(entry["function_definition"]) for entry in function_entries),
+    }